@@ -0,0 +1,307 @@
+import os
+
+# Headless: must be set before matplotlib / Qt are imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+import matplotlib
+matplotlib.use("Agg")
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import types
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from radar_buffer import COLUMN_INDEX, RingBuffer, derive_block
+from radar_codec import SCHEMA_10, SCHEMA_15, decode_packet, encode_records, packets_to_block, records_to_block
+from radar_loadgen import TrackSimulator
+from radar_pyramid import TimePyramid
+from radar_reckon import SensorClock
+from radar_tracks import TrackTable
+
+# Microbenchmarks for the ingest and rendering hot paths.
+#
+#   python bench_radar.py                       # all groups, results in bench_results.json
+#   python bench_radar.py --group render --sizes 100 10000
+#   python bench_radar.py --compare old.json    # print new/old ratios against an earlier run
+#
+# Fixtures are synthetic (radar_loadgen.TrackSimulator with a fixed seed), so
+# runs on different commits time exactly the same data.
+
+SIZES = (100, 10000, 100000)
+SEED = 1234
+DEFAULT_OUTPUT = "bench_results.json"
+TRAIL_SCANS = 32  # Scans in the track fixture, so every track has a trail
+
+VIEW_MODES = {
+    "PPI": "update_ppi",
+    "Phosphor PPI": "update_phosphor",
+    "Track Trails": "update_trails",
+    "RHI": "update_rhi",
+    "B-Scope": "update_bscope",
+    "C-Scope": "update_cscope",
+    "Time vs Range": "update_time_vs_range",
+    "Time vs Azimuth": "update_time_vs_azimuth",
+    "Time vs Elevation": "update_time_vs_elevation",
+}
+PLOT_METHODS = ("plot_ppi", "plot_rhi", "plot_bscope", "plot_cscope",
+                "plot_time_vs_range", "plot_time_vs_azimuth", "plot_time_vs_elevation")
+# The FuncAnimation displays: module -> mode -> update method
+OLD_VIEW_MODES = {
+    "nov10receive1": {"PPI": "update_ppi", "RHI": "update_rhi", "B-Scope": "update_bscope"},
+    "nov10rteceive2": {"PPI": "update_ppi", "RHI": "update_rhi", "B-Scope": "update_bscope",
+                       "C-Scope": "update_cscope", "Time vs Range": "update_time_vs_range",
+                       "Time vs Azimuth": "update_time_vs_azimuth", "Time vs Elevation": "update_time_vs_elevation"},
+}
+
+
+def fixture_records(schema, n):
+    """ `n` reports of one scan, with times spread over 0..100 s like a long session. """
+    records = TrackSimulator(n, seed=SEED).records(schema)
+    records["time"] = np.linspace(0.0, 100.0, n)
+    return records
+
+
+def fixture_block(n):
+    block = derive_block(records_to_block(SCHEMA_15, fixture_records(SCHEMA_15, n)))
+    block[COLUMN_INDEX["feed"]] = 5005  # As tagged by the receivers
+    return block
+
+
+def fixture_scans(n):
+    """ About `n` reports as TRAIL_SCANS one-second scans of the same tracks, as derived, feed-tagged blocks. """
+    sim = TrackSimulator(max(1, n // TRAIL_SCANS), seed=SEED)
+    blocks = []
+    for _ in range(TRAIL_SCANS):
+        sim.step(1.0)
+        block = derive_block(records_to_block(SCHEMA_15, sim.records(SCHEMA_15)))
+        block[COLUMN_INDEX["feed"]] = 5005
+        blocks.append(block)
+    return blocks
+
+
+def text_packets(schema, n):
+    records = fixture_records(schema, n)
+    lines = []
+    for row in records.tolist():
+        if schema == SCHEMA_15:
+            x, y, z, xv, yv, zv, source, trk_no, types_, t, lat, lon, alt, spd, hdng = row
+            row = (x, y, z, xv, yv, zv, "Radar", trk_no, "TypeA", t, lat, lon, alt, spd, hdng)
+        lines.append(",".join(str(value) for value in row).encode("utf-8"))
+    return lines
+
+
+def timeit(fn, min_time=0.2, max_calls=1000):
+    """ Seconds per call: best of several runs, each repeated until `min_time` has elapsed. """
+    fn()  # Warm-up
+    best = float("inf")
+    calls = 0
+    for _ in range(3):
+        runs = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time or runs >= max_calls:
+                break
+        best = min(best, elapsed / runs)
+        calls += runs
+    return best, calls
+
+
+class Blitter:
+    """
+    Draws frames the way the displays do (FrameScheduler, FuncAnimation with
+    blit=True): `update()` refreshes the artists, which are drawn over a
+    background cached without them and blitted. A plain canvas.draw() skips
+    animated artists, so it would not time the data at all.
+    """
+
+    def __init__(self, canvas, update):
+        self.canvas = canvas
+        self.update = update
+        for artist in update():
+            artist.set_animated(True)
+        canvas.draw()
+        self.background = canvas.copy_from_bbox(canvas.figure.bbox)
+
+    def frame(self):
+        artists = self.update()
+        self.canvas.restore_region(self.background)
+        for artist in artists:
+            artist.axes.draw_artist(artist)
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+class Bench:
+    def __init__(self):
+        self.results = []
+
+    def record(self, group, name, n, fn, **kwargs):
+        seconds, calls = timeit(fn, **kwargs)
+        self.results.append({"group": group, "name": name, "n": n, "seconds": seconds, "calls": calls})
+        per_item = f"{seconds / n * 1e9:10.1f} ns/item" if n else ""
+        print(f"{group:8} {name:42} n={n:<7} {seconds * 1e3:10.3f} ms {per_item}")
+
+
+def bench_parse(bench, sizes):
+    import nov10receive
+    import receive6
+
+    for schema, module in ((SCHEMA_15, nov10receive), (SCHEMA_10, receive6)):
+        lines = text_packets(schema, 1000)
+        single = encode_records(schema, fixture_records(schema, 1))[0]
+        bench.record("parse", f"parse_udp_data text schema {schema}", len(lines),
+                     lambda: [module.parse_udp_data(line) for line in lines])
+        bench.record("parse", f"parse_udp_data binary schema {schema}", 1,
+                     lambda: module.parse_udp_data(single))
+        for n in sizes:
+            packets = encode_records(schema, fixture_records(schema, n))
+            bench.record("parse", f"decode_packet schema {schema}", n,
+                         lambda: [decode_packet(packet) for packet in packets], max_calls=50)
+            bench.record("parse", f"packets_to_block schema {schema}", n,
+                         lambda: packets_to_block(packets, schema, module.parse_udp_data), max_calls=200)
+
+
+def bench_buffer(bench, sizes):
+    for n in sizes:
+        block = records_to_block(SCHEMA_15, fixture_records(SCHEMA_15, n))
+        full = derive_block(block)
+        buffer = RingBuffer(max(1, n // 2))  # Half the block size, so every append evicts
+        bench.record("buffer", "derive_block", n, lambda: derive_block(block))
+        bench.record("buffer", "RingBuffer.append_block (evicting)", n, lambda: buffer.append_block(full))
+        bench.record("buffer", "RingBuffer.column (last N view)", n, lambda: buffer.column("ground_range", n))
+
+        single = full[:, :1]
+        small = RingBuffer(1000)
+        bench.record("buffer", "RingBuffer.append_block one report", 1, lambda: small.append_block(single))
+
+        table = TrackTable()
+        bench.record("buffer", "TrackTable.update_block", n, lambda: table.update_block(full), max_calls=200)
+        smoothed = TrackTable(smoothing=(0.5, 0.1))
+        bench.record("buffer", "TrackTable.update_block (smoothed)", n, lambda: smoothed.update_block(full),
+                     max_calls=200)
+        bench.record("buffer", "TrackTable.extrapolate (smoothed)", n, lambda: smoothed.extrapolate(101.0, max_coast=10),
+                     max_calls=200)
+
+        pyramid = TimePyramid(("ground_range", "azimuth", "elevation"))
+        bench.record("buffer", "TimePyramid.update_block", n, lambda: pyramid.update_block(full), max_calls=200)
+
+
+def bench_render(bench, sizes):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    import nov10receive
+    import receive
+
+    window = nov10receive.RadarDisplayApp()
+    window.data_update_timer.stop()
+    window.ingest_timer.stop()
+    for n in sizes:
+        block = fixture_block(n)
+        nov10receive.data_buffer.resize(n)
+        nov10receive.data_buffer.append_block(block)
+        nov10receive.time_pyramid.update_block(block)
+        scans = fixture_scans(n)
+        for scan in scans:
+            nov10receive.track_table.update_block(scan)
+        for mode, method in VIEW_MODES.items():
+            # A fresh clock for every mode, so Track Trails always dead-reckons a live feed
+            nov10receive.sensor_clock = SensorClock()
+            nov10receive.sensor_clock.observe(scans[-1])
+            window.plot_type = mode
+            window.setup_plot()
+            window.frames.stop()  # Frames are drawn by the Blitter below, at full detail
+            update = getattr(window, method)
+            blitter = Blitter(window.canvas, lambda: update(1))
+            bench.record("render", f"nov10receive.{method} + blit", n, blitter.frame, min_time=0.5, max_calls=100)
+        nov10receive.data_buffer.clear()
+        nov10receive.time_pyramid.clear()
+        nov10receive.track_table.discard_before(np.inf)
+    window.close()
+
+    # The FuncAnimation displays, with their animations stopped and frames blitted the same way
+    for name, modes in OLD_VIEW_MODES.items():
+        module = __import__(name)
+        window = module.RadarDisplayApp()
+        window.data_update_timer.stop()
+        window.ingest_timer.stop()
+        for n in sizes:
+            module.data_buffer.resize(n)
+            module.data_buffer.append_block(fixture_block(n))
+            for mode, method in modes.items():
+                window.plot_type = mode
+                window.setup_plot()
+                window.anim.event_source.stop()
+                update = getattr(window, method)
+                blitter = Blitter(window.canvas, lambda: update(0.0))
+                bench.record("render", f"{name}.{method} + blit", n, blitter.frame, min_time=0.5, max_calls=100)
+            module.data_buffer.clear()
+        window.close()
+
+    # receive.py plots straight from its RingBuffer; drive the methods on an Agg canvas
+    fig, ax = plt.subplots()
+    gui = types.SimpleNamespace(ax=ax, canvas=FigureCanvasAgg(fig))
+    for n in sizes:
+        data = RingBuffer(n)
+        data.append_block(fixture_block(n))
+        for method in PLOT_METHODS:
+            plot = getattr(receive.RadarGUI, method)
+            bench.record("render", f"receive.{method}", n, lambda: plot(gui, data), min_time=0.5, max_calls=100)
+    plt.close(fig)
+
+
+GROUPS = {"parse": bench_parse, "buffer": bench_buffer, "render": bench_render}
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def compare(results, old_path):
+    with open(old_path) as f:
+        old = {(r["group"], r["name"], r["n"]): r["seconds"] for r in json.load(f)["results"]}
+    print(f"\nCompared with {old_path} (ratio < 1 is faster):")
+    for r in results:
+        before = old.get((r["group"], r["name"], r["n"]))
+        if before:
+            print(f"{r['group']:8} {r['name']:42} n={r['n']:<7} {r['seconds'] / before:6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark radar ingest, parsing and rendering")
+    parser.add_argument("--group", choices=sorted(GROUPS), action="append", help="Only run these groups")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Point counts to benchmark")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    bench = Bench()
+    for group in args.group or list(GROUPS):
+        GROUPS[group](bench, args.sizes)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(), "results": bench.results}, f, indent=2)
+    print(f"\nWrote {len(bench.results)} results to {args.output}")
+
+    if args.compare:
+        compare(bench.results, args.compare)
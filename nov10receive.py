@@ -1,10 +1,10 @@
+import argparse
 import sys
-import socket
 import threading
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.animation import FuncAnimation
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QComboBox, 
     QPushButton, QDialog, QDialogButtonBox, QTextEdit, QSplitter, QLineEdit, QFormLayout
@@ -12,10 +12,43 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 
+from radar_buffer import COLUMNS, RingBuffer, derive_block
+from radar_codec import SCHEMA_15
+from radar_ingest import FEEDS, feed_decoder, parse_datagram, parse_port
+from radar_latency import LatencyProbe
+from radar_pyramid import TimePyramid
+from radar_queue import BlockQueue
+from radar_phosphor import PHOSPHOR_CMAP, PhosphorRaster
+from radar_player import play
+from radar_receiver import ReceiverEngine
+from radar_reckon import MAX_COAST, SensorClock
+from radar_record import Recorder, Recording, RecordingError
+from radar_retention import Retention
+from radar_scheduler import FrameScheduler
+from radar_shm import ProcessIngest
+from radar_tracks import TrackTable
+from radar_trails import Trails
+
 # UDP settings
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5005
-data_buffer = []
+# Every feed is received into the one store below, each report tagged with its port in the
+# "feed" column: 5005 carries the 15-field send.py reports, 5008 the 10-field send2.py ones.
+UDP_PORTS = dict(FEEDS)
+BUFFER_CAPACITY = 10000  # Reports kept for display (oldest are overwritten)
+data_buffer = RingBuffer(BUFFER_CAPACITY)  # Only touched on the GUI thread
+ingest_queue = BlockQueue()  # Receiver thread -> GUI thread hand-off
+track_table = TrackTable(keys=("feed", "track_id"))  # Latest state and history per track, GUI thread only
+# Min/max per track and time bin for the "Time vs ..." views, covering far more history than data_buffer
+time_pyramid = TimePyramid(("ground_range", "azimuth", "elevation"), keys=track_table.keys)
+sensor_clock = SensorClock()  # Each feed's current `time` between reports, for dead reckoning
+# Time window, per-track history and memory budget over the three stores above, applied on every ingest tick
+retention = Retention(data_buffer, track_table, time_pyramid)
+DISPLAY_TRACKS = 50  # Most recently updated tracks listed in the data panel
+INGEST_INTERVAL_MS = 50  # How often the GUI moves queued reports into data_buffer
+SWEEP_PERIOD = 5.0  # Seconds per turn of the PPI sweep line
+latency_probe = None  # LatencyProbe for --latency; needs stamped reports (send.py --stamp)
+recorder = None  # Session Recorder for --record; every ingested report is appended
 
 # CSS Styling
 CSS = """
@@ -41,44 +74,31 @@ QComboBox, QLineEdit, QTextEdit {
 }
 """
 
-# UDP Receiver Thread
-def udp_receiver():
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((UDP_IP, UDP_PORT))
-    while True:
-        data, _ = sock.recvfrom(1024)
-        parsed_data = parse_udp_data(data.decode("utf-8"))
-        if parsed_data:
-            data_buffer.append(parsed_data)
+# Decoder for one receive engine port, run on its loop thread: one batch of datagrams -> one raw block
+def make_decoder(port, schema):
+    decode = feed_decoder(port, schema)
+
+    def decode_packets(packets):
+        block = decode(packets)
+        if latency_probe:
+            latency_probe.parsed(packets)
+        return block
+    return decode_packets
+
+def queue_block(block):
+    """ Sink of the receive engine: hand a decoded block to the GUI thread. """
+    ingest_queue.put(block)
+    if latency_probe:
+        latency_probe.queued()
 
 def parse_udp_data(data):
-    try:
-        values = data.split(',')
-        x, y, z, xv, yv, zv, source, trk_no, types, time, latitude, longitude, altitude, speed, hdng = values
-        return {
-            "x": float(x),
-            "y": float(y),
-            "z": float(z),
-            "xv": float(xv),
-            "yv": float(yv),
-            "zv": float(zv),
-            "source": source,
-            "track_id": int(trk_no),
-            "type": types,
-            "time": float(time),
-            "latitude": float(latitude),
-            "longitude": float(longitude),
-            "altitude": float(altitude),
-            "speed": float(speed),
-            "heading": float(hdng)
-        }
-    except ValueError:
-        print("Invalid data format:", data)
-        return None
+    """ Decode one datagram into a list of reports (shared with the headless daemon, see radar_ingest.py). """
+    return parse_datagram(data, SCHEMA_15)
 
-# Start UDP receiver thread
-receiver_thread = threading.Thread(target=udp_receiver, daemon=True)
-receiver_thread.start()
+# UDP receive engine, started from __main__ so the module can be imported (e.g. by bench_radar.py)
+receiver = ReceiverEngine()
+for port, schema in UDP_PORTS.items():
+    receiver.add(port, make_decoder(port, schema), queue_block, udp_ip=UDP_IP)
 
 class ConfigDialog(QDialog):
     def __init__(self, parent=None):
@@ -90,6 +110,11 @@ class ConfigDialog(QDialog):
         self.elevation_min = QLineEdit("0")
         self.elevation_max = QLineEdit("180")
         self.azimuthal_marking = QLineEdit("10")
+        self.time_max = QLineEdit("100")
+        self.buffer_capacity = QLineEdit(str(data_buffer.capacity))
+        self.retention_window = QLineEdit(str(retention.window or 0))
+        self.track_history = QLineEdit(str(track_table.history_length))
+        self.memory_budget = QLineEdit(str(retention.memory_budget // 2 ** 20))
 
         layout = QFormLayout()
         layout.addRow("Range Minimum:", self.range_min)
@@ -97,6 +122,11 @@ class ConfigDialog(QDialog):
         layout.addRow("Elevation Minimum:", self.elevation_min)
         layout.addRow("Elevation Maximum:", self.elevation_max)
         layout.addRow("Azimuthal Marking (PPI):", self.azimuthal_marking)
+        layout.addRow("Time Maximum:", self.time_max)
+        layout.addRow("Buffer Capacity:", self.buffer_capacity)
+        layout.addRow("Retention Window (s, 0 = all):", self.retention_window)
+        layout.addRow("Track History:", self.track_history)
+        layout.addRow("Memory Budget (MB):", self.memory_budget)
 
         self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         self.button_box.accepted.connect(self.accept)
@@ -112,7 +142,12 @@ class ConfigDialog(QDialog):
                 "range_max": int(self.range_max.text()),
                 "elevation_min": int(self.elevation_min.text()),
                 "elevation_max": int(self.elevation_max.text()),
-                "azimuthal_marking": int(self.azimuthal_marking.text())
+                "azimuthal_marking": int(self.azimuthal_marking.text()),
+                "time_max": int(self.time_max.text()),
+                "buffer_capacity": int(self.buffer_capacity.text()),
+                "retention_window": float(self.retention_window.text()),
+                "track_history": int(self.track_history.text()),
+                "memory_budget": int(self.memory_budget.text())
             }
         return None
 
@@ -124,7 +159,7 @@ class RadarPlotDialog(QDialog):
 
         # Dropdown for plot selection
         self.dropdown = QComboBox()
-        self.dropdown.addItems(["PPI", "RHI", "B-Scope", "C-Scope", 
+        self.dropdown.addItems(["PPI", "Phosphor PPI", "Track Trails", "RHI", "B-Scope", "C-Scope", 
                                 "Time vs Range", "Time vs Azimuth", "Time vs Elevation"])
 
         # OK and Cancel buttons
@@ -181,19 +216,29 @@ class RadarDisplayApp(QMainWindow):
 
         # Default plot type and configuration settings
         self.plot_type = "PPI"
-        self.config = {"range_min": 0, "range_max": 100, "elevation_min": 0, "elevation_max": 180, "azimuthal_marking": 10}
+        self.config = {"range_min": 0, "range_max": 100, "elevation_min": 0, "elevation_max": 180, "azimuthal_marking": 10, "time_max": 100, "buffer_capacity": BUFFER_CAPACITY,
+                       "retention_window": retention.window or 0, "track_history": track_table.history_length,
+                       "memory_budget": retention.memory_budget // 2 ** 20}
         self.setup_plot()
 
         # Timer for updating data display
+        self.displayed_serial = 0
         self.data_update_timer = QTimer()
         self.data_update_timer.timeout.connect(self.update_data_display)
         self.data_update_timer.start(500)  # Update every 500 ms
 
+        # Timer moving received reports into data_buffer on the GUI thread
+        self.ingest_timer = QTimer()
+        self.ingest_timer.timeout.connect(self.ingest_pending)
+        self.ingest_timer.start(INGEST_INTERVAL_MS)
+
     def configure_settings(self):
         dialog = ConfigDialog(self)
         settings = dialog.get_settings()
         if settings:
             self.config = settings
+            retention.configure(settings["retention_window"], settings["track_history"],
+                                settings["memory_budget"] * 2 ** 20, settings["buffer_capacity"])
             self.setup_plot()
 
     def select_plot(self):
@@ -204,31 +249,79 @@ class RadarDisplayApp(QMainWindow):
             self.setup_plot()
 
     def setup_plot(self):
-        self.ax.clear()
+        # Stop the previous view's frames and start from an empty figure, so each mode
+        # builds its axes and artists exactly once and the frames only update data
+        if getattr(self, "frames", None) is not None:
+            self.frames.stop()
+        self.fig.clf()
 
         if self.plot_type == "PPI":
             self.ax = self.fig.add_subplot(111, projection='polar', facecolor="black")
             self.ax.set_ylim(self.config["range_min"], self.config["range_max"])
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
+            self.ax.set_xlabel("Azimuth (°)")
+            self.ax.set_ylabel("Range")
+            self.points = self.ax.scatter([], [], color="lime", s=10, alpha=0.7)
+            self.sweep_line, = self.ax.plot([], [], color="lime", linewidth=2)
+            self.ppi_version = None
+            self.show_frames(self.update_ppi, continuous=True)
+
+        # Phosphor PPI: returns glow and fade on one raster image, however many there are
+        elif self.plot_type == "Phosphor PPI":
+            range_max = self.config["range_max"]
+            self.ax = self.fig.add_subplot(111, facecolor="black")
+            self.ax.set_aspect("equal")
+            self.ax.set_xlim(-range_max, range_max)
+            self.ax.set_ylim(-range_max, range_max)
+            self.ax.set_xticks([])
+            self.ax.set_yticks([])
+            self.phosphor = PhosphorRaster(range_max, pixels=max(64, int(min(self.ax.bbox.width, self.ax.bbox.height))))
+            self.phosphor_seen = data_buffer.total
+            self.phosphor_time = time.monotonic()
+            self.raster = self.ax.imshow(self.phosphor.image, cmap=PHOSPHOR_CMAP, vmin=0, vmax=1, origin="lower",
+                                         extent=self.phosphor.extent, interpolation="nearest")
+            # Range rings and azimuth markings are static, so they stay in the cached background
+            for ring in np.linspace(0, range_max, 5)[1:]:
+                self.ax.add_patch(plt.Circle((0, 0), ring, fill=False, color="green", linestyle="--", linewidth=0.5))
+            for angle in np.radians(np.arange(0, 360, max(self.config["azimuthal_marking"], 1))):
+                self.ax.plot([0, range_max * np.cos(angle)], [0, range_max * np.sin(angle)],
+                             color="green", linestyle="--", linewidth=0.3)
             self.sweep_line, = self.ax.plot([], [], color="lime", linewidth=2)
-            self.anim = FuncAnimation(self.fig, self.update_ppi, frames=np.linspace(0, 2*np.pi, 100),
-                                      interval=50, blit=True, repeat=True)
+            self.show_frames(self.update_phosphor, continuous=True)
+
+        # Track Trails: plan view of each track's recent history, all tracks in one LineCollection
+        elif self.plot_type == "Track Trails":
+            range_max = self.config["range_max"]
+            self.ax = self.fig.add_subplot(111, facecolor="black")
+            self.ax.set_aspect("equal")
+            self.ax.set_xlim(-range_max, range_max)
+            self.ax.set_ylim(-range_max, range_max)
+            self.ax.grid(color="green", linestyle="--", linewidth=0.5)
+            self.ax.set_xlabel("X")
+            self.ax.set_ylabel("Y")
+            self.trails = Trails(self.ax, track_table.history_length, colors="lime", linewidths=1, alpha=0.6)
+            self.points, = self.ax.plot([], [], 'o', color="lime", markersize=3)
+            self.show_frames(self.update_trails)
 
         elif self.plot_type == "RHI":
             self.ax = self.fig.add_subplot(111, facecolor="black")
             self.ax.set_xlim(self.config["range_min"], self.config["range_max"])
             self.ax.set_ylim(self.config["elevation_min"], self.config["elevation_max"])
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_rhi, interval=500)
+            self.ax.set_xlabel("Range")
+            self.ax.set_ylabel("Height")
+            self.points, = self.ax.plot([], [], 'o', color="lime", markersize=5, alpha=0.7)
+            self.show_frames(self.update_rhi)
 
         elif self.plot_type == "B-Scope":
             self.ax = self.fig.add_subplot(111, facecolor="black")
             self.ax.set_xlim(-180, 180)
             self.ax.set_ylim(self.config["range_min"], self.config["range_max"])
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_bscope, interval=500)
-
-    
+            self.ax.set_xlabel("Azimuth (°)")
+            self.ax.set_ylabel("Range")
+            self.points, = self.ax.plot([], [], 'o', color="lime", markersize=5, alpha=0.7)
+            self.show_frames(self.update_bscope)
 
         # C-Scope: Displays Range vs Azimuth
         elif self.plot_type == "C-Scope":
@@ -238,7 +331,8 @@ class RadarDisplayApp(QMainWindow):
             self.ax.grid(color="blue", linestyle="--", linewidth=0.5)
             self.ax.set_xlabel("Azimuth (°)")
             self.ax.set_ylabel("Range")
-            self.anim = FuncAnimation(self.fig, self.update_cscope, interval=500)
+            self.points, = self.ax.plot([], [], 'o', color="cyan", markersize=5, alpha=0.7)
+            self.show_frames(self.update_cscope)
 
         # Time vs Azimuth
         elif self.plot_type == "Time vs Azimuth":
@@ -248,7 +342,8 @@ class RadarDisplayApp(QMainWindow):
             self.ax.grid(color="purple", linestyle="--", linewidth=0.5)
             self.ax.set_xlabel("Time (s)")
             self.ax.set_ylabel("Azimuth (°)")
-            self.anim = FuncAnimation(self.fig, self.update_time_vs_azimuth, interval=500)
+            self.points, = self.ax.plot([], [], 'o', color="magenta", markersize=5, alpha=0.7)
+            self.show_frames(self.update_time_vs_azimuth)
 
         # Time vs Range
         elif self.plot_type == "Time vs Range":
@@ -258,7 +353,8 @@ class RadarDisplayApp(QMainWindow):
             self.ax.grid(color="cyan", linestyle="--", linewidth=0.5)
             self.ax.set_xlabel("Time (s)")
             self.ax.set_ylabel("Range")
-            self.anim = FuncAnimation(self.fig, self.update_time_vs_range, interval=500)
+            self.points, = self.ax.plot([], [], 'o', color="aqua", markersize=5, alpha=0.7)
+            self.show_frames(self.update_time_vs_range)
 
         # Time vs Elevation
         elif self.plot_type == "Time vs Elevation":
@@ -268,108 +364,200 @@ class RadarDisplayApp(QMainWindow):
             self.ax.grid(color="orange", linestyle="--", linewidth=0.5)
             self.ax.set_xlabel("Time (s)")
             self.ax.set_ylabel("Elevation (°)")
-            self.anim = FuncAnimation(self.fig, self.update_time_vs_elevation, interval=500)
-    
+            self.points, = self.ax.plot([], [], 'o', color="orange", markersize=5, alpha=0.7)
+            self.show_frames(self.update_time_vs_elevation)
 
         self.canvas.draw()
 
-    def update_ppi(self, angle):
-        self.ax.clear()
-        self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-    
+    def show_frames(self, update, continuous=False):
+        """ Draw the view through a FrameScheduler; with --latency each frame is reported to the probe once drawn. """
+        self.frames = FrameScheduler(self.canvas, update, continuous=continuous,
+                                     drawn=latency_probe.drawn if latency_probe else None)
+        self.frames.start()
+
+    # The update_* methods only push new data into the artists created by
+    # setup_plot and return them, so the scheduler can blit just those.
+    # `step` is the level of detail: every step-th report is drawn.
+
+    def update_ppi(self, step):
+        # The sweep turns every frame; the points only change with new data
+        version = (data_buffer.total, len(data_buffer), step)
+        if data_buffer and version != self.ppi_version:
+            self.points.set_offsets(np.column_stack((data_buffer.column("azimuth_rad")[::step],
+                                                     data_buffer.column("ground_range")[::step])))
+            self.ppi_version = version
+        angle = 2 * np.pi * (time.monotonic() % SWEEP_PERIOD) / SWEEP_PERIOD
+        self.sweep_line.set_data([angle, angle], [self.config["range_min"], self.config["range_max"]])
+        return self.points, self.sweep_line
+
+    def update_phosphor(self, step):
+        # Only the reports received since the last frame are splatted; the rest is one multiply
+        now = time.monotonic()
+        self.phosphor.fade(now - self.phosphor_time)
+        self.phosphor_time = now
+        new = data_buffer.total - self.phosphor_seen
+        if new < 0:
+            new = len(data_buffer)  # The buffer was cleared
+        new = min(new, len(data_buffer))
+        if new:
+            self.phosphor.splat(data_buffer.column("azimuth_rad", new), data_buffer.column("ground_range", new))
+        self.phosphor_seen = data_buffer.total
+        self.raster.set_data(self.phosphor.image)
+        angle = 2 * np.pi * (now % SWEEP_PERIOD) / SWEEP_PERIOD
+        range_max = self.config["range_max"]
+        self.sweep_line.set_data([0, range_max * np.cos(angle)], [0, range_max * np.sin(angle)])
+        return self.raster, self.sweep_line
+
+    def update_trails(self, step):
+        # Histories are bounded by the track table, so the segment array is refilled in place
+        self.trails.length = track_table.history_length
+        segments = track_table.trails(("x", "y"), out=self.trails.segments(len(track_table)))
+        self.trails.update(segments[:, ::-step][:, ::-1])  # Every step-th point, always keeping the newest
+        # Heads are dead-reckoned to their feed's now, so they keep moving between reports while the feed is
+        # live; tracks silent for longer than MAX_COAST stay at their last report
+        now = sensor_clock.now()
+        if now:
+            heads = track_table.extrapolate(now, max_coast=MAX_COAST, by="feed")
+            self.points.set_data(heads[0], heads[1])
+        self.frames.continuous = sensor_clock.age() < MAX_COAST
+        return self.trails.collection, self.points
+
+    def update_rhi(self, step):
         if data_buffer:
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            azimuths = [np.arctan2(point["y"], point["x"]) for point in data_buffer]  # No need for np.radians(np.degrees(...))
-            self.ax.scatter(azimuths, ranges, color="lime", s=10, alpha=0.7)
-
-    # Set labels after clearing the axis
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
-    
-        return self.ax,
+            self.points.set_data(data_buffer.column("ground_range")[::step], data_buffer.column("z")[::step])
+        return self.points,
 
-
-    def update_rhi(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-        if data_buffer:
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            heights = [point["z"] for point in data_buffer]
-            self.ax.plot(ranges, heights, 'o', color="lime", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
-
-    def update_bscope(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-        if data_buffer:
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            self.ax.plot(azimuths, ranges, 'o', color="lime", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
-    
-    
-    def update_cscope(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="blue", linestyle="--", linewidth=0.5)
+    def update_bscope(self, step):
         if data_buffer:
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            self.ax.plot(azimuths, ranges, 'o', color="cyan", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
-
-    def update_time_vs_azimuth(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="purple", linestyle="--", linewidth=0.5)
-        if data_buffer:
-            times = [point["time"] for point in data_buffer]
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            self.ax.plot(times, azimuths, 'o', color="magenta", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Time (s)")
-        self.ax.set_ylabel("Azimuth (°)")        
-            
-    def update_time_vs_range(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="cyan", linestyle="--", linewidth=0.5)
-        if data_buffer:
-            times = [point["time"] for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            self.ax.plot(times, ranges, 'o', color="aqua", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Time (s)")
-        self.ax.set_ylabel("Range")     
-            
-    def update_time_vs_elevation(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="orange", linestyle="--", linewidth=0.5)
-        if data_buffer:
-            times = [point["time"] for point in data_buffer]
-            elevations = [np.degrees(np.arcsin(point["z"] / np.sqrt(point["x"]**2 + point["y"]**2 + point["z"]**2))) for point in data_buffer]
-            self.ax.plot(times, elevations, 'o', color="orange", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Time (s)")
-        self.ax.set_ylabel("Elevation (°)")
-
+            self.points.set_data(data_buffer.column("azimuth")[::step], data_buffer.column("ground_range")[::step])
+        return self.points,
 
-    
+    def update_cscope(self, step):
+        if data_buffer:
+            self.points.set_data(data_buffer.column("azimuth")[::step], data_buffer.column("ground_range")[::step])
+        return self.points,
+
+    # The time views draw the pyramid level whose bins are about one pixel wide
+    # over 0..time_max (step pixels wide at lower detail), so their cost does not
+    # grow with the length of the feed.
+
+    def time_envelope(self, quantity, step=1):
+        return time_pyramid.envelope(quantity, 0, self.config["time_max"], int(self.ax.bbox.width) // step)
+
+    def update_time_vs_azimuth(self, step):
+        self.points.set_data(*self.time_envelope("azimuth", step))
+        return self.points,
+
+    def update_time_vs_range(self, step):
+        self.points.set_data(*self.time_envelope("ground_range", step))
+        return self.points,
+
+    def update_time_vs_elevation(self, step):
+        self.points.set_data(*self.time_envelope("elevation", step))
+        return self.points,
+
+    def ingest_pending(self):
+        # Everything received since the last tick goes into the buffer in one append
+        mark = latency_probe.mark() if latency_probe else None
+        block = ingest_queue.drain()
+        if block is not None:
+            block = derive_block(block)  # Derived once, shared by the buffer and the track table
+            data_buffer.append_block(block)
+            if latency_probe:
+                latency_probe.buffered(mark)
+            track_table.update_block(block)
+            sensor_clock.observe(block)
+            time_pyramid.update_block(block)
+            if recorder:
+                recorder.write(block)
+            retention.apply(block)
+            self.frames.invalidate()
 
     def update_data_display(self):
-        # Display the most recent data
-        if data_buffer:
-            latest_data = data_buffer[-1]
-            display_text = (
+        # Display the current picture: latest state of the most recently updated tracks
+        if track_table.serial == self.displayed_serial:
+            return  # Nothing new since the last refresh
+        self.displayed_serial = track_table.serial
+        lines = [f"Tracks: {len(track_table)}, Reports: {len(data_buffer)}, Memory: {retention.usage() / 2 ** 20:.1f} MB, "
+                 f"Frame: {self.frames.last_frame_time * 1000:.0f} ms at 1/{self.frames.step} detail"]
+        for row in track_table.current(DISPLAY_TRACKS).T:
+            latest_data = dict(zip(COLUMNS, row))
+            lines.append(
                 f"X: {latest_data['x']:.2f}, Y: {latest_data['y']:.2f}, Z: {latest_data['z']:.2f}, "
-                f"Track ID: {latest_data['track_id']}, Time: {latest_data['time']}, "
+                f"Feed: {latest_data['feed']:.0f}, Track ID: {latest_data['track_id']:.0f}, Time: {latest_data['time']}, "
                 f"Lat: {latest_data['latitude']}, Lon: {latest_data['longitude']}, "
                 f"Alt: {latest_data['altitude']}, Speed: {latest_data['speed']}, "
-                f"Heading: {latest_data['heading']}\n"
+                f"Heading: {latest_data['heading']}"
             )
-            self.data_display.append(display_text)
+        self.data_display.setPlainText("\n".join(lines))
 
 # Initialize the Qt Application and start the Radar Display App
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Real-time radar display")
+    parser.add_argument("--latency", action="store_true", help="Report end-to-end latency of stamped reports on exit")
+    parser.add_argument("--ingest-processes", action="store_true", help="Receive and decode in worker processes")
+    parser.add_argument("--record", metavar="PATH", help="Append every ingested report to a session recording")
+    parser.add_argument("--play", metavar="PATH", help="Show a session recording instead of receiving UDP")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed for --play; 0 is as fast as possible")
+    parser.add_argument("--start", type=float, help="Seconds into the recording to start --play at")
+    parser.add_argument("--smooth", type=float, nargs=2, metavar=("ALPHA", "BETA"),
+                        help="Alpha-beta smoothing of track positions before dead reckoning")
+    parser.add_argument("--port", type=parse_port, action="append",
+                        help="PORT or PORT:SCHEMA to listen on instead of 5005 and 5008, e.g. a radar_relay.py "
+                             "subscription; repeatable")
+    args, qt_args = parser.parse_known_args()
+    if args.latency and (args.ingest_processes or args.play):
+        # Stamps are read by this process's receiver; workers and recordings do not pass them on
+        parser.error("--latency cannot be combined with --ingest-processes or --play")
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    if args.latency:
+        latency_probe = LatencyProbe()
+    if args.port:
+        UDP_PORTS = dict(args.port)
+        receiver = ReceiverEngine()
+        for port, schema in UDP_PORTS.items():
+            receiver.add(port, make_decoder(port, schema), queue_block, udp_ip=UDP_IP)
+    if args.smooth:
+        track_table.smoothing = tuple(args.smooth)
+    try:
+        recording = Recording(args.play) if args.play else None
+        recorder = Recorder(args.record) if args.record else None
+    except (OSError, RecordingError) as e:
+        parser.error(str(e))
+    if recorder:
+        app.aboutToQuit.connect(recorder.close)
+    if recording:
+        # Stream the recording into the same hand-off queue the receivers use
+        player_thread = threading.Thread(target=play, args=(recording, ingest_queue.put),
+                                         kwargs={"speed": args.speed, "start": args.start}, daemon=True)
+        player_thread.start()
+    elif args.ingest_processes:
+        # Receive and decode in worker processes; the GUI only copies new rows out of shared memory
+        ingest_queue = ProcessIngest(UDP_PORTS, udp_ip=UDP_IP)
+        try:
+            ingest_queue.start()
+        except RuntimeError as e:
+            sys.exit(str(e))
+        app.aboutToQuit.connect(ingest_queue.stop)
+    else:
+        receiver.start()
+        app.aboutToQuit.connect(receiver.stop)
     radar_app = RadarDisplayApp()
     radar_app.show()
+    if isinstance(ingest_queue, ProcessIngest):
+        # A worker that dies later (e.g. killed) would otherwise just look like a silent feed
+        def check_workers():
+            failed = ingest_queue.failed()
+            if failed:
+                worker_check_timer.stop()
+                message = f"Ingest worker for port(s) {', '.join(map(str, failed))} exited; no more data from it"
+                print(message)
+                radar_app.statusBar().showMessage(message)
+        worker_check_timer = QTimer()
+        worker_check_timer.timeout.connect(check_workers)
+        worker_check_timer.start(1000)
+    if latency_probe:
+        app.aboutToQuit.connect(lambda: print(latency_probe.report()))
     sys.exit(app.exec_())
 
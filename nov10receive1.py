@@ -1,6 +1,4 @@
 import sys
-import socket
-import threading
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -12,10 +10,22 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 
+from radar_buffer import COLUMNS, RingBuffer, derive_block
+from radar_codec import SCHEMA_15, packets_to_block
+from radar_ingest import parse_datagram
+from radar_queue import BlockQueue
+from radar_receiver import ReceiverEngine
+from radar_tracks import TrackTable
+
 # UDP settings
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5005
-data_buffer = []
+BUFFER_CAPACITY = 100  # Keep only the latest 100 points
+data_buffer = RingBuffer(BUFFER_CAPACITY)  # Only touched on the GUI thread
+ingest_queue = BlockQueue()  # Receiver thread -> GUI thread hand-off
+track_table = TrackTable()  # Latest state and history per track_id, GUI thread only
+DISPLAY_TRACKS = 50  # Most recently updated tracks listed in the data panel
+INGEST_INTERVAL_MS = 50  # How often the GUI moves queued reports into data_buffer
 
 # CSS Styling
 CSS = """
@@ -41,46 +51,17 @@ QComboBox, QLineEdit, QTextEdit {
 }
 """
 
-# UDP Receiver Thread
-def udp_receiver():
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((UDP_IP, UDP_PORT))
-    while True:
-        data, _ = sock.recvfrom(1024)
-        parsed_data = parse_udp_data(data.decode("utf-8"))
-        if parsed_data:
-            data_buffer.append(parsed_data)
-            if len(data_buffer) > 100:  # Limit buffer size to the latest 100 points
-                data_buffer.pop(0)
+# Decoder for the receive engine, run on its loop thread: one batch of datagrams -> one raw block
+def decode_packets(packets):
+    return packets_to_block(packets, SCHEMA_15, parse_udp_data)
 
 def parse_udp_data(data):
-    try:
-        values = data.split(',')
-        x, y, z, xv, yv, zv, source, trk_no, types, time, latitude, longitude, altitude, speed, hdng = values
-        return {
-            "x": float(x),
-            "y": float(y),
-            "z": float(z),
-            "xv": float(xv),
-            "yv": float(yv),
-            "zv": float(zv),
-            "source": source,
-            "track_id": int(trk_no),
-            "type": types,
-            "time": float(time),
-            "latitude": float(latitude),
-            "longitude": float(longitude),
-            "altitude": float(altitude),
-            "speed": float(speed),
-            "heading": float(hdng)
-        }
-    except ValueError:
-        print("Invalid data format:", data)
-        return None
+    """ Decode one datagram into a list of reports (shared with the headless daemon, see radar_ingest.py). """
+    return parse_datagram(data, SCHEMA_15)
 
-# Start UDP receiver thread
-receiver_thread = threading.Thread(target=udp_receiver, daemon=True)
-receiver_thread.start()
+# UDP receive engine, started from __main__ so the module can be imported (e.g. by bench_radar.py)
+receiver = ReceiverEngine()
+receiver.add(UDP_PORT, decode_packets, ingest_queue.put, udp_ip=UDP_IP)
 
 class ConfigDialog(QDialog):
     def __init__(self, parent=None):
@@ -92,6 +73,7 @@ class ConfigDialog(QDialog):
         self.elevation_min = QLineEdit("0")
         self.elevation_max = QLineEdit("180")
         self.azimuthal_marking = QLineEdit("10")
+        self.buffer_capacity = QLineEdit(str(data_buffer.capacity))
 
         layout = QFormLayout()
         layout.addRow("Range Minimum:", self.range_min)
@@ -99,6 +81,7 @@ class ConfigDialog(QDialog):
         layout.addRow("Elevation Minimum:", self.elevation_min)
         layout.addRow("Elevation Maximum:", self.elevation_max)
         layout.addRow("Azimuthal Marking (PPI):", self.azimuthal_marking)
+        layout.addRow("Buffer Capacity:", self.buffer_capacity)
 
         self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         self.button_box.accepted.connect(self.accept)
@@ -114,7 +97,8 @@ class ConfigDialog(QDialog):
                 "range_max": int(self.range_max.text()),
                 "elevation_min": int(self.elevation_min.text()),
                 "elevation_max": int(self.elevation_max.text()),
-                "azimuthal_marking": int(self.azimuthal_marking.text())
+                "azimuthal_marking": int(self.azimuthal_marking.text()),
+                "buffer_capacity": int(self.buffer_capacity.text())
             }
         return None
 
@@ -187,19 +171,26 @@ class RadarDisplayApp(QMainWindow):
 
         # Default plot type and configuration settings
         self.plot_type = "PPI"
-        self.config = {"range_min": 0, "range_max": 100, "elevation_min": 0, "elevation_max": 180, "azimuthal_marking": 10}
+        self.config = {"range_min": 0, "range_max": 100, "elevation_min": 0, "elevation_max": 180, "azimuthal_marking": 10, "buffer_capacity": BUFFER_CAPACITY}
         self.setup_plot()
 
         # Timer for updating data display
+        self.displayed_serial = 0
         self.data_update_timer = QTimer()
         self.data_update_timer.timeout.connect(self.update_data_display)
         self.data_update_timer.start(500)  # Update every 500 ms
 
+        # Timer moving received reports into data_buffer on the GUI thread
+        self.ingest_timer = QTimer()
+        self.ingest_timer.timeout.connect(self.ingest_pending)
+        self.ingest_timer.start(INGEST_INTERVAL_MS)
+
     def configure_settings(self):
         dialog = ConfigDialog(self)
         settings = dialog.get_settings()
         if settings:
             self.config = settings
+            data_buffer.resize(settings["buffer_capacity"])
             self.setup_plot()
 
     def select_plot(self):
@@ -238,41 +229,55 @@ class RadarDisplayApp(QMainWindow):
 
     def update_ppi(self, _):
         if data_buffer:
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            azimuths = [np.arctan2(point["y"], point["x"]) for point in data_buffer]
+            ranges = data_buffer.column("ground_range")
+            azimuths = data_buffer.column("azimuth_rad")
             self.scatter_points.set_offsets(np.c_[azimuths, ranges])
         return self.scatter_points,
 
     def update_rhi(self, _):
         if data_buffer:
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            heights = [point["z"] for point in data_buffer]
+            ranges = data_buffer.column("ground_range")
+            heights = data_buffer.column("z")
             self.line.set_data(ranges, heights)
         return self.line,
 
     def update_bscope(self, _):
         if data_buffer:
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
+            azimuths = data_buffer.column("azimuth")
+            ranges = data_buffer.column("ground_range")
             self.scatter_points.set_offsets(np.c_[azimuths, ranges])
         return self.scatter_points,
 
+    def ingest_pending(self):
+        # Everything received since the last tick goes into the buffer in one append
+        block = ingest_queue.drain()
+        if block is not None:
+            block = derive_block(block)  # Derived once, shared by the buffer and the track table
+            data_buffer.append_block(block)
+            track_table.update_block(block)
+
     def update_data_display(self):
-        # Display the most recent data
-        if data_buffer:
-            latest_data = data_buffer[-1]
-            display_text = (
+        # Display the current picture: latest state of the most recently updated tracks
+        if track_table.serial == self.displayed_serial:
+            return  # Nothing new since the last refresh
+        self.displayed_serial = track_table.serial
+        lines = [f"Tracks: {len(track_table)}"]
+        for row in track_table.current(DISPLAY_TRACKS).T:
+            latest_data = dict(zip(COLUMNS, row))
+            lines.append(
                 f"X: {latest_data['x']:.2f}, Y: {latest_data['y']:.2f}, Z: {latest_data['z']:.2f}, "
-                f"Track ID: {latest_data['track_id']}, Time: {latest_data['time']}, "
+                f"Track ID: {latest_data['track_id']:.0f}, Time: {latest_data['time']}, "
                 f"Lat: {latest_data['latitude']}, Lon: {latest_data['longitude']}, "
                 f"Alt: {latest_data['altitude']}, Speed: {latest_data['speed']}, "
-                f"Heading: {latest_data['heading']}\n"
+                f"Heading: {latest_data['heading']}"
             )
-            self.data_display.append(display_text)
+        self.data_display.setPlainText("\n".join(lines))
 
 # Initialize the Qt Application and start the Radar Display App
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    receiver.start()
+    app.aboutToQuit.connect(receiver.stop)
     radar_app = RadarDisplayApp()
     radar_app.show()
     sys.exit(app.exec_())
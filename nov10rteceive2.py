@@ -1,6 +1,4 @@
 import sys
-import socket
-import threading
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -12,10 +10,22 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 
+from radar_buffer import COLUMNS, RingBuffer, derive_block
+from radar_codec import SCHEMA_15, packets_to_block
+from radar_ingest import parse_datagram
+from radar_queue import BlockQueue
+from radar_receiver import ReceiverEngine
+from radar_tracks import TrackTable
+
 # UDP settings
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5005
-data_buffer = []
+BUFFER_CAPACITY = 10000  # Reports kept for display (oldest are overwritten)
+data_buffer = RingBuffer(BUFFER_CAPACITY)  # Only touched on the GUI thread
+ingest_queue = BlockQueue()  # Receiver thread -> GUI thread hand-off
+track_table = TrackTable()  # Latest state and history per track_id, GUI thread only
+DISPLAY_TRACKS = 50  # Most recently updated tracks listed in the data panel
+INGEST_INTERVAL_MS = 50  # How often the GUI moves queued reports into data_buffer
 
 # CSS Styling
 CSS = """
@@ -41,44 +51,17 @@ QComboBox, QLineEdit, QTextEdit {
 }
 """
 
-# UDP Receiver Thread
-def udp_receiver():
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((UDP_IP, UDP_PORT))
-    while True:
-        data, _ = sock.recvfrom(1024)
-        parsed_data = parse_udp_data(data.decode("utf-8"))
-        if parsed_data:
-            data_buffer.append(parsed_data)
+# Decoder for the receive engine, run on its loop thread: one batch of datagrams -> one raw block
+def decode_packets(packets):
+    return packets_to_block(packets, SCHEMA_15, parse_udp_data)
 
 def parse_udp_data(data):
-    try:
-        values = data.split(',')
-        x, y, z, xv, yv, zv, source, trk_no, types, time, latitude, longitude, altitude, speed, hdng = values
-        return {
-            "x": float(x),
-            "y": float(y),
-            "z": float(z),
-            "xv": float(xv),
-            "yv": float(yv),
-            "zv": float(zv),
-            "source": source,
-            "track_id": int(trk_no),
-            "type": types,
-            "time": float(time),
-            "latitude": float(latitude),
-            "longitude": float(longitude),
-            "altitude": float(altitude),
-            "speed": float(speed),
-            "heading": float(hdng)
-        }
-    except ValueError:
-        print("Invalid data format:", data)
-        return None
+    """ Decode one datagram into a list of reports (shared with the headless daemon, see radar_ingest.py). """
+    return parse_datagram(data, SCHEMA_15)
 
-# Start UDP receiver thread
-receiver_thread = threading.Thread(target=udp_receiver, daemon=True)
-receiver_thread.start()
+# UDP receive engine, started from __main__ so the module can be imported (e.g. by bench_radar.py)
+receiver = ReceiverEngine()
+receiver.add(UDP_PORT, decode_packets, ingest_queue.put, udp_ip=UDP_IP)
 
 class ConfigDialog(QDialog):
     def __init__(self, parent=None):
@@ -90,6 +73,7 @@ class ConfigDialog(QDialog):
         self.elevation_min = QLineEdit("0")
         self.elevation_max = QLineEdit("180")
         self.azimuthal_marking = QLineEdit("10")
+        self.buffer_capacity = QLineEdit(str(data_buffer.capacity))
         self.time_max = QLineEdit("100")  # Added time_max for time-based plots
 
         layout = QFormLayout()
@@ -98,6 +82,7 @@ class ConfigDialog(QDialog):
         layout.addRow("Elevation Minimum:", self.elevation_min)
         layout.addRow("Elevation Maximum:", self.elevation_max)
         layout.addRow("Azimuthal Marking (PPI):", self.azimuthal_marking)
+        layout.addRow("Buffer Capacity:", self.buffer_capacity)
         layout.addRow("Time Maximum:", self.time_max)  # Added
 
         self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -115,7 +100,8 @@ class ConfigDialog(QDialog):
                 "elevation_min": int(self.elevation_min.text()),
                 "elevation_max": int(self.elevation_max.text()),
                 "azimuthal_marking": int(self.azimuthal_marking.text()),
-                "time_max": int(self.time_max.text())  # Added
+                "time_max": int(self.time_max.text()),  # Added
+                "buffer_capacity": int(self.buffer_capacity.text())
             }
         return None
 
@@ -184,19 +170,26 @@ class RadarDisplayApp(QMainWindow):
 
         # Default plot type and configuration settings
         self.plot_type = "PPI"
-        self.config = {"range_min": 0, "range_max": 100, "elevation_min": 0, "elevation_max": 180, "azimuthal_marking": 10, "time_max": 100}
+        self.config = {"range_min": 0, "range_max": 100, "elevation_min": 0, "elevation_max": 180, "azimuthal_marking": 10, "time_max": 100, "buffer_capacity": BUFFER_CAPACITY}
         self.setup_plot()
 
         # Timer for updating data display
+        self.displayed_serial = 0
         self.data_update_timer = QTimer()
         self.data_update_timer.timeout.connect(self.update_data_display)
         self.data_update_timer.start(500)  # Update every 500 ms
 
+        # Timer moving received reports into data_buffer on the GUI thread
+        self.ingest_timer = QTimer()
+        self.ingest_timer.timeout.connect(self.ingest_pending)
+        self.ingest_timer.start(INGEST_INTERVAL_MS)
+
     def configure_settings(self):
         dialog = ConfigDialog(self)
         settings = dialog.get_settings()
         if settings:
             self.config = settings
+            data_buffer.resize(settings["buffer_capacity"])
             self.setup_plot()
 
     def select_plot(self):
@@ -207,136 +200,158 @@ class RadarDisplayApp(QMainWindow):
             self.setup_plot()
 
     def setup_plot(self):
-        self.ax.clear()
+        # Stop the previous animation and start from an empty figure, so each mode
+        # builds its axes and artists exactly once and the ticks only update data
+        if getattr(self, "anim", None) is not None:
+            self.anim.event_source.stop()
+        self.fig.clf()
 
         if self.plot_type == "PPI":
             self.ax = self.fig.add_subplot(111, projection='polar', facecolor="black")
             self.ax.set_ylim(self.config["range_min"], self.config["range_max"])
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_ppi, frames=np.linspace(0, 2*np.pi, 100), interval=50, repeat=True)
+            self.ax.set_xlabel("Azimuth (°)")
+            self.ax.set_ylabel("Range")
+            self.points = self.ax.scatter([], [], color="lime", s=10, alpha=0.7)
+            self.sweep_line, = self.ax.plot([], [], color="lime", linewidth=2)
+            self.anim = FuncAnimation(self.fig, self.update_ppi, frames=np.linspace(0, 2*np.pi, 100),
+                                      interval=50, blit=True, repeat=True)
 
         elif self.plot_type == "RHI":
             self.ax = self.fig.add_subplot(111, facecolor="black")
             self.ax.set_xlim(self.config["range_min"], self.config["range_max"])
             self.ax.set_ylim(self.config["elevation_min"], self.config["elevation_max"])
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_rhi, interval=500)
+            self.ax.set_xlabel("Range")
+            self.ax.set_ylabel("Height")
+            self.points, = self.ax.plot([], [], 'o', color="lime", markersize=5, alpha=0.7)
+            self.anim = FuncAnimation(self.fig, self.update_rhi, interval=500, blit=True, cache_frame_data=False)
 
         elif self.plot_type == "B-Scope":
             self.ax = self.fig.add_subplot(111, facecolor="black")
             self.ax.set_xlim(-180, 180)
             self.ax.set_ylim(self.config["range_min"], self.config["range_max"])
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_bscope, interval=500)
+            self.ax.set_xlabel("Azimuth (°)")
+            self.ax.set_ylabel("Range")
+            self.points, = self.ax.plot([], [], 'o', color="lime", markersize=5, alpha=0.7)
+            self.anim = FuncAnimation(self.fig, self.update_bscope, interval=500, blit=True, cache_frame_data=False)
 
+        # C-Scope: Displays Range vs Azimuth
+        elif self.plot_type == "C-Scope":
+            self.ax = self.fig.add_subplot(111, facecolor="black")
+            self.ax.set_xlim(-180, 180)  # Azimuth range in degrees
+            self.ax.set_ylim(self.config["range_min"], self.config["range_max"])  # Range limits
+            self.ax.grid(color="blue", linestyle="--", linewidth=0.5)
+            self.ax.set_xlabel("Azimuth (°)")
+            self.ax.set_ylabel("Range")
+            self.points, = self.ax.plot([], [], 'o', color="cyan", markersize=5, alpha=0.7)
+            self.anim = FuncAnimation(self.fig, self.update_cscope, interval=500, blit=True, cache_frame_data=False)
+
+        # Time vs Azimuth
+        elif self.plot_type == "Time vs Azimuth":
+            self.ax = self.fig.add_subplot(111, facecolor="black")
+            self.ax.set_xlim(0, self.config["time_max"])  # Time limit
+            self.ax.set_ylim(-180, 180)  # Azimuth range in degrees
+            self.ax.grid(color="purple", linestyle="--", linewidth=0.5)
+            self.ax.set_xlabel("Time (s)")
+            self.ax.set_ylabel("Azimuth (°)")
+            self.points, = self.ax.plot([], [], 'o', color="magenta", markersize=5, alpha=0.7)
+            self.anim = FuncAnimation(self.fig, self.update_time_vs_azimuth, interval=500, blit=True, cache_frame_data=False)
+
+        # Time vs Range
         elif self.plot_type == "Time vs Range":
             self.ax = self.fig.add_subplot(111, facecolor="black")
-            self.ax.set_xlim(0, self.config["time_max"])
-            self.ax.set_ylim(self.config["range_min"], self.config["range_max"])
-            self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_time_vs_range, interval=500)
+            self.ax.set_xlim(0, self.config["time_max"])  # Time limit
+            self.ax.set_ylim(self.config["range_min"], self.config["range_max"])  # Range limits
+            self.ax.grid(color="cyan", linestyle="--", linewidth=0.5)
+            self.ax.set_xlabel("Time (s)")
+            self.ax.set_ylabel("Range")
+            self.points, = self.ax.plot([], [], 'o', color="aqua", markersize=5, alpha=0.7)
+            self.anim = FuncAnimation(self.fig, self.update_time_vs_range, interval=500, blit=True, cache_frame_data=False)
+
+        # Time vs Elevation
+        elif self.plot_type == "Time vs Elevation":
+            self.ax = self.fig.add_subplot(111, facecolor="black")
+            self.ax.set_xlim(0, self.config["time_max"])  # Time limit
+            self.ax.set_ylim(-90, 90)  # Elevation range in degrees
+            self.ax.grid(color="orange", linestyle="--", linewidth=0.5)
+            self.ax.set_xlabel("Time (s)")
+            self.ax.set_ylabel("Elevation (°)")
+            self.points, = self.ax.plot([], [], 'o', color="orange", markersize=5, alpha=0.7)
+            self.anim = FuncAnimation(self.fig, self.update_time_vs_elevation, interval=500, blit=True, cache_frame_data=False)
 
-        # Set default labels for all plots
-        self.ax.set_xlabel("Azimuth/Time")
-        self.ax.set_ylabel("Range/Elevation")
         self.canvas.draw()
 
+    # The update_* methods only push new data into the artists created by
+    # setup_plot and return them, so FuncAnimation can blit just those.
+
     def update_ppi(self, angle):
-        self.ax.clear()
-        self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-    
         if data_buffer:
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            azimuths = [np.arctan2(point["y"], point["x"]) for point in data_buffer]  # No need for np.radians(np.degrees(...))
-            self.ax.scatter(azimuths, ranges, color="lime", s=10, alpha=0.7)
-
-    # Set labels after clearing the axis
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
-    
-        return self.ax,
-
+            self.points.set_offsets(np.column_stack((data_buffer.column("azimuth_rad"), data_buffer.column("ground_range"))))
+        self.sweep_line.set_data([angle, angle], [self.config["range_min"], self.config["range_max"]])
+        return self.points, self.sweep_line
 
     def update_rhi(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="green", linestyle="--", linewidth=0.5)
         if data_buffer:
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            heights = [point["z"] for point in data_buffer]
-            self.ax.plot(ranges, heights, 'o', color="lime", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
+            self.points.set_data(data_buffer.column("ground_range"), data_buffer.column("z"))
+        return self.points,
 
     def update_bscope(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="green", linestyle="--", linewidth=0.5)
         if data_buffer:
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            self.ax.plot(azimuths, ranges, 'o', color="lime", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
-    
-    
+            self.points.set_data(data_buffer.column("azimuth"), data_buffer.column("ground_range"))
+        return self.points,
+
     def update_cscope(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="blue", linestyle="--", linewidth=0.5)
         if data_buffer:
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            self.ax.plot(azimuths, ranges, 'o', color="cyan", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Azimuth (°)")
-        self.ax.set_ylabel("Range")
+            self.points.set_data(data_buffer.column("azimuth"), data_buffer.column("ground_range"))
+        return self.points,
 
     def update_time_vs_azimuth(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="purple", linestyle="--", linewidth=0.5)
         if data_buffer:
-            times = [point["time"] for point in data_buffer]
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            self.ax.plot(times, azimuths, 'o', color="magenta", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Time (s)")
-        self.ax.set_ylabel("Azimuth (°)")        
-            
+            self.points.set_data(data_buffer.column("time"), data_buffer.column("azimuth"))
+        return self.points,
+
     def update_time_vs_range(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="cyan", linestyle="--", linewidth=0.5)
         if data_buffer:
-            times = [point["time"] for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            self.ax.plot(times, ranges, 'o', color="aqua", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Time (s)")
-        self.ax.set_ylabel("Range")     
-            
+            self.points.set_data(data_buffer.column("time"), data_buffer.column("ground_range"))
+        return self.points,
+
     def update_time_vs_elevation(self, frame):
-        self.ax.clear()
-        self.ax.grid(color="orange", linestyle="--", linewidth=0.5)
         if data_buffer:
-            times = [point["time"] for point in data_buffer]
-            elevations = [np.degrees(np.arcsin(point["z"] / np.sqrt(point["x"]**2 + point["y"]**2 + point["z"]**2))) for point in data_buffer]
-            self.ax.plot(times, elevations, 'o', color="orange", markersize=5, alpha=0.7)
-        self.ax.set_xlabel("Time (s)")
-        self.ax.set_ylabel("Elevation (°)")
+            self.points.set_data(data_buffer.column("time"), data_buffer.column("elevation"))
+        return self.points,
 
-
-    
+    def ingest_pending(self):
+        # Everything received since the last tick goes into the buffer in one append
+        block = ingest_queue.drain()
+        if block is not None:
+            block = derive_block(block)  # Derived once, shared by the buffer and the track table
+            data_buffer.append_block(block)
+            track_table.update_block(block)
 
     def update_data_display(self):
-        # Display the most recent data
-        if data_buffer:
-            latest_data = data_buffer[-1]
-            display_text = (
+        # Display the current picture: latest state of the most recently updated tracks
+        if track_table.serial == self.displayed_serial:
+            return  # Nothing new since the last refresh
+        self.displayed_serial = track_table.serial
+        lines = [f"Tracks: {len(track_table)}"]
+        for row in track_table.current(DISPLAY_TRACKS).T:
+            latest_data = dict(zip(COLUMNS, row))
+            lines.append(
                 f"X: {latest_data['x']:.2f}, Y: {latest_data['y']:.2f}, Z: {latest_data['z']:.2f}, "
-                f"Track ID: {latest_data['track_id']}, Time: {latest_data['time']}, "
+                f"Track ID: {latest_data['track_id']:.0f}, Time: {latest_data['time']}, "
                 f"Lat: {latest_data['latitude']}, Lon: {latest_data['longitude']}, "
                 f"Alt: {latest_data['altitude']}, Speed: {latest_data['speed']}, "
-                f"Heading: {latest_data['heading']}\n"
+                f"Heading: {latest_data['heading']}"
             )
-            self.data_display.append(display_text)
+        self.data_display.setPlainText("\n".join(lines))
 
 # Initialize the Qt Application and start the Radar Display App
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    receiver.start()
+    app.aboutToQuit.connect(receiver.stop)
     radar_app = RadarDisplayApp()
     radar_app.show()
     sys.exit(app.exec_())
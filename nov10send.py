@@ -1,6 +1,9 @@
+import sys
 import socket
 import time
 
+from radar_codec import SCHEMA_15, encode_15, encode_batches, pack_15
+
 UDP_IP = "127.0.0.1"  # The IP address of the radar display application
 UDP_PORT = 5005       # The port on which the radar display app is listening
 
@@ -16,10 +19,17 @@ sample_data = [
 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
 try:
-    # Send each data entry every 2 seconds
-    for data in sample_data:
-        print(f"Sending data: {data}")
-        sock.sendto(data.encode('utf-8'), (UDP_IP, UDP_PORT))
-        time.sleep(2)
+    if "--batch" in sys.argv:
+        # Send all entries as one scan, packed into as few datagrams as possible
+        records = [pack_15(*data.split(',')) for data in sample_data]
+        for datagram in encode_batches(SCHEMA_15, records):
+            print(f"Sending batch: {len(datagram)} bytes")
+            sock.sendto(datagram, (UDP_IP, UDP_PORT))
+    else:
+        # Send each data entry every 2 seconds
+        for data in sample_data:
+            print(f"Sending data: {data}")
+            sock.sendto(encode_15(*data.split(',')), (UDP_IP, UDP_PORT))
+            time.sleep(2)
 finally:
     sock.close()
@@ -0,0 +1,160 @@
+import numpy as np
+
+DEFAULT_CAPACITY = 10000
+
+# One float64 column per report field. source/type are stored as their
+# radar_codec enum codes; fields missing from a schema are stored as NaN.
+# `feed` is not on the wire: receivers that merge several feeds tag each
+# report with the port it arrived on (see radar_ingest.feed_decoder).
+RAW_COLUMNS = ("x", "y", "z", "xv", "yv", "zv", "source", "track_id", "type", "time",
+               "latitude", "longitude", "altitude", "speed", "heading", "feed")
+# Polar quantities computed once per report at ingest (see derive_block).
+# Angles are in degrees, except azimuth_rad which feeds the polar PPI axes.
+DERIVED_COLUMNS = ("ground_range", "slant_range", "azimuth", "azimuth_rad", "elevation")
+COLUMNS = RAW_COLUMNS + DERIVED_COLUMNS
+COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+
+
+def derive_block(block):
+    """ Extend a raw (len(RAW_COLUMNS), n) block with the DERIVED_COLUMNS rows; full blocks are returned as is. """
+    if block.shape[0] == len(COLUMNS):
+        return block
+    x, y, z = block[COLUMN_INDEX["x"]], block[COLUMN_INDEX["y"]], block[COLUMN_INDEX["z"]]
+    ground_range = np.hypot(x, y)
+    azimuth_rad = np.arctan2(y, x)
+    derived = np.empty((len(DERIVED_COLUMNS), block.shape[1]))
+    derived[0] = ground_range
+    derived[1] = np.hypot(ground_range, z)
+    derived[2] = np.degrees(azimuth_rad)
+    derived[3] = azimuth_rad
+    derived[4] = np.degrees(np.arctan2(z, ground_range))  # Same as arcsin(z / slant), but safe at the origin
+    return np.concatenate((block, derived))
+
+
+def row_cutoffs(groups, cutoffs, default=-np.inf):
+    """
+    Per-row values for the `by` arguments of the stores' methods: `cutoffs`
+    maps values of the grouping column (None for NaN) to a value; rows of
+    any other group get `default` (for discard_before: -inf, i.e. kept).
+    """
+    out = np.full(len(groups), default)
+    for group, cutoff in cutoffs.items():
+        out[np.isnan(groups) if group is None else groups == group] = cutoff
+    return out
+
+
+def newest_per_feed(block):
+    """ {feed (None for untagged reports): newest `time`} over the reports of a block that carry a time. """
+    feeds, times = block[COLUMN_INDEX["feed"]], block[COLUMN_INDEX["time"]]
+    newest = {}
+    for feed in np.unique(feeds).tolist():
+        feed_times = times[np.isnan(feeds) if np.isnan(feed) else feeds == feed]
+        if not np.isnan(feed_times).all():
+            newest[None if np.isnan(feed) else feed] = float(np.nanmax(feed_times))
+    return newest
+
+
+class RingBuffer:
+    """
+    Fixed-capacity columnar store for track reports.
+
+    Every row is written twice, at `i` and `i + capacity`, so the newest
+    `n` rows are always one contiguous slice and `last` / `column` can
+    return views without copying.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = np.full((len(COLUMNS), 2 * capacity), np.nan)
+        self._head = 0   # next write position in [0, capacity)
+        self._size = 0
+        self.total = 0   # reports ever appended
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def append_block(self, block):
+        """
+        Append a raw (len(RAW_COLUMNS), n) block, or a full block that already
+        carries the derived columns; only the newest `capacity` rows are kept.
+        """
+        n = block.shape[1]
+        if n == 0:
+            return
+        self.total += n
+        if n > self.capacity:
+            block = block[:, -self.capacity:]
+            n = self.capacity
+        if block.shape[0] == len(RAW_COLUMNS):
+            block = derive_block(block)
+        idx = (self._head + np.arange(n)) % self.capacity
+        self._data[:, idx] = block
+        self._data[:, idx + self.capacity] = block
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def last(self, n=None):
+        """ View of the newest `n` rows (all rows if None), shape (len(COLUMNS), n), oldest first. """
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        return self._data[:, end - n:end]
+
+    def column(self, name, n=None):
+        return self.last(n)[COLUMN_INDEX[name]]
+
+    def latest(self):
+        """ The newest report as a dict of floats, or None when empty. """
+        if not self._size:
+            return None
+        row = self.last(1)[:, 0]
+        return {name: row[i] for i, name in enumerate(COLUMNS)}
+
+    def discard_before(self, name, cutoff, by=None):
+        """
+        Drop the oldest rows while their `name` column is below `cutoff`,
+        stopping at the first row that is not (late, out-of-order rows wait
+        for their turn). With `by`, `cutoff` is a dict of cutoffs per value
+        of that column (see row_cutoffs). Scans about as many rows as it
+        drops, so the cost is amortized O(1) per appended row. Returns the
+        number dropped.
+        """
+        column = self.column(name)
+        groups = None if by is None else self.column(by)
+        dropped = 0
+        chunk = 256
+        while dropped < len(column):
+            part = column[dropped:dropped + chunk]
+            limit = cutoff if groups is None else row_cutoffs(groups[dropped:dropped + chunk], cutoff)
+            newer = np.flatnonzero(~(part < limit))
+            if len(newer):
+                dropped += int(newer[0])
+                break
+            dropped += len(part)
+            chunk *= 2
+        self._size -= dropped
+        return dropped
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def resize(self, capacity):
+        """ Change the capacity, keeping the newest rows that still fit. """
+        if capacity == self.capacity:
+            return
+        kept = self.last(min(self._size, capacity)).copy()
+        total = self.total
+        self._allocate(capacity)
+        self.append_block(kept)
+        self.total = total
+
+    def clear(self):
+        self._allocate(self.capacity)
@@ -0,0 +1,294 @@
+import struct
+import time
+
+import numpy as np
+
+from radar_buffer import COLUMN_INDEX, RAW_COLUMNS
+
+# Binary wire format shared by the senders and receivers.
+#
+# Every datagram starts with a fixed header followed by `count` fixed-size
+# records of one schema:
+#
+#   header:  magic (2s) | version (B) | schema (B) | count (H)
+#   SCHEMA_15 record (send.py / nov10send.py -> nov10receive.py, port 5005):
+#       x, y, z, xv, yv, zv (f) | source (B) | trk_no (I) | types (B) |
+#       time (d) | latitude, longitude (d) | altitude, speed, heading (f)
+#   SCHEMA_10 record (send2.py -> receive6.py, port 5008):
+#       x, y, z (f) | trk_no (I) | time (d) |
+#       latitude, longitude (d) | altitude, speed, heading (f)
+#
+# All values are little-endian. `source` and `types` are sent as enum codes
+# (see SOURCES / TYPES); unknown names are sent as code 0.
+#
+# Latency measurement (opt-in): when the schema byte carries the STAMPED flag,
+# the records are followed by one stamp per record:
+#   seq (I) | send time (d, time.monotonic() of the sender, loopback only)
+#
+# Receivers still accept the original comma-separated text datagrams: one
+# report per datagram, fields in wire order (see decode_text).
+#
+# Batches are encoded and decoded as NumPy structured arrays of
+# RECORD_DTYPES[schema] (encode_records / decode_records), and converted to
+# and from the radar_buffer column layout without per-report objects
+# (records_to_block / block_to_records, decode_block, packets_to_block).
+
+MAGIC = b"RD"
+WIRE_VERSION = 1
+
+SCHEMA_15 = 15
+SCHEMA_10 = 10
+
+# Largest datagram the batching helpers build: an Ethernet MTU minus IP/UDP headers,
+# so batches are never fragmented. Loopback-only setups can pass a larger size.
+MAX_DATAGRAM = 1472
+
+HEADER = struct.Struct("<2sBBH")
+STAMP = struct.Struct("<Id")
+STAMP_DTYPE = np.dtype([("seq", "<u4"), ("send_time", "<f8")])
+STAMPED = 0x80
+RECORDS = {
+    SCHEMA_15: struct.Struct("<6fBIBd2d3f"),
+    SCHEMA_10: struct.Struct("<3fId2d3f"),
+}
+# The same record layouts, field for field, as NumPy dtypes
+RECORD_DTYPES = {
+    SCHEMA_15: np.dtype([("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("xv", "<f4"), ("yv", "<f4"), ("zv", "<f4"),
+                         ("source", "u1"), ("track_id", "<u4"), ("type", "u1"), ("time", "<f8"),
+                         ("latitude", "<f8"), ("longitude", "<f8"),
+                         ("altitude", "<f4"), ("speed", "<f4"), ("heading", "<f4")]),
+    SCHEMA_10: np.dtype([("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("track_id", "<u4"), ("time", "<f8"),
+                         ("latitude", "<f8"), ("longitude", "<f8"),
+                         ("altitude", "<f4"), ("speed", "<f4"), ("heading", "<f4")]),
+}
+
+# Field names of the decoded records, in wire order
+FIELDS = {schema: dtype.names for schema, dtype in RECORD_DTYPES.items()}
+
+# Enum tables for the string fields; append new names, never reorder
+SOURCES = ("Unknown", "Radar", "Radar1", "Radar2", "Radar3", "Radar4")
+TYPES = ("Unknown", "TypeA", "Aircraft", "Helicopter", "Drone")
+
+_SOURCE_CODES = {name: code for code, name in enumerate(SOURCES)}
+_TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def source_code(name):
+    return _SOURCE_CODES.get(name, 0)
+
+
+def type_code(name):
+    return _TYPE_CODES.get(name, 0)
+
+
+def is_binary(packet):
+    return packet[:2] == MAGIC
+
+
+def is_stamped(packet):
+    return len(packet) > 3 and packet[:2] == MAGIC and bool(packet[3] & STAMPED)
+
+
+def pack_15(x, y, z, xv, yv, zv, source, trk_no, types, time, latitude, longitude, altitude, speed, hdng):
+    """ Pack one 15-field report (without header). Numeric fields may be strings, as read from CSV. """
+    return RECORDS[SCHEMA_15].pack(
+        float(x), float(y), float(z), float(xv), float(yv), float(zv),
+        source_code(source), int(float(trk_no)), type_code(types), float(time),
+        float(latitude), float(longitude), float(altitude), float(speed), float(hdng)
+    )
+
+
+def encode_packet(schema, records, seq=None):
+    """
+    Build a datagram from already packed records of one schema. With a `seq`,
+    the records are stamped with seq, seq + 1, ... and the current monotonic time.
+    """
+    if seq is None:
+        return HEADER.pack(MAGIC, WIRE_VERSION, schema, len(records)) + b"".join(records)
+    now = time.monotonic()
+    stamps = b"".join(STAMP.pack((seq + i) & 0xFFFFFFFF, now) for i in range(len(records)))
+    return HEADER.pack(MAGIC, WIRE_VERSION, schema | STAMPED, len(records)) + b"".join(records) + stamps
+
+
+def records_per_datagram(schema, max_size=MAX_DATAGRAM, stamped=False):
+    record_size = RECORDS[schema].size + (STAMP.size if stamped else 0)
+    return min((max_size - HEADER.size) // record_size, 0xFFFF)
+
+
+def encode_batches(schema, records, max_size=MAX_DATAGRAM):
+    """ Yield datagrams packing as many of the packed `records` as fit into `max_size` bytes. """
+    per_datagram = records_per_datagram(schema, max_size)
+    for start in range(0, len(records), per_datagram):
+        yield encode_packet(schema, records[start:start + per_datagram])
+
+
+def encode_15(*fields):
+    return encode_packet(SCHEMA_15, [pack_15(*fields)])
+
+
+def encode_records(schema, records, max_size=MAX_DATAGRAM, seq=None):
+    """
+    Split a structured array of RECORD_DTYPES[schema] into datagrams, without
+    packing per report. With a `seq`, records are stamped as by encode_packet.
+    """
+    payload = records.tobytes()
+    record_size = RECORD_DTYPES[schema].itemsize
+    per_datagram = records_per_datagram(schema, max_size, stamped=seq is not None)
+    if seq is not None:
+        stamps = np.empty(len(records), dtype=STAMP_DTYPE)
+        stamps["seq"] = (seq + np.arange(len(records))) & 0xFFFFFFFF
+        stamps["send_time"] = time.monotonic()
+    datagrams = []
+    for start in range(0, len(records), per_datagram):
+        count = min(per_datagram, len(records) - start)
+        datagram = payload[start * record_size:(start + count) * record_size]
+        if seq is None:
+            datagram = HEADER.pack(MAGIC, WIRE_VERSION, schema, count) + datagram
+        else:
+            datagram = (HEADER.pack(MAGIC, WIRE_VERSION, schema | STAMPED, count) + datagram
+                        + stamps[start:start + count].tobytes())
+        datagrams.append(datagram)
+    return datagrams
+
+
+def decode_header(packet):
+    """ Validate the header and return (schema, count). """
+    if len(packet) < HEADER.size:
+        raise WireFormatError(f"short packet ({len(packet)} bytes)")
+    magic, version, schema, count = HEADER.unpack_from(packet)
+    if magic != MAGIC:
+        raise WireFormatError("bad magic")
+    if version != WIRE_VERSION:
+        raise WireFormatError(f"unsupported wire version {version}")
+    stamp_size = STAMP.size if schema & STAMPED else 0
+    schema &= ~STAMPED
+    record = RECORDS.get(schema)
+    if record is None:
+        raise WireFormatError(f"unknown schema {schema}")
+    if len(packet) != HEADER.size + count * (record.size + stamp_size):
+        raise WireFormatError(f"length {len(packet)} does not match {count} records of schema {schema}")
+    return schema, count
+
+
+def decode_tuples(packet):
+    """ Decode a datagram into (schema, list of raw record tuples in wire order). """
+    schema, count = decode_header(packet)
+    end = HEADER.size + count * RECORDS[schema].size
+    return schema, list(RECORDS[schema].iter_unpack(memoryview(packet)[HEADER.size:end]))
+
+
+def decode_records(packet):
+    """ Decode a datagram into (schema, read-only structured array of RECORD_DTYPES[schema]) without copying. """
+    schema, count = decode_header(packet)
+    return schema, np.frombuffer(packet, dtype=RECORD_DTYPES[schema], count=count, offset=HEADER.size)
+
+
+def decode_stamps(packet):
+    """ (seq, send time) per record of a stamped datagram; empty for unstamped ones. """
+    if not is_stamped(packet):
+        return []
+    schema, count = decode_header(packet)
+    start = HEADER.size + count * RECORDS[schema].size
+    return list(STAMP.iter_unpack(memoryview(packet)[start:]))
+
+
+def decode_packet(packet):
+    """ Decode a datagram into (schema, list of report dicts) keyed like parse_udp_data. """
+    schema, rows = decode_tuples(packet)
+    names = FIELDS[schema]
+    reports = [dict(zip(names, row)) for row in rows]
+    if schema == SCHEMA_15:
+        for report in reports:
+            report["source"] = SOURCES[report["source"]] if report["source"] < len(SOURCES) else SOURCES[0]
+            report["type"] = TYPES[report["type"]] if report["type"] < len(TYPES) else TYPES[0]
+    return schema, reports
+
+
+def decode_text(packet, schema):
+    """ Decode one legacy comma-separated text datagram of `schema` into a report dict. """
+    try:
+        values = packet.decode("utf-8").split(",")
+        if len(values) != len(FIELDS[schema]):
+            raise WireFormatError(f"expected {len(FIELDS[schema])} text fields, got {len(values)}")
+        report = {}
+        for name, value in zip(FIELDS[schema], values):
+            if name in ("source", "type"):
+                report[name] = value
+            elif name == "track_id":
+                report[name] = int(float(value))
+            else:
+                report[name] = float(value)
+        return report
+    except WireFormatError:
+        raise
+    except ValueError as e:
+        raise WireFormatError(f"invalid text report: {e}")
+
+
+def reports_to_block(reports):
+    """ Convert a list of report dicts into a (len(RAW_COLUMNS), n) float64 block. """
+    rows = []
+    for report in reports:
+        row = [report.get(name, np.nan) for name in RAW_COLUMNS]
+        source = row[COLUMN_INDEX["source"]]
+        if isinstance(source, str):
+            row[COLUMN_INDEX["source"]] = source_code(source)
+        types = row[COLUMN_INDEX["type"]]
+        if isinstance(types, str):
+            row[COLUMN_INDEX["type"]] = type_code(types)
+        rows.append(row)
+    return np.array(rows, dtype=np.float64).reshape(len(rows), len(RAW_COLUMNS)).T
+
+
+def records_to_block(schema, records):
+    """ Convert a structured array of RECORD_DTYPES[schema] into a raw (len(RAW_COLUMNS), n) block. """
+    block = np.full((len(RAW_COLUMNS), len(records)), np.nan)
+    for name in FIELDS[schema]:
+        block[COLUMN_INDEX[name]] = records[name]
+    return block
+
+
+def block_to_records(schema, block):
+    """ Inverse of records_to_block: the fields of `schema` as a structured array of RECORD_DTYPES[schema]. """
+    records = np.zeros(block.shape[1], dtype=RECORD_DTYPES[schema])
+    for name in FIELDS[schema]:
+        column = block[COLUMN_INDEX[name]]
+        records[name] = np.nan_to_num(column) if records.dtype[name].kind in "ui" else column
+    return records
+
+
+def decode_block(packet):
+    """ Decode a binary datagram straight into (schema, block) without building per-report objects. """
+    schema, records = decode_records(packet)
+    return schema, records_to_block(schema, records)
+
+
+def packets_to_block(packets, schema, parse_text):
+    """
+    Decode a batch of datagrams of the expected `schema` (any schema if None)
+    into one block. Non-binary datagrams are handed to `parse_text`, which
+    returns report dicts.
+    """
+    blocks = []
+    for packet in packets:
+        if not is_binary(packet):
+            reports = parse_text(packet)
+            if reports:
+                blocks.append(reports_to_block(reports))
+            continue
+        try:
+            packet_schema, block = decode_block(packet)
+        except WireFormatError as e:
+            print("Invalid packet:", e)
+            continue
+        if schema is not None and packet_schema != schema:
+            print("Unexpected schema:", packet_schema)
+            continue
+        blocks.append(block)
+    if not blocks:
+        return np.empty((len(RAW_COLUMNS), 0))
+    return blocks[0] if len(blocks) == 1 else np.concatenate(blocks, axis=1)
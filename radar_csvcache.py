@@ -0,0 +1,251 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+from itertools import islice
+
+import numpy as np
+
+from radar_codec import RECORD_DTYPES
+
+# Columnar cache of the senders' CSV files.
+#
+#   radar_data.csv             the source, as exported
+#   radar_data.csv.cache.npy   one structured row per CSV row, a field per CSV
+#                              column (float64 when numeric, else text); the
+#                              .npy header carries the dtype, i.e. the schema
+#   radar_data.csv.cache.json  what the cache was built from: size, mtime and
+#                              SHA-256 of the CSV, header, row count
+#
+# Column types and text widths are inferred from the first CHUNK_ROWS rows,
+# where odd values in a numeric column become NaN (counted as bad values).
+# Past those rows a value that is not a number in a numeric column is an
+# error, and text longer than its column is cut, with a warning.
+#
+# The CSV is parsed once; after that the cache is memory-mapped, so even a
+# multi-gigabyte file opens at once and is read only as it is sent. The cache
+# is reused while the CSV's size and mtime match; if only the mtime changed
+# (e.g. a fresh copy of the same file) the hash decides.
+#
+#   python radar_csvcache.py radar_data.csv            # build (or check) ahead of time
+#   python radar_csvcache.py radar_data.csv --rebuild
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".cache.npy"
+META_SUFFIX = ".cache.json"
+CHUNK_ROWS = 65536  # Rows parsed or sent at a time; the first chunk also decides the column types
+TEXT_WIDTH = 32     # Characters kept of non-numeric columns at least
+
+
+class CsvCacheError(ValueError):
+    pass
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _csv_rows(f):
+    reader = csv.reader(f)
+    header = next(reader, None)
+    return header, (row for row in reader if row)  # Blank lines are not rows
+
+
+def _check_header(csv_path, header):
+    if not header:
+        raise CsvCacheError(f"{csv_path}: no header row")
+    for i, name in enumerate(header):
+        if not name:
+            raise CsvCacheError(f"{csv_path}: column {i + 1} has no name")
+        if name in header[:i]:
+            raise CsvCacheError(f"{csv_path}: column {name!r} appears more than once")
+
+
+def _infer_dtype(header, rows):
+    """
+    float64 for the columns where most values in `rows` are numbers (the
+    others become NaN), text as wide as the longest value for the rest.
+    """
+    fields = []
+    for i, name in enumerate(header):
+        numbers = texts = 0
+        width = TEXT_WIDTH
+        for row in rows:
+            if i < len(row) and row[i] != "":
+                width = max(width, len(row[i]))
+                try:
+                    float(row[i])
+                    numbers += 1
+                except ValueError:
+                    texts += 1
+        fields.append((name, "<f8" if numbers >= texts else f"<U{width}"))
+    return np.dtype(fields)
+
+
+def _fill(out, header, rows, first_row, cut):
+    """
+    Parse `rows` (data rows first_row, first_row + 1, ..., counted from 1)
+    into the structured array `out`. Past the first chunk a value that is
+    not a number in a numeric column raises CsvCacheError. Text too long
+    for its column is cut; `cut` collects the longest per column. Returns
+    the number of values that were not numbers.
+    """
+    bad = 0
+    for i, name in enumerate(header):
+        values = [row[i] if i < len(row) else "" for row in rows]
+        if out.dtype[name].kind != "f":
+            longest = max(map(len, values), default=0)
+            if longest > out.dtype[name].itemsize // 4:  # 4 bytes per character
+                cut[name] = max(cut.get(name, 0), longest)
+            out[name] = values
+            continue
+        try:
+            out[name] = np.array(values, dtype=np.float64)
+        except ValueError:
+            # Empty or malformed values become NaN, one column at a time
+            parsed = np.full(len(values), np.nan)
+            for j, value in enumerate(values):
+                try:
+                    parsed[j] = float(value)
+                except ValueError:
+                    if value and first_row > CHUNK_ROWS:
+                        raise CsvCacheError(f"data row {first_row + j}, column {name!r}: {value!r} is not a number, "
+                                            f"but the first {CHUNK_ROWS} rows made the column numeric")
+                    bad += value != ""
+            out[name] = parsed
+    return bad
+
+
+def build_cache(csv_path):
+    """ Parse `csv_path` into its cache files. Returns the metadata written. """
+    stat = os.stat(csv_path)
+    with open(csv_path, newline="") as f:
+        header, rows = _csv_rows(f)
+        _check_header(csv_path, header)
+        count = sum(1 for _ in rows)
+    with open(csv_path, newline="") as f:
+        header, rows = _csv_rows(f)
+        chunk = list(islice(rows, CHUNK_ROWS))
+        cache_path = csv_path + CACHE_SUFFIX
+        partial = cache_path + ".partial"
+        out = np.lib.format.open_memmap(partial, mode="w+", dtype=_infer_dtype(header, chunk), shape=(count,))
+        start = bad = 0
+        cut = {}
+        try:
+            while chunk:
+                bad += _fill(out[start:start + len(chunk)], header, chunk, start + 1, cut)
+                start += len(chunk)
+                chunk = list(islice(rows, CHUNK_ROWS))
+        except CsvCacheError as e:
+            del out
+            os.remove(partial)
+            raise CsvCacheError(f"{csv_path}: {e}")
+        out.flush()
+        dtype = out.dtype
+        del out
+    os.replace(partial, cache_path)
+    for name, longest in cut.items():
+        print(f"Warning: {csv_path}: text in column {name!r} cut to {dtype[name].itemsize // 4} characters "
+              f"(longest {longest})")
+    meta = {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "sha256": _sha256(csv_path), "columns": header, "rows": count, "bad_values": bad}
+    _write_meta(csv_path, meta)
+    return meta
+
+
+def _read_meta(csv_path):
+    try:
+        with open(csv_path + META_SUFFIX) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION or not os.path.exists(csv_path + CACHE_SUFFIX):
+        return None
+    return meta
+
+
+def _write_meta(csv_path, meta):
+    partial = csv_path + META_SUFFIX + ".partial"
+    with open(partial, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(partial, csv_path + META_SUFFIX)
+
+
+def _cached_meta(csv_path):
+    """ Metadata of a cache that still matches the CSV, or None. """
+    meta = _read_meta(csv_path)
+    if meta is None:
+        return None
+    stat = os.stat(csv_path)
+    if (meta["size"], meta["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+        return meta
+    if meta["size"] != stat.st_size or meta["sha256"] != _sha256(csv_path):
+        return None
+    meta["mtime_ns"] = stat.st_mtime_ns  # Same content, newer timestamp: no need to hash again next time
+    _write_meta(csv_path, meta)
+    return meta
+
+
+def _check_columns(csv_path, header, columns):
+    missing = [name for name in columns if name not in header]
+    if missing:
+        raise CsvCacheError(f"{csv_path}: missing column(s) {', '.join(missing)}")
+
+
+def load_csv(csv_path, columns=(), rebuild=False):
+    """
+    The rows of `csv_path` as a read-only memory-mapped structured array,
+    building the cache first if it is missing or stale. `columns` are the
+    CSV columns the caller needs, all numeric; they are checked before
+    anything is parsed, and again against the cached types.
+    """
+    meta = None if rebuild else _cached_meta(csv_path)
+    if meta is None:
+        with open(csv_path, newline="") as f:
+            header = next(csv.reader(f), [])
+        _check_columns(csv_path, header, columns)
+        meta = build_cache(csv_path)
+    _check_columns(csv_path, meta["columns"], columns)
+    rows = np.load(csv_path + CACHE_SUFFIX, mmap_mode="r")
+    text = [name for name in columns if rows.dtype[name].kind != "f"]
+    if text:
+        raise CsvCacheError(f"{csv_path}: column(s) {', '.join(text)} should be numeric")
+    return rows
+
+
+def csv_records(rows, schema, columns, values=None):
+    """
+    Wire records of `schema` (structured array of RECORD_DTYPES[schema])
+    from cached CSV rows: `columns` maps record fields to CSV columns,
+    `values` fields to constants. Rows missing any mapped value are left
+    out. Returns (records, number of rows left out).
+    """
+    valid = np.ones(len(rows), dtype=bool)
+    for column in columns.values():
+        valid &= ~np.isnan(rows[column])
+    records = np.zeros(int(valid.sum()), dtype=RECORD_DTYPES[schema])
+    for field, column in columns.items():
+        records[field] = rows[column][valid]
+    for field, value in (values or {}).items():
+        records[field] = value
+    return records, len(rows) - len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the columnar cache of a sender CSV file")
+    parser.add_argument("csv_file_path", nargs="?", default="radar_data.csv")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the cache is up to date")
+    args = parser.parse_args()
+
+    try:
+        rows = load_csv(args.csv_file_path, rebuild=args.rebuild)
+    except CsvCacheError as e:
+        parser.error(str(e))
+    meta = _read_meta(args.csv_file_path)
+    print(f"{args.csv_file_path + CACHE_SUFFIX}: {len(rows)} rows, {meta['bad_values']} invalid value(s)")
+    print(", ".join(f"{name} ({rows.dtype[name]})" for name in rows.dtype.names))
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+
+from radar_buffer import COLUMN_INDEX, DEFAULT_CAPACITY, RingBuffer, derive_block
+from radar_codec import (FIELDS, SCHEMA_10, SCHEMA_15, WireFormatError, decode_packet, decode_text, is_binary,
+                         packets_to_block)
+from radar_receiver import ReceiverEngine
+from radar_record import Recorder, RecordingError
+from radar_tracks import TrackTable
+
+# GUI-free ingest shared by the receivers, and a headless ingest-and-record
+# daemon built on it. Nothing here imports Qt or matplotlib.
+#
+#   python radar_ingest.py                              # both feeds, stats every 5 s
+#   python radar_ingest.py --record session             # also writes session_5005.rdr / session_5008.rdr
+#   python radar_ingest.py --port 5005:15 --stats-file stats.json
+
+UDP_IP = "127.0.0.1"
+FEEDS = {5005: SCHEMA_15, 5008: SCHEMA_10}  # Port -> schema: send.py / nov10send.py and send2.py
+TEXT_SCHEMAS = {len(fields): schema for schema, fields in FIELDS.items()}  # Text field count -> schema
+FEED = COLUMN_INDEX["feed"]
+STATS_INTERVAL = 5.0
+
+
+def parse_datagram(data, schema=None):
+    """
+    Decode one datagram of `schema` into a list of reports. Plain-text CSV
+    datagrams are still accepted. With schema None any schema is accepted,
+    taken from the binary header or from the number of text fields.
+    """
+    if is_binary(data):
+        try:
+            packet_schema, reports = decode_packet(data)
+        except WireFormatError as e:
+            print("Invalid packet:", e)
+            return []
+        if schema is not None and packet_schema != schema:
+            print("Unexpected schema:", packet_schema)
+            return []
+        return reports
+    try:
+        text_schema = schema if schema is not None else TEXT_SCHEMAS.get(data.count(b",") + 1, SCHEMA_15)
+        return [decode_text(data, text_schema)]
+    except WireFormatError:
+        print("Invalid data format:", data)
+        return []
+
+
+def feed_decoder(feed, schema=None):
+    """
+    ReceiverEngine decoder for one port: a batch of datagrams -> one raw
+    block with every report tagged with `feed` (normally the port number).
+    """
+    def parse_text(data):
+        return parse_datagram(data, schema)
+
+    def decode(packets):
+        block = packets_to_block(packets, schema, parse_text)
+        block[FEED] = feed
+        return block
+    return decode
+
+
+class Feed:
+    """
+    Ingest for one port: decoded batches go into a RingBuffer and a
+    TrackTable, and to a Recorder when given. decode / store are the
+    decoder and sink for a ReceiverEngine endpoint.
+    """
+
+    def __init__(self, port, schema, capacity=DEFAULT_CAPACITY, recorder=None, udp_ip=UDP_IP):
+        self.port = port
+        self.schema = schema
+        self.udp_ip = udp_ip
+        self.buffer = RingBuffer(capacity)
+        self.tracks = TrackTable()
+        self.recorder = recorder
+        self._decode = feed_decoder(port, schema)
+        self.datagrams = 0
+        self.reports = 0
+        self.bytes = 0
+        self.last_receive = None
+
+    def decode(self, packets):
+        """ Decoder for the receive engine: a batch of datagrams -> one derived block. """
+        self.datagrams += len(packets)
+        self.bytes += sum(len(packet) for packet in packets)
+        return derive_block(self._decode(packets))
+
+    def store(self, block):
+        """ Sink for the receive engine. """
+        self.last_receive = time.time()
+        if block.shape[1]:
+            self.buffer.append_block(block)
+            self.tracks.update_block(block)
+            if self.recorder:
+                self.recorder.write(block, self.last_receive)
+            self.reports += block.shape[1]
+
+    def stats(self):
+        return {
+            "port": self.port,
+            "schema": self.schema,
+            "datagrams": self.datagrams,
+            "reports": self.reports,
+            "bytes": self.bytes,
+            "tracks": len(self.tracks),
+            "buffered": len(self.buffer),
+            "recorded": self.recorder.records if self.recorder else None,
+            "last_receive": self.last_receive,
+        }
+
+
+def write_stats(path, stats):
+    """ Replace `path` atomically, so readers never see a partial file. """
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(stats, f, indent=2)
+    os.replace(tmp, path)
+
+
+async def run_daemon(feeds, stats_interval=STATS_INTERVAL, stats_file=None):
+    """ Serve every feed from one event loop and report stats until SIGINT / SIGTERM. """
+    engine = ReceiverEngine()
+    for feed in feeds:
+        engine.add(feed.port, feed.decode, feed.store, udp_ip=feed.udp_ip)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, engine.stop)
+    server = asyncio.create_task(engine.serve())
+    start = previous_time = time.monotonic()
+    previous = {feed.port: 0 for feed in feeds}
+    try:
+        while not server.done():
+            await asyncio.wait([server], timeout=stats_interval)
+            now = time.monotonic()
+            stats = {"uptime": now - start, "feeds": [feed.stats() for feed in feeds]}
+            for feed, feed_stats in zip(feeds, stats["feeds"]):
+                feed_stats["reports_per_s"] = (feed.reports - previous[feed.port]) / (now - previous_time)
+                previous[feed.port] = feed.reports
+                print(f"port {feed.port}: {feed_stats['reports_per_s']:.0f} reports/s, "
+                      f"{feed_stats['reports']} reports, {feed_stats['tracks']} tracks")
+            previous_time = now
+            for feed in feeds:
+                if feed.recorder:
+                    feed.recorder.flush()
+            if stats_file:
+                write_stats(stats_file, stats)
+        await server  # Re-raises bind errors
+    finally:
+        for feed in feeds:
+            if feed.recorder:
+                feed.recorder.close()
+
+
+def parse_port(value):
+    """ "5005" (schema from FEEDS) or "5005:15". """
+    port, _, schema = value.partition(":")
+    port = int(port)
+    schema = int(schema) if schema else FEEDS.get(port)
+    if schema not in (SCHEMA_15, SCHEMA_10):
+        raise argparse.ArgumentTypeError(f"no schema known for port {port}; use PORT:15 or PORT:10")
+    return port, schema
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless radar ingest: receive, buffer and record without a GUI")
+    parser.add_argument("--port", type=parse_port, action="append",
+                        help="PORT or PORT:SCHEMA to listen on; repeatable (default: 5005:15 and 5008:10)")
+    parser.add_argument("--ip", default=UDP_IP)
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="Reports kept in memory per feed")
+    parser.add_argument("--record", metavar="PREFIX", help="Append every report to PREFIX_<port>.rdr")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL, help="Seconds between stats")
+    parser.add_argument("--stats-file", help="Also write the stats as JSON to this file")
+    args = parser.parse_args()
+
+    feeds = []
+    for port, schema in args.port or list(FEEDS.items()):
+        try:
+            recorder = Recorder(f"{args.record}_{port}.rdr") if args.record else None
+        except (OSError, RecordingError) as e:
+            parser.error(str(e))
+        feeds.append(Feed(port, schema, capacity=args.capacity, recorder=recorder, udp_ip=args.ip))
+    asyncio.run(run_daemon(feeds, stats_interval=args.stats_interval, stats_file=args.stats_file))
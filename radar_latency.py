@@ -0,0 +1,223 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from radar_codec import (HEADER, RECORDS, SCHEMA_15, STAMP_DTYPE, WireFormatError, decode_header, encode_records,
+                         is_stamped)
+
+# End-to-end latency, from the sender's sendto to the report being drawn.
+#
+# Senders stamp each report with a sequence number and time.monotonic()
+# (send.py / send2.py --stamp). A receiver started with --latency feeds a
+# LatencyProbe at three stages:
+#   parsed    decoded on the receiver thread
+#   buffered  moved into data_buffer on the GUI thread
+#   drawn     first animation frame after it was buffered
+# The receiver thread calls `parsed` as it decodes and `queued` once the
+# block is in the hand-off queue; the GUI takes a `mark` before draining the
+# queue, so `buffered(mark)` only counts reports that the drain took.
+# time.monotonic() is only comparable between processes on the same host,
+# so this is meant for loopback runs.
+#
+# Running this module performs a scripted loopback run against
+# nov10receive.py (offscreen Qt) and exits non-zero when the end-to-end p99
+# exceeds the limit, so it can gate latency regressions:
+#
+#   python radar_latency.py --tracks 200 --scan-rate 10 --duration 5 --max-p99-ms 250
+
+STAGES = ("parsed", "buffered", "drawn")
+PERCENTILES = (50, 95, 99)
+DEFAULT_MAX_SAMPLES = 200000  # Latest samples kept per stage
+SEQ_MODULUS = 2 ** 32         # Sequence numbers wrap (see radar_codec.encode_packet)
+
+
+class LatencyProbe:
+    def __init__(self, max_samples=DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._parsing = []   # Send times parsed but not yet queued (receiver thread only)
+        self._parsed = []    # Send times queued but not yet buffered (receiver thread -> GUI thread)
+        self._buffered = []  # Send times buffered but not yet drawn (GUI thread only)
+        self._samples = {stage: [] for stage in STAGES}
+        self._sample_counts = {stage: 0 for stage in STAGES}
+        self.received = 0
+        self._first_seq = None  # Lowest and highest sequence number seen, unwrapped
+        self._last_seq = None
+
+    def _add(self, stage, latencies):
+        samples = self._samples[stage]
+        samples.append(latencies)
+        self._sample_counts[stage] += len(latencies)
+        if self._sample_counts[stage] > 2 * self.max_samples:
+            kept = np.concatenate(samples)[-self.max_samples:]
+            self._samples[stage] = [kept]
+            self._sample_counts[stage] = len(kept)
+
+    def parsed(self, packets):
+        """ Receiver thread: record the stamps of freshly decoded datagrams. """
+        now = time.monotonic()
+        stamps = []
+        for packet in packets:
+            if not is_stamped(packet):
+                continue
+            try:
+                schema, count = decode_header(packet)
+            except WireFormatError:
+                continue
+            offset = HEADER.size + count * RECORDS[schema].size
+            stamps.append(np.frombuffer(packet, dtype=STAMP_DTYPE, count=count, offset=offset))
+        if not stamps:
+            return
+        stamps = np.concatenate(stamps)
+        send_times = stamps["send_time"]
+        self._parsing.append(send_times)
+        with self._lock:
+            self.received += len(stamps)
+            self._count_seqs(stamps["seq"])
+            self._add("parsed", now - send_times)
+
+    def _count_seqs(self, seqs):
+        """ Widen the seen sequence range by `seqs`, unwrapped relative to the newest seen (under the lock). """
+        if self._last_seq is None:
+            self._first_seq = self._last_seq = int(seqs[0])
+        # Signed distance from the newest, so numbers just past a wrap count as newer and reordered ones as older
+        delta = (seqs.astype(np.int64) - self._last_seq + SEQ_MODULUS // 2) % SEQ_MODULUS - SEQ_MODULUS // 2
+        self._first_seq = min(self._first_seq, self._last_seq + int(delta.min()))
+        self._last_seq += max(0, int(delta.max()))
+
+    def queued(self):
+        """ Receiver thread: the reports parsed since the last call are now in the hand-off queue. """
+        if self._parsing:
+            with self._lock:
+                self._parsed.extend(self._parsing)
+            self._parsing = []
+
+    def mark(self):
+        """ GUI thread, just before draining the queue: everything queued so far is in the drain. """
+        with self._lock:
+            return len(self._parsed)
+
+    def buffered(self, mark):
+        """ GUI thread: the reports queued before `mark` have just been appended to the buffer. """
+        now = time.monotonic()
+        with self._lock:
+            pending, self._parsed = self._parsed[:mark], self._parsed[mark:]
+            for send_times in pending:
+                self._add("buffered", now - send_times)
+        self._buffered.extend(pending)
+
+    def drawn(self):
+        """ GUI thread: a frame including everything buffered so far has been drawn. """
+        now = time.monotonic()
+        pending, self._buffered = self._buffered, []
+        with self._lock:
+            for send_times in pending:
+                self._add("drawn", now - send_times)
+
+    @property
+    def lost(self):
+        if self._first_seq is None:
+            return 0
+        return max(0, self._last_seq - self._first_seq + 1 - self.received)
+
+    def summary(self):
+        """ Per-stage count and p50 / p95 / p99 / max latency in milliseconds. """
+        summary = {}
+        with self._lock:
+            for stage in STAGES:
+                samples = self._samples[stage]
+                if not samples:
+                    summary[stage] = {"count": 0}
+                    continue
+                latencies = np.concatenate(samples) * 1000.0
+                stats = {"count": len(latencies), "max": float(latencies.max())}
+                for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+                    stats[f"p{p}"] = float(value)
+                summary[stage] = stats
+        return summary
+
+    def report(self):
+        lines = [f"Latency (ms) over {self.received} stamped reports, {self.lost} lost:"]
+        for stage, stats in self.summary().items():
+            if not stats["count"]:
+                lines.append(f"  {stage:9} no samples")
+                continue
+            lines.append(f"  {stage:9} p50 {stats['p50']:8.2f}  p95 {stats['p95']:8.2f}  "
+                         f"p99 {stats['p99']:8.2f}  max {stats['max']:8.2f}  (n={stats['count']})")
+        return "\n".join(lines)
+
+
+def loopback_run(n_tracks, scan_rate, duration, seed=0):
+    """ Stream stamped synthetic scans into an offscreen nov10receive.py and return its probe. """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import socket
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from radar_loadgen import TrackSimulator
+    import nov10receive
+
+    probe = LatencyProbe()
+    nov10receive.latency_probe = probe
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = nov10receive.RadarDisplayApp()
+    window.show()
+    nov10receive.receiver.start()
+    app.aboutToQuit.connect(nov10receive.receiver.stop)
+
+    done = threading.Event()
+
+    def send():
+        sim = TrackSimulator(n_tracks, seed=seed)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        interval = 1.0 / scan_rate
+        start = time.monotonic()
+        seq = scans = 0
+        while not done.is_set() and sim.time < duration:
+            for packet in encode_records(SCHEMA_15, sim.records(SCHEMA_15), seq=seq):
+                sock.sendto(packet, (nov10receive.UDP_IP, nov10receive.UDP_PORT))
+            seq += n_tracks
+            scans += 1
+            sim.step(interval)
+            delay = start + scans * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        sock.close()
+
+    sender = threading.Thread(target=send, daemon=True)
+    QTimer.singleShot(500, sender.start)  # Let the window settle first
+    QTimer.singleShot(int((duration + 1.5) * 1000), app.quit)
+    app.exec_()
+    done.set()
+    return probe
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Scripted loopback latency run against nov10receive.py")
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--scan-rate", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of traffic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if the end-to-end (drawn) p99 exceeds this")
+    parser.add_argument("--output", help="Write the per-stage summary as JSON")
+    args = parser.parse_args()
+
+    probe = loopback_run(args.tracks, args.scan_rate, args.duration, seed=args.seed)
+    print(probe.report())
+    summary = probe.summary()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"received": probe.received, "lost": probe.lost, "stages": summary}, f, indent=2)
+
+    drawn = summary["drawn"]
+    if not drawn["count"]:
+        print("FAIL: no reports were drawn")
+        sys.exit(1)
+    if args.max_p99_ms is not None and drawn["p99"] > args.max_p99_ms:
+        print(f"FAIL: end-to-end p99 {drawn['p99']:.2f} ms exceeds {args.max_p99_ms:.2f} ms")
+        sys.exit(1)
@@ -0,0 +1,137 @@
+import argparse
+import socket
+import time
+
+import numpy as np
+
+from radar_codec import MAX_DATAGRAM, RECORD_DTYPES, SCHEMA_10, SCHEMA_15, SOURCES, TYPES, encode_records
+
+# Synthetic multi-track load for stress-testing the receivers.
+#
+#   python radar_loadgen.py --tracks 5000 --scan-rate 2 --schema 15 --port 5005
+#   python radar_loadgen.py --tracks 500 --schema 10 --port 5008 --seed 7 --duration 60
+#
+# Every scan advances all tracks together (constant speed, slowly turning,
+# bouncing off the edge of the coverage area) and sends one report per
+# track, packed into as few datagrams as fit.
+
+UDP_IP = "127.0.0.1"
+
+ORIGIN_LAT = 34.0522    # Radar site used for the latitude / longitude fields
+ORIGIN_LON = -118.2437
+KM_PER_DEG_LAT = 111.32
+
+
+class TrackSimulator:
+    """
+    Vectorized kinematics for `n_tracks` targets inside a disk of radius
+    `area` (display range units, taken as km). The same `seed` always
+    produces the same tracks and manoeuvres.
+    """
+
+    def __init__(self, n_tracks, seed=0, area=80.0, min_speed=0.05, max_speed=0.3):
+        self.rng = np.random.default_rng(seed)
+        self.n_tracks = n_tracks
+        self.area = area
+        radius = area * np.sqrt(self.rng.uniform(0, 1, n_tracks))
+        bearing = self.rng.uniform(-np.pi, np.pi, n_tracks)
+        self.x = radius * np.cos(bearing)
+        self.y = radius * np.sin(bearing)
+        self.z = self.rng.uniform(0.5, 12.0, n_tracks)
+        self.speed = self.rng.uniform(min_speed, max_speed, n_tracks)     # km/s
+        self.course = self.rng.uniform(-np.pi, np.pi, n_tracks)           # radians, math convention
+        self.turn_rate = self.rng.normal(0.0, 0.01, n_tracks)             # rad/s
+        self.climb = self.rng.normal(0.0, 0.005, n_tracks)                # km/s
+        self.track_id = np.arange(1, n_tracks + 1, dtype=np.uint32)
+        self.source = self.rng.integers(1, len(SOURCES), n_tracks, dtype=np.uint8)
+        self.types = self.rng.integers(1, len(TYPES), n_tracks, dtype=np.uint8)
+        self.time = 0.0
+
+    def velocity(self):
+        return self.speed * np.cos(self.course), self.speed * np.sin(self.course), self.climb
+
+    def step(self, dt):
+        self.course += self.turn_rate * dt
+        xv, yv, zv = self.velocity()
+        self.x += xv * dt
+        self.y += yv * dt
+        self.z = np.clip(self.z + zv * dt, 0.1, 15.0)
+        self.climb[(self.z <= 0.1) | (self.z >= 15.0)] *= -1
+
+        # Tracks leaving the coverage area turn back towards the centre
+        outside = np.hypot(self.x, self.y) > self.area
+        self.course[outside] = np.arctan2(-self.y[outside], -self.x[outside])
+        self.time += dt
+
+    def records(self, schema):
+        """ Current state of every track as a structured array in the wire layout of `schema`. """
+        records = np.zeros(self.n_tracks, dtype=RECORD_DTYPES[schema])
+        xv, yv, zv = self.velocity()
+        records["x"] = self.x
+        records["y"] = self.y
+        records["z"] = self.z
+        records["track_id"] = self.track_id
+        records["time"] = self.time
+        records["latitude"] = ORIGIN_LAT + self.y / KM_PER_DEG_LAT
+        records["longitude"] = ORIGIN_LON + self.x / (KM_PER_DEG_LAT * np.cos(np.radians(ORIGIN_LAT)))
+        records["altitude"] = self.z * 1000.0
+        records["speed"] = self.speed * 3600.0                            # km/h
+        records["heading"] = np.degrees(np.pi / 2 - self.course) % 360.0  # compass degrees
+        if schema == SCHEMA_15:
+            records["xv"] = xv
+            records["yv"] = yv
+            records["zv"] = zv
+            records["source"] = self.source
+            records["type"] = self.types
+        return records
+
+
+def run(n_tracks, scan_rate, schema, ports, seed=0, duration=None, max_size=MAX_DATAGRAM, udp_ip=UDP_IP):
+    """ Send one scan of every track per 1 / scan_rate seconds until `duration` (forever if None). """
+    sim = TrackSimulator(n_tracks, seed=seed)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    interval = 1.0 / scan_rate
+    start = time.monotonic()
+    scans = reports = datagrams = 0
+    try:
+        while duration is None or sim.time < duration:
+            packets = encode_records(schema, sim.records(schema), max_size)
+            for port in ports:
+                for packet in packets:
+                    sock.sendto(packet, (udp_ip, port))
+            scans += 1
+            reports += n_tracks * len(ports)
+            datagrams += len(packets) * len(ports)
+
+            # Absolute schedule: late scans are sent immediately and don't shift later ones
+            delay = start + scans * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sim.step(interval)
+
+            if scans % max(1, int(scan_rate * 5)) == 0:
+                elapsed = time.monotonic() - start
+                print(f"{scans} scans, {reports / elapsed:.0f} reports/s, {datagrams / elapsed:.0f} datagrams/s")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+    print(f"Sent {reports} reports in {datagrams} datagrams over {scans} scans")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate N tracks and stream them to the radar receivers")
+    parser.add_argument("--tracks", type=int, default=100, help="Number of simulated tracks")
+    parser.add_argument("--scan-rate", type=float, default=1.0, help="Scans per second (one report per track per scan)")
+    parser.add_argument("--schema", type=int, choices=[SCHEMA_15, SCHEMA_10], default=SCHEMA_15,
+                        help="15 for nov10receive.py (port 5005), 10 for receive6.py (port 5008)")
+    parser.add_argument("--port", type=int, action="append", help="Destination port; repeat for several receivers")
+    parser.add_argument("--ip", default=UDP_IP)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for reproducible benchmark runs")
+    parser.add_argument("--duration", type=float, help="Simulated seconds to run (default: until interrupted)")
+    parser.add_argument("--max-datagram", type=int, default=MAX_DATAGRAM, help="Largest datagram in bytes")
+    args = parser.parse_args()
+
+    ports = args.port or [5005 if args.schema == SCHEMA_15 else 5008]
+    run(args.tracks, args.scan_rate, args.schema, ports, seed=args.seed, duration=args.duration,
+        max_size=args.max_datagram, udp_ip=args.ip)
@@ -0,0 +1,55 @@
+import numpy as np
+from matplotlib.colors import LinearSegmentedColormap
+
+# Phosphor-style PPI raster.
+#
+# Returns are splatted at full brightness, from their azimuth and ground range,
+# into a square image that is the PPI itself, and the whole image fades by a
+# constant factor per frame, like the afterglow of a radar tube. Splatting
+# straight into display pixels (rather than into polar bins resampled later)
+# keeps every return visible, also near the centre where a polar bin is
+# narrower than a pixel. A frame costs the same for 10 or 10 million
+# reports: only newly received reports are ever touched.
+
+DEFAULT_PIXELS = 512   # Side of the image
+DEFAULT_DECAY = 0.95   # Brightness kept per frame
+FRAME_TIME = 0.05      # Seconds per frame that DEFAULT_DECAY refers to
+SPOT = ((0, 0), (0, 1), (1, 0), (0, -1), (-1, 0))  # Pixels lit per return, around its own
+# Transparent when dark, so the range rings under the image show through
+PHOSPHOR_CMAP = LinearSegmentedColormap.from_list("phosphor", [(0, 0.4, 0, 0), "darkgreen", "lime", "white"])
+
+
+class PhosphorRaster:
+    """
+    Decaying PPI image of returns out to `range_max`. Feed it with `splat`,
+    age it with `fade`, display `image` (values 0..1) with imshow over
+    `extent`, origin "lower". Azimuth follows derive_block's azimuth_rad.
+    """
+
+    def __init__(self, range_max, pixels=DEFAULT_PIXELS, decay=DEFAULT_DECAY):
+        self.range_max = float(range_max)
+        self.pixels = pixels
+        self.decay = decay
+        self.image = np.zeros((pixels, pixels), dtype=np.float32)
+        self.extent = (-self.range_max, self.range_max, -self.range_max, self.range_max)
+
+    def splat(self, azimuth_rad, ground_range):
+        """ Light up the pixels hit by these returns (arrays of equal length); those beyond range_max are dropped. """
+        with np.errstate(invalid="ignore"):  # NaN positions fail the test
+            inside = (ground_range >= 0) & (ground_range < self.range_max)
+        if not inside.any():
+            return
+        azimuth_rad, ground_range = azimuth_rad[inside], ground_range[inside]
+        scale = self.pixels / (2 * self.range_max)
+        col = ((ground_range * np.cos(azimuth_rad) + self.range_max) * scale).astype(np.int64)
+        row = ((ground_range * np.sin(azimuth_rad) + self.range_max) * scale).astype(np.int64)
+        last = self.pixels - 1
+        for dr, dc in SPOT:
+            self.image[np.clip(row + dr, 0, last), np.clip(col + dc, 0, last)] = 1.0
+
+    def fade(self, seconds=FRAME_TIME):
+        """ Age the image by `seconds`: `decay` per FRAME_TIME, whatever the actual frame rate. """
+        self.image *= self.decay ** (seconds / FRAME_TIME)
+
+    def clear(self):
+        self.image[:] = 0.0
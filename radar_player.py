@@ -0,0 +1,124 @@
+import argparse
+
+import numpy as np
+
+from radar_buffer import COLUMN_INDEX
+from radar_codec import MAX_DATAGRAM, SCHEMA_10, SCHEMA_15, block_to_records, encode_records
+from radar_ingest import FEEDS, UDP_IP
+from radar_record import Recording, RecordingError
+from radar_replay import ReplayClock
+from radar_udp import open_sender_socket
+
+# Playback of session recordings (see radar_record.py), back onto UDP or
+# straight into a display.
+#
+#   python radar_player.py session_5005.rdr --info
+#   python radar_player.py session_5005.rdr --speed 4 --start 60   # re-broadcast to the recorded ports
+#   python radar_player.py session.rdr --port 5008 --schema 10 --speed 0 --loop
+#   python nov10receive.py --play session_5005.rdr --speed 2       # into the display, no UDP
+#
+# Files are memory-mapped, so multi-gigabyte sessions open instantly and
+# only the part being played is ever read.
+
+MAX_CHUNK = 65536   # Most records handed to the sink at once
+DEFAULT_PORT = 5005  # For reports recorded without a feed tag
+
+_FEED = COLUMN_INDEX["feed"]
+
+
+def play(recording, sink, speed=1.0, start=None, stop=None, stop_event=None):
+    """
+    Hand `recording` to `sink` one ingest batch (raw block) at a time, paced
+    by recv_time on a ReplayClock; `speed <= 0` plays as fast as possible.
+    `start` / `stop` are seconds from the beginning of the recording.
+    Returns the number of records played.
+    """
+    if not len(recording):
+        return 0
+    clock = ReplayClock(speed)
+    origin = recording.start_time
+    index = recording.seek(origin + start) if start else 0
+    end = recording.seek(origin + stop) if stop is not None else len(recording)
+    played = 0
+    while index < end and not (stop_event and stop_event.is_set()):
+        batch_end = min(recording.batch_end(index, MAX_CHUNK), end)
+        clock.wait(recording.time(index))
+        sink(recording.block(index, batch_end))
+        played += batch_end - index
+        index = batch_end
+    return played
+
+
+class Rebroadcaster:
+    """
+    Sink for play() that re-encodes blocks into the binary wire format and
+    sends each report to the port it was recorded from (its feed tag),
+    unless a fixed `port` / `schema` is given.
+    """
+
+    def __init__(self, udp_ip=UDP_IP, port=None, schema=None, max_size=MAX_DATAGRAM):
+        self.udp_ip = udp_ip
+        self.port = port
+        self.schema = schema
+        self.max_size = max_size
+        self.sock = open_sender_socket()
+        self.reports = 0
+        self.datagrams = 0
+
+    def __call__(self, block):
+        if self.port is not None:
+            ports = np.full(block.shape[1], self.port)
+        else:
+            ports = np.nan_to_num(block[_FEED], nan=DEFAULT_PORT).astype(np.int64)
+        for port in np.unique(ports):
+            port = int(port)
+            schema = self.schema or FEEDS.get(port, SCHEMA_15)
+            records = block_to_records(schema, block[:, ports == port])
+            for packet in encode_records(schema, records, self.max_size):
+                self.sock.sendto(packet, (self.udp_ip, port))
+                self.datagrams += 1
+            self.reports += len(records)
+
+    def close(self):
+        self.sock.close()
+
+
+def describe(recording):
+    if not len(recording):
+        return f"{recording.path}: empty"
+    feeds = np.unique(recording.records[-min(len(recording), MAX_CHUNK):]["feed"])
+    return (f"{recording.path}: {len(recording)} reports over {recording.end_time - recording.start_time:.1f} s, "
+            f"feeds in the last {min(len(recording), MAX_CHUNK)} reports: {feeds.tolist()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-broadcast a session recording over UDP")
+    parser.add_argument("path", help="Recording (.rdr) written by radar_ingest.py or nov10receive.py --record")
+    parser.add_argument("--info", action="store_true", help="Describe the recording and exit")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier; 0 sends as fast as possible")
+    parser.add_argument("--start", type=float, help="Seconds from the beginning of the recording to start at")
+    parser.add_argument("--stop", type=float, help="Seconds from the beginning of the recording to stop at")
+    parser.add_argument("--loop", action="store_true", help="Start over at the end")
+    parser.add_argument("--ip", default=UDP_IP)
+    parser.add_argument("--port", type=int, help="Send everything to this port instead of the recorded ones")
+    parser.add_argument("--schema", type=int, choices=[SCHEMA_15, SCHEMA_10], help="Wire schema for --port")
+    parser.add_argument("--max-datagram", type=int, default=MAX_DATAGRAM, help="Largest datagram in bytes")
+    args = parser.parse_args()
+
+    try:
+        recording = Recording(args.path)
+    except (OSError, RecordingError) as e:
+        parser.error(str(e))
+    print(describe(recording))
+    if not args.info:
+        sink = Rebroadcaster(args.ip, port=args.port, schema=args.schema, max_size=args.max_datagram)
+        try:
+            while True:
+                play(recording, sink, speed=args.speed, start=args.start, stop=args.stop)
+                if not args.loop:
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.close()
+            print(f"Sent {sink.reports} reports in {sink.datagrams} datagrams")
@@ -0,0 +1,308 @@
+import numpy as np
+
+from radar_buffer import COLUMN_INDEX, COLUMNS, derive_block, row_cutoffs
+
+# Min/max pyramid behind the "Time vs ..." views.
+#
+# Level k splits time into bins of base_bin * 2**k seconds and keeps, per
+# track and bin, the minimum and maximum of each quantity. A view covering
+# `span` seconds on `width` pixels reads the finest level with at most
+# `width` bins across the span, so a redraw costs O(tracks * width) however
+# long the feed has been running.
+#
+# Entries are keyed bin * 2**24 + track index and kept sorted, so a time
+# window is one contiguous slice and in-order data (the normal case) is
+# merged by appending. Track indices of tracks that have aged out are
+# reused, so only the live tracks count against the 2**24.
+
+DEFAULT_BASE_BIN = 0.05       # Seconds per bin at level 0
+DEFAULT_LEVELS = 16           # Coarsest bin: 0.05 * 2**15 s, about 27 minutes
+DEFAULT_MAX_ENTRIES = 200000  # Per level; the oldest quarter is dropped beyond this
+_TRACK_BITS = 24
+_TRACK_MASK = (1 << _TRACK_BITS) - 1
+_TRACK_ENTRY_BYTES = 200  # Rough size of one track's key tuple and dict slot, for nbytes
+
+
+class _Level:
+    def __init__(self, n_quantities, capacity=1024):
+        self.keys = np.empty(capacity, dtype=np.int64)
+        self.lo = np.empty((capacity, n_quantities))
+        self.hi = np.empty((capacity, n_quantities))
+        self.size = 0
+        self.added = 0  # Entries added since the last per-track scan (see discard_stale)
+
+    def _reserve(self, size):
+        if size <= len(self.keys):
+            return
+        capacity = max(size, 2 * len(self.keys))
+        for name in ("keys", "lo", "hi"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def merge(self, keys, lo, hi):
+        """ Fold sorted, unique `keys` with their per-key min / max into the level. """
+        size = self.size
+        pos = np.searchsorted(self.keys[:size], keys)
+        found = pos < size
+        found[found] = self.keys[pos[found]] == keys[found]
+        if found.any():
+            rows = pos[found]
+            self.lo[rows] = np.minimum(self.lo[rows], lo[found])
+            self.hi[rows] = np.maximum(self.hi[rows], hi[found])
+        new = ~found
+        if not new.any():
+            return
+        keys, lo, hi = keys[new], lo[new], hi[new]
+        self._reserve(size + len(keys))
+        if size == 0 or keys[0] > self.keys[size - 1]:
+            # In-order data: append
+            self.keys[size:size + len(keys)] = keys
+            self.lo[size:size + len(keys)] = lo
+            self.hi[size:size + len(keys)] = hi
+        else:
+            # Late data: merge into place, O(size) but rare
+            at = pos[new]
+            self.keys[:size + len(keys)] = np.insert(self.keys[:size], at, keys)
+            self.lo[:size + len(keys)] = np.insert(self.lo[:size], at, lo, axis=0)
+            self.hi[:size + len(keys)] = np.insert(self.hi[:size], at, hi, axis=0)
+        self.size = size + len(keys)
+        self.added += len(keys)
+
+    def trim(self, max_entries):
+        """ Drop the oldest quarter once over `max_entries`, so trimming is amortized O(1) per entry. Returns the number dropped. """
+        if self.size <= max_entries:
+            return 0
+        drop = self.size - max_entries + max_entries // 4
+        keep = self.size - drop
+        self.keys[:keep] = self.keys[drop:self.size]
+        self.lo[:keep] = self.lo[drop:self.size]
+        self.hi[:keep] = self.hi[drop:self.size]
+        self.size = keep
+        return drop
+
+    def compact(self, keep):
+        """ Keep only the entries set in the boolean `keep` (of length size). """
+        n = int(keep.sum())
+        self.keys[:n] = self.keys[:self.size][keep]
+        self.lo[:n] = self.lo[:self.size][keep]
+        self.hi[:n] = self.hi[:self.size][keep]
+        dropped = self.size - n
+        self.size = n
+        return dropped
+
+    def discard_stale(self, first_bins):
+        """
+        Drop entries whose bin is below `first_bins[track index]`. That takes
+        a scan of the level, so it only runs once a quarter of the level has
+        been added since the last scan: amortized O(1) per entry.
+        """
+        if self.added < self.size // 4:
+            return 0
+        self.added = 0
+        keys = self.keys[:self.size]
+        return self.compact((keys >> _TRACK_BITS) >= first_bins[keys & _TRACK_MASK])
+
+    def discard_below(self, key):
+        """
+        Drop entries keyed below `key`, once they are at least a quarter of
+        the level, so the compaction is amortized O(1) per entry.
+        """
+        drop = int(np.searchsorted(self.keys[:self.size], key))
+        if drop == 0 or drop < self.size // 4:
+            return 0
+        keep = self.size - drop
+        self.keys[:keep] = self.keys[drop:self.size]
+        self.lo[:keep] = self.lo[drop:self.size]
+        self.hi[:keep] = self.hi[drop:self.size]
+        self.size = keep
+        return drop
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.lo.nbytes + self.hi.nbytes
+
+
+class TimePyramid:
+    """
+    Incremental min/max pyramid of `quantities` (COLUMNS names) over the
+    `time` column, per track as identified by `keys` (see TrackTable).
+    Feed it every ingested block with `update_block`; read it with
+    `envelope`. Not thread-safe: use it from the thread that ingests.
+    """
+
+    def __init__(self, quantities, keys=("track_id",), base_bin=DEFAULT_BASE_BIN, levels=DEFAULT_LEVELS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.quantities = tuple(quantities)
+        self.keys = tuple(keys)
+        self.base_bin = base_bin
+        self.max_entries = max_entries
+        self._quantity_index = [COLUMN_INDEX[name] for name in self.quantities]
+        self._key_index = [COLUMN_INDEX[name] for name in self.keys]
+        self._levels = [_Level(len(self.quantities)) for _ in range(levels)]
+        self.clear()
+
+    def __len__(self):
+        return self._levels[0].size
+
+    @property
+    def levels(self):
+        return len(self._levels)
+
+    @property
+    def track_count(self):
+        """ Tracks held; aged-out ones are counted until they are forgotten (see _forget_tracks). """
+        return len(self._tracks)
+
+    def track_keys(self):
+        """ Key tuples (values of `keys`) of the tracks held. """
+        return list(self._tracks)
+
+    def clear(self):
+        self._levels = [_Level(len(self.quantities)) for _ in self._levels]
+        self._tracks = {}  # Track key -> small index used in the entry keys
+        self._free = []    # Indices of forgotten tracks, reused first
+        self._allocate(256)
+
+    def _allocate(self, capacity):
+        # Per track index: its key, newest time seen, and whether it is in use
+        self._track_keys = np.zeros((capacity, len(self.keys)), dtype=np.int64)
+        self._newest = np.full(capacity, -np.inf)
+        self._live = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        keys, newest, live = self._track_keys, self._newest, self._live
+        self._allocate(2 * len(live))
+        self._track_keys[:len(live)] = keys
+        self._newest[:len(live)] = newest
+        self._live[:len(live)] = live
+
+    def _track_index(self, key):
+        index = self._tracks.get(key)
+        if index is None:
+            index = self._free.pop() if self._free else len(self._tracks)
+            if index > _TRACK_MASK:
+                raise OverflowError(f"more than {_TRACK_MASK + 1} live tracks in the pyramid")
+            if index == len(self._live):
+                self._grow()
+            self._tracks[key] = index
+            self._track_keys[index] = key
+            self._newest[index] = -np.inf
+            self._live[index] = True
+        return index
+
+    def _track_indices(self, keys, times):
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        ids = np.fromiter((self._track_index(tuple(key)) for key in unique.tolist()),
+                          dtype=np.int64, count=len(unique))
+        tracks = ids[inverse.reshape(-1)]
+        np.fmax.at(self._newest, tracks, times)
+        return tracks
+
+    def update_block(self, block):
+        """ Fold a block (raw blocks are derived first) into every level. Reports missing a key or time are skipped. """
+        if block.shape[0] != len(COLUMNS):
+            block = derive_block(block)
+        times = block[COLUMN_INDEX["time"]]
+        track_keys = block[self._key_index]
+        valid = ~np.isnan(times) & ~np.isnan(track_keys).any(axis=0)
+        if not valid.any():
+            return
+        times = times[valid]
+        tracks = self._track_indices(track_keys[:, valid].T.astype(np.int64), times)
+        values = block[self._quantity_index][:, valid].T
+        keys = (np.floor(times / self.base_bin).astype(np.int64) << _TRACK_BITS) + tracks
+        lo = hi = values
+
+        # Each level is reduced from the one below, so the work shrinks as the bins widen
+        trimmed = 0
+        for level in self._levels:
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            lo = np.fmin.reduceat(lo[order], starts, axis=0)
+            hi = np.fmax.reduceat(hi[order], starts, axis=0)
+            keys = keys[starts]
+            level.merge(keys, lo, hi)
+            trimmed += level.trim(self.max_entries)
+            # Halve the bin (an arithmetic shift floors, also for negative bins), keep the track
+            keys = ((keys >> (_TRACK_BITS + 1)) << _TRACK_BITS) + (keys & _TRACK_MASK)
+        if trimmed:
+            self._forget_tracks()
+
+    def discard_before(self, cutoff, by=None):
+        """
+        Forget bins that end before `cutoff` seconds; with `by` (one of
+        `keys`), `cutoff` is a dict per value of that key (see
+        radar_buffer.row_cutoffs). Stale bins may linger until enough have
+        piled up to compact (see _Level.discard_below / discard_stale).
+        """
+        if by is None:
+            for k, level in enumerate(self._levels):
+                bin_width = self.base_bin * 2 ** k
+                level.discard_below(int(np.floor(cutoff / bin_width)) << _TRACK_BITS)
+            self._forget_tracks(cutoff)
+            return
+        track_cutoff = row_cutoffs(self._track_keys[:, self.keys.index(by)], cutoff)
+        for k, level in enumerate(self._levels):
+            first_bins = np.floor(track_cutoff / (self.base_bin * 2 ** k))
+            # Everything below the earliest cutoff goes cheaply from the front
+            if np.isfinite(first_bins[self._live]).all() and self._live.any():
+                level.discard_below(int(first_bins[self._live].min()) << _TRACK_BITS)
+            level.discard_stale(first_bins)
+        self._forget_tracks(track_cutoff)
+
+    def _forget_tracks(self, cutoff=-np.inf):
+        """
+        Free the indices of tracks with nothing newer than `cutoff` (scalar
+        or per track index) or than the oldest bin of the coarsest level,
+        removing what is left of them from every level. Runs once such
+        tracks are a quarter of the live ones, so the compaction is amortized.
+        """
+        coarsest = self._levels[-1]
+        held_from = ((int(coarsest.keys[0]) >> _TRACK_BITS) * self.base_bin * 2 ** (len(self._levels) - 1)
+                     if coarsest.size else np.inf)
+        dead = self._live & (self._newest < np.maximum(cutoff, held_from))
+        n_dead = int(dead.sum())
+        if n_dead == 0 or n_dead < len(self._tracks) // 4:
+            return
+        for level in self._levels:
+            level.compact(~dead[level.keys[:level.size] & _TRACK_MASK])
+        for index in np.flatnonzero(dead).tolist():
+            del self._tracks[tuple(self._track_keys[index].tolist())]
+            self._free.append(index)
+        self._live[dead] = False
+        self._newest[dead] = -np.inf
+
+    @property
+    def nbytes(self):
+        tracks = (self._track_keys.nbytes + self._newest.nbytes + self._live.nbytes +
+                  len(self._tracks) * _TRACK_ENTRY_BYTES)
+        return sum(level.nbytes for level in self._levels) + tracks
+
+    def level_for(self, span, width):
+        """ Finest level with at most `width` bins across `span` seconds. """
+        bins = span / self.base_bin
+        level = 0
+        while bins > max(width, 1) and level < len(self._levels) - 1:
+            bins /= 2
+            level += 1
+        return level
+
+    def envelope(self, quantity, t0, t1, width):
+        """
+        Points for a scatter of `quantity` over [t0, t1] drawn `width` pixels
+        wide: each (track, bin) contributes its min and max at the bin centre.
+        Returns (times, values).
+        """
+        level = self.level_for(t1 - t0, width)
+        entries = self._levels[level]
+        bin_width = self.base_bin * 2 ** level
+        first = int(np.floor(t0 / bin_width)) << _TRACK_BITS
+        last = (int(np.floor(t1 / bin_width)) + 1) << _TRACK_BITS
+        keys = entries.keys[:entries.size]
+        start, stop = np.searchsorted(keys, (first, last))
+        q = self.quantities.index(quantity)
+        centres = ((keys[start:stop] >> _TRACK_BITS) + 0.5) * bin_width
+        return np.repeat(centres, 2), np.column_stack((entries.lo[start:stop, q], entries.hi[start:stop, q])).ravel()
@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+# Blocks held between GUI drains; at one block per receiver wakeup this covers
+# several seconds of a stalled GUI before the oldest data is dropped.
+DEFAULT_MAXLEN = 4096
+
+
+class BlockQueue:
+    """
+    Bounded hand-off of decoded report blocks from a receiver thread to the
+    GUI thread. The receiver `put`s one block per wakeup; the GUI `drain`s
+    everything pending in one call. When full, the oldest block is dropped
+    so the display stays current, and `dropped` counts the lost reports.
+    """
+
+    def __init__(self, maxlen=DEFAULT_MAXLEN):
+        self.maxlen = maxlen
+        self.dropped = 0
+        self._blocks = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def put(self, block):
+        if block.shape[1] == 0:
+            return
+        with self._lock:
+            if len(self._blocks) >= self.maxlen:
+                self.dropped += self._blocks.popleft().shape[1]
+            self._blocks.append(block)
+
+    def drain(self):
+        """ Remove and return all pending blocks as one block, or None when nothing is pending. """
+        with self._lock:
+            if not self._blocks:
+                return None
+            blocks = list(self._blocks)
+            self._blocks.clear()
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks, axis=1)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+from radar_udp import open_receiver_socket
+
+# asyncio receive engine: any number of UDP ports served by one event loop.
+#
+# Each endpoint has a decoder (list of datagrams -> block) and a sink that
+# gets the decoded blocks, e.g. BlockQueue.put for a GUI or Feed.store for
+# the headless daemon. The GUIs run the loop on one background thread
+# (`start` / `stop`, stop wired to QApplication.aboutToQuit); headless code
+# can `await serve()` on its own loop instead.
+
+UDP_IP = "127.0.0.1"
+START_TIMEOUT = 5.0  # Seconds start() waits for the sockets to be bound
+
+
+class BatchProtocol(asyncio.DatagramProtocol):
+    """
+    Collects the datagrams delivered during one event loop iteration and
+    decodes them as one batch on the next, so a burst is handled in a few
+    decoder calls rather than one per datagram.
+    """
+
+    def __init__(self, decoder, sink):
+        self.decoder = decoder
+        self.sink = sink
+        self.pending = []
+        self.loop = asyncio.get_running_loop()
+
+    def datagram_received(self, data, addr):
+        if not self.pending:
+            self.loop.call_soon(self.flush)
+        self.pending.append(data)
+
+    def flush(self):
+        packets, self.pending = self.pending, []
+        if packets:
+            self.sink(self.decoder(packets))
+
+    def error_received(self, exc):
+        print("Receive error:", exc)
+
+
+class ReceiverEngine:
+    def __init__(self):
+        self._endpoints = []
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+        self._started = threading.Event()
+        self._error = None
+
+    def add(self, port, decoder, sink, udp_ip=UDP_IP):
+        """ Listen on `port`; each batch of datagrams goes through `decoder` and then to `sink`. """
+        self._endpoints.append((udp_ip, port, decoder, sink))
+
+    @property
+    def running(self):
+        return self._loop is not None
+
+    async def serve(self):
+        """ Bind every endpoint and receive until stop() is called or the task is cancelled. """
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        transports = []
+        try:
+            for udp_ip, port, decoder, sink in self._endpoints:
+                sock = open_receiver_socket(udp_ip, port)
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda decoder=decoder, sink=sink: BatchProtocol(decoder, sink), sock=sock)
+                transports.append(transport)
+            self._loop = loop
+            self._started.set()
+            await self._stopping.wait()
+        finally:
+            self._loop = None
+            for transport in transports:
+                transport.close()
+
+    def start(self):
+        """ Run serve() on a background thread; returns once every port is bound. """
+        if self._thread and self._thread.is_alive():
+            return
+        self._started.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="radar-receiver", daemon=True)
+        self._thread.start()
+        self._started.wait(START_TIMEOUT)
+        if self._error:
+            raise self._error
+
+    def _run(self):
+        try:
+            asyncio.run(self.serve())
+        except Exception as e:
+            self._error = e
+            self._started.set()
+
+    def stop(self):
+        """ Close every socket and, when started with start(), wait for the loop thread. Safe from any thread. """
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
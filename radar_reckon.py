@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+
+from radar_buffer import newest_per_feed
+
+# Dead reckoning between reports: TrackTable.extrapolate advances every
+# track along its velocity in one array operation; SensorClock says how far,
+# by estimating each feed's current `time` between reports. Together they
+# let a display move tracks smoothly at its own frame rate from feeds that
+# report far less often.
+#
+# Feeds are clocked separately, as their `time` values need not share a
+# base (send2.py sends P_EL as its time), so each track is advanced to the
+# current time of its own feed:
+#
+#   track_table.extrapolate(sensor_clock.now(), max_coast=MAX_COAST, by="feed")
+
+MAX_COAST = 10.0  # Seconds a track is advanced past its last report at most; older tracks stay at it
+
+
+class SensorClock:
+    """
+    Each feed's current `time`: the newest report time seen from it, plus
+    the monotonic time elapsed since that report arrived. Feeds are told
+    apart by the `feed` column (None for untagged reports). Feed it every
+    ingested block.
+    """
+
+    def __init__(self):
+        self._anchors = {}  # Feed -> (newest report time, monotonic time it arrived)
+
+    def observe(self, block):
+        if not block.shape[1]:
+            return
+        arrived = time.monotonic()
+        for feed, newest in newest_per_feed(block).items():
+            anchor = self._anchors.get(feed)
+            if anchor is None or newest > anchor[0]:
+                self._anchors[feed] = (newest, arrived)
+
+    def now(self):
+        """ Estimated report time now per feed, as a dict (empty before the first report). """
+        now = time.monotonic()
+        return {feed: newest + now - arrived for feed, (newest, arrived) in self._anchors.items()}
+
+    def age(self):
+        """ Seconds since the newest report of any feed arrived (infinite before the first). """
+        if not self._anchors:
+            return np.inf
+        return time.monotonic() - max(arrived for _, arrived in self._anchors.values())
@@ -0,0 +1,141 @@
+import bisect
+import os
+import struct
+import time
+
+import numpy as np
+
+from radar_buffer import RAW_COLUMNS
+
+# Session recording format (.rdr).
+#
+#   header:  magic (6s) | version (H) | record size (I)
+#   records: recv_time (d) | one float64 per radar_buffer.RAW_COLUMNS field
+#
+# Records are appended in arrival order. recv_time is the wall-clock time the
+# report was ingested, clamped so it never decreases within a file, also
+# across sessions appending to it; that makes it the time index: Recording
+# bisects it in place to seek.
+
+FILE_MAGIC = b"RDREC\x00"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<6sHI")
+RECORD_DTYPE = np.dtype([("recv_time", "<f8")] + [(name, "<f8") for name in RAW_COLUMNS])
+
+
+class RecordingError(ValueError):
+    pass
+
+
+class Recorder:
+    """
+    Appends ingested report blocks to a session file. Not thread-safe: one
+    writer per file. An existing file is checked and continued after its
+    last complete record, from that record's recv_time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._last_time = 0.0
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as f:
+                f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, RECORD_DTYPE.itemsize))
+        else:
+            recording = Recording(path)  # Raises RecordingError for other files
+            if len(recording):
+                self._last_time = recording.end_time
+            end = FILE_HEADER.size + len(recording) * RECORD_DTYPE.itemsize
+            del recording  # Unmaps the file before it is truncated
+            if os.path.getsize(path) > end:
+                os.truncate(path, end)  # A partial record left by a crash would misalign everything appended
+        self._file = open(path, "ab")
+
+    def write(self, block, recv_time=None):
+        """ Append a (raw or derived) block; all of it shares one receive time. """
+        if block.shape[1] == 0:
+            return
+        self._last_time = max(self._last_time, time.time() if recv_time is None else recv_time)
+        records = np.empty(block.shape[1], dtype=RECORD_DTYPE)
+        records["recv_time"] = self._last_time
+        for i, name in enumerate(RAW_COLUMNS):
+            records[name] = block[i]
+        self._file.write(records.tobytes())
+        self.records += len(records)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _TimeIndex:
+    """ Sequence view of the recv_time field for bisect, reading one record per probe. """
+
+    def __init__(self, records):
+        self._records = records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, i):
+        return float(self._records[i]["recv_time"])
+
+
+class Recording:
+    """
+    Read-only, memory-mapped view of a session file. Opening is O(1) in the
+    file size: nothing is read until records are asked for, and seeking
+    touches O(log n) records. A trailing partial record (e.g. after a
+    crash while recording) is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise RecordingError(f"{path}: not a recording (too short)")
+        magic, version, record_size = FILE_HEADER.unpack(header)
+        if magic != FILE_MAGIC:
+            raise RecordingError(f"{path}: not a recording (bad magic)")
+        if version != FILE_VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise RecordingError(f"{path}: unsupported recording version {version} / record size {record_size}")
+        count = (os.path.getsize(path) - FILE_HEADER.size) // RECORD_DTYPE.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=FILE_HEADER.size, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=RECORD_DTYPE)
+        self._times = _TimeIndex(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def start_time(self):
+        return self._times[0] if len(self) else None
+
+    @property
+    def end_time(self):
+        return self._times[len(self) - 1] if len(self) else None
+
+    def time(self, index):
+        return self._times[index]
+
+    def seek(self, recv_time):
+        """ Index of the first record received at or after `recv_time`. """
+        return bisect.bisect_left(self._times, recv_time)
+
+    def batch_end(self, index, max_records=None):
+        """ End of the ingest batch starting at `index`: the records sharing its recv_time. """
+        hi = len(self) if max_records is None else min(len(self), index + max_records)
+        return bisect.bisect_right(self._times, self._times[index], index, hi)
+
+    def block(self, start, stop):
+        """ Records [start, stop) as a raw (len(RAW_COLUMNS), n) block. """
+        records = self.records[start:stop]
+        block = np.empty((len(RAW_COLUMNS), len(records)))
+        for i, name in enumerate(RAW_COLUMNS):
+            block[i] = records[name]
+        return block
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import signal
+import socket
+import time
+
+import numpy as np
+
+from radar_buffer import COLUMN_INDEX
+from radar_codec import SCHEMA_10, SCHEMA_15, TYPES, block_to_records, encode_records, records_per_datagram, type_code
+from radar_ingest import FEEDS, STATS_INTERVAL, UDP_IP, feed_decoder, parse_port
+from radar_receiver import ReceiverEngine
+from radar_sender import TokenBucket
+from radar_udp import RECV_BUFSIZE, open_receiver_socket, open_sender_socket
+
+# Local fan-out relay. Only one process can bind 5005 / 5008, so the relay
+# takes them, decodes each feed once and republishes it to any number of
+# local subscribers (consoles, the recorder daemon), each on its own port
+# with its own filters and rate limit. Filters are boolean masks over the
+# whole decoded batch, and each subscriber's share is encoded in one go.
+#
+#   python radar_relay.py --subscribe 6005:feeds=5005 --subscribe 6008:feeds=5008
+#   python radar_relay.py --subscribe 6105:types=Aircraft,Drone:range=0-50:rate=2000
+#   python radar_relay.py --control "subscribe 6205:tracks=1,2,3:schema=10"    # to a running relay
+#   python radar_relay.py --control list
+#
+# Subscriber spec: PORT, then any of these, separated by ':'
+#   feeds=5005,5008      input ports to take reports from (default: all)
+#   tracks=1,2,3         track ids to pass (default: all)
+#   types=Aircraft,2     report types, by name or code (default: all)
+#   range=MIN-MAX        ground range window; either end may be left empty
+#   rate=N               reports per second at most; excess reports are thinned evenly
+#   schema=15|10         wire schema sent (default: the feed's, 15 when merging feeds)
+#
+# Subscribers then listen with e.g.
+#   python nov10receive.py --port 6005:15 --port 6008:10
+#   python radar_ingest.py --port 6105:15 --record session
+#
+# Reports are tagged with the subscriber port downstream, not the relay's
+# input port, and latency stamps are not forwarded. Subscribing a port again
+# replaces its filters; subscribers stay until unsubscribed.
+
+CONTROL_PORT = 5010  # "subscribe SPEC" / "unsubscribe PORT" / "list", one per datagram; the reply is sent back
+RATE_WINDOW = 1.0    # Seconds of its rate a subscriber may be sent at once
+
+_X, _Y = COLUMN_INDEX["x"], COLUMN_INDEX["y"]
+_TRACK_ID = COLUMN_INDEX["track_id"]
+_TYPE = COLUMN_INDEX["type"]
+_FEED = COLUMN_INDEX["feed"]
+
+
+class RelayError(ValueError):
+    pass
+
+
+class Subscriber:
+    """
+    One local destination port and what it gets: reports from `feeds`
+    (all if None) whose track id is in `tracks`, type code in `types` and
+    ground range in [min_range, max_range] (None: no limit), at most `rate`
+    reports per second, encoded as `schema`.
+    """
+
+    def __init__(self, port, feeds=None, tracks=None, types=None, min_range=None, max_range=None, rate=None,
+                 schema=None):
+        self.port = port
+        self.feeds = None if feeds is None else np.array(sorted(feeds), dtype=np.float64)
+        self.tracks = None if tracks is None else np.array(sorted(tracks), dtype=np.float64)
+        self.types = None if types is None else np.array(sorted(types), dtype=np.float64)
+        self.min_range = min_range
+        self.max_range = max_range
+        self.rate = rate
+        self.bucket = TokenBucket(rate, rate * RATE_WINDOW) if rate else None
+        if schema is None:
+            single = self.feeds is not None and len(self.feeds) == 1
+            schema = FEEDS.get(int(self.feeds[0]), SCHEMA_15) if single else SCHEMA_15
+        self.schema = schema
+        self.matched = self.sent = self.dropped = self.datagrams = 0
+
+    @property
+    def uses_range(self):
+        return self.min_range is not None or self.max_range is not None
+
+    def mask(self, block, ground_range=None):
+        """ Boolean mask of the reports in a raw block that pass the filters; reports missing a value fail. """
+        mask = np.ones(block.shape[1], dtype=bool)
+        if self.feeds is not None:
+            mask &= np.isin(block[_FEED], self.feeds)
+        if self.tracks is not None:
+            mask &= np.isin(block[_TRACK_ID], self.tracks)
+        if self.types is not None:
+            mask &= np.isin(block[_TYPE], self.types)
+        if self.uses_range:
+            if ground_range is None:
+                ground_range = np.hypot(block[_X], block[_Y])
+            if self.min_range is not None:
+                mask &= ground_range >= self.min_range
+            if self.max_range is not None:
+                mask &= ground_range <= self.max_range
+        return mask
+
+    def select(self, block, ground_range=None):
+        """ Indices of the reports to send from `block`, thinned evenly across it when over the rate. """
+        rows = np.flatnonzero(self.mask(block, ground_range))
+        self.matched += len(rows)
+        if self.bucket and len(rows):
+            granted = self.bucket.grant(len(rows))
+            self.dropped += len(rows) - granted
+            rows = rows[np.arange(granted) * len(rows) // granted] if granted else rows[:0]
+        return rows
+
+    def spec(self):
+        """ The subscriber as a spec string, as parse_subscriber takes it. """
+        parts = [str(self.port)]
+        if self.feeds is not None:
+            parts.append("feeds=" + ",".join(str(int(feed)) for feed in self.feeds))
+        if self.tracks is not None:
+            parts.append("tracks=" + ",".join(str(int(track)) for track in self.tracks))
+        if self.types is not None:
+            parts.append("types=" + ",".join(TYPES[int(code)] for code in self.types))
+        if self.uses_range:
+            low, high = ("" if limit is None else f"{limit:g}" for limit in (self.min_range, self.max_range))
+            parts.append(f"range={low}-{high}")
+        if self.rate:
+            parts.append(f"rate={self.rate:g}")
+        parts.append(f"schema={self.schema}")
+        return ":".join(parts)
+
+
+def _numbers(value, convert=int):
+    """ A non-empty, comma-separated list of numbers. """
+    try:
+        numbers = [convert(item) for item in value.split(",") if item]
+    except ValueError:
+        raise RelayError(f"not a list of numbers: {value!r}")
+    if not numbers:
+        raise RelayError("empty list; leave the option out to pass everything")
+    return numbers
+
+
+def _number(value, convert=float):
+    """ One number, or None for an empty value. """
+    try:
+        return convert(value) if value else None
+    except ValueError:
+        raise RelayError(f"not a number: {value!r}")
+
+
+def _type_codes(value):
+    codes = []
+    for name in value.split(","):
+        if name.isdigit() and int(name) < len(TYPES):
+            codes.append(int(name))
+        elif name in TYPES:
+            codes.append(type_code(name))
+        else:
+            raise RelayError(f"unknown type {name!r}; one of {', '.join(TYPES)}")
+    return codes
+
+
+def parse_subscriber(spec):
+    """ "6005" or "6005:feeds=5005:types=Aircraft:range=0-50:rate=2000" -> Subscriber (see the header). """
+    port, *options = spec.strip().split(":")
+    try:
+        port = int(port)
+    except ValueError:
+        raise RelayError(f"not a port: {port!r}")
+    kwargs = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        if key == "feeds":
+            kwargs["feeds"] = _numbers(value)
+        elif key == "tracks":
+            kwargs["tracks"] = _numbers(value)
+        elif key == "types":
+            kwargs["types"] = _type_codes(value)
+        elif key == "range":
+            low, dash, high = value.partition("-")
+            if not dash:
+                raise RelayError(f"range should be MIN-MAX, not {value!r}")
+            kwargs["min_range"], kwargs["max_range"] = _number(low), _number(high)
+        elif key == "rate":
+            kwargs["rate"] = _number(value)
+            if kwargs["rate"] is None or kwargs["rate"] <= 0:
+                raise RelayError(f"rate should be a positive number, not {value!r}")
+        elif key == "schema":
+            kwargs["schema"] = _number(value, int)
+            if kwargs["schema"] not in (SCHEMA_15, SCHEMA_10):
+                raise RelayError(f"schema should be {SCHEMA_15} or {SCHEMA_10}")
+        else:
+            raise RelayError(f"unknown option {key!r}")
+    return Subscriber(port, **kwargs)
+
+
+class Relay:
+    """
+    Fans the decoded blocks of `feeds` (port -> schema) out to the
+    subscribers. `dispatch` is the sink for a ReceiverEngine endpoint;
+    `control` answers the messages arriving on `control_port` (0: none).
+    Sends never block the event loop: a full socket buffer drops reports.
+    """
+
+    def __init__(self, feeds=FEEDS, udp_ip=UDP_IP, control_port=CONTROL_PORT):
+        self.feeds = dict(feeds)
+        self.udp_ip = udp_ip
+        self.control_port = control_port
+        self.subscribers = {}  # Port -> Subscriber
+        self.received = {}     # Feed -> reports
+        self.sock = open_sender_socket()
+        self.sock.setblocking(False)
+
+    def subscribe(self, subscriber):
+        if subscriber.port in self.feeds:
+            raise RelayError(f"port {subscriber.port} is relayed, not a subscriber port")
+        if subscriber.port == self.control_port:
+            raise RelayError(f"port {subscriber.port} is the relay's control port")
+        self.subscribers[subscriber.port] = subscriber
+
+    def unsubscribe(self, port):
+        return self.subscribers.pop(port, None) is not None
+
+    def dispatch(self, block):
+        """ Send each subscriber its share of one decoded block. """
+        if not block.shape[1]:
+            return
+        feed = int(block[_FEED, 0])
+        self.received[feed] = self.received.get(feed, 0) + block.shape[1]
+        subscribers = list(self.subscribers.values())
+        ground_range = np.hypot(block[_X], block[_Y]) if any(s.uses_range for s in subscribers) else None
+        for subscriber in subscribers:
+            rows = subscriber.select(block, ground_range)
+            if not len(rows):
+                continue
+            records = block_to_records(subscriber.schema, block[:, rows])
+            datagrams = encode_records(subscriber.schema, records)
+            per_datagram = records_per_datagram(subscriber.schema)  # As encode_records splits them
+            for i, datagram in enumerate(datagrams):
+                try:
+                    self.sock.sendto(datagram, (self.udp_ip, subscriber.port))
+                except OSError:
+                    subscriber.dropped += len(records) - i * per_datagram  # Socket buffer full; drop the rest
+                    break
+                subscriber.datagrams += 1
+                subscriber.sent += min(per_datagram, len(records) - i * per_datagram)
+
+    def control(self, message):
+        """ Apply one control message; returns the reply text. """
+        command, _, argument = message.strip().partition(" ")
+        try:
+            if command == "subscribe":
+                subscriber = parse_subscriber(argument)
+                self.subscribe(subscriber)
+                return "ok " + subscriber.spec()
+            if command == "unsubscribe":
+                port = _number(argument.strip(), int)
+                if port is None:
+                    raise RelayError("unsubscribe takes a port")
+                return "ok" if self.unsubscribe(port) else f"error: {port} is not subscribed"
+            if command == "list":
+                return "\n".join(subscriber.spec() for subscriber in self.subscribers.values()) or "no subscribers"
+            raise RelayError(f"unknown command {command!r}; subscribe SPEC, unsubscribe PORT or list")
+        except RelayError as e:
+            return f"error: {e}"
+
+    def close(self):
+        self.sock.close()
+
+
+class ControlProtocol(asyncio.DatagramProtocol):
+    def __init__(self, relay):
+        self.relay = relay
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        reply = self.relay.control(data.decode("utf-8", "replace"))
+        print(f"control from {addr[1]}: {data.decode('utf-8', 'replace').strip()} -> {reply.splitlines()[0]}")
+        self.transport.sendto(reply.encode(), addr)
+
+
+async def run_relay(relay, stats_interval=STATS_INTERVAL):
+    """ Relay the feeds and serve the control port until SIGINT / SIGTERM. """
+    engine = ReceiverEngine()
+    for port, schema in relay.feeds.items():
+        engine.add(port, feed_decoder(port, schema), relay.dispatch, udp_ip=relay.udp_ip)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, engine.stop)
+    control = None
+    if relay.control_port:
+        control, _ = await loop.create_datagram_endpoint(
+            lambda: ControlProtocol(relay), sock=open_receiver_socket(relay.udp_ip, relay.control_port))
+    server = asyncio.create_task(engine.serve())
+    previous_time = time.monotonic()
+    previous_received, previous_sent = {}, {}
+    try:
+        while not server.done():
+            await asyncio.wait([server], timeout=stats_interval)
+            now = time.monotonic()
+            elapsed = now - previous_time
+            received = ", ".join(f"{feed}: {(count - previous_received.get(feed, 0)) / elapsed:.0f}/s"
+                                 for feed, count in sorted(relay.received.items()))
+            print(f"received {received or 'nothing'}; {len(relay.subscribers)} subscriber(s)")
+            for subscriber in relay.subscribers.values():
+                rate = (subscriber.sent - previous_sent.get(subscriber.port, 0)) / elapsed
+                print(f"  -> {subscriber.spec()}: {rate:.0f} reports/s, {subscriber.sent} sent, "
+                      f"{subscriber.dropped} dropped")
+                previous_sent[subscriber.port] = subscriber.sent
+            previous_received.update(relay.received)
+            previous_time = now
+        await server  # Re-raises bind errors
+    finally:
+        if control:
+            control.close()
+        relay.close()
+
+
+def send_control(message, udp_ip=UDP_IP, control_port=CONTROL_PORT, timeout=2.0):
+    """ Send one control message to a running relay and return its reply. """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(message.encode(), (udp_ip, control_port))
+        return sock.recv(RECV_BUFSIZE).decode()
+
+
+def subscriber_arg(spec):
+    try:
+        return parse_subscriber(spec)
+    except RelayError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Receive the radar feeds once and relay them to local subscribers")
+    parser.add_argument("--port", type=parse_port, action="append",
+                        help="PORT or PORT:SCHEMA to relay; repeatable (default: 5005:15 and 5008:10)")
+    parser.add_argument("--ip", default=UDP_IP)
+    parser.add_argument("--subscribe", type=subscriber_arg, action="append", default=[], metavar="SPEC",
+                        help="Subscriber to start with, e.g. 6005:feeds=5005:rate=1000; repeatable")
+    parser.add_argument("--control-port", type=int, default=CONTROL_PORT,
+                        help="Port taking subscribe / unsubscribe / list messages; 0 disables it")
+    parser.add_argument("--control", metavar="MESSAGE", help="Send MESSAGE to a running relay, print the reply and exit")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL, help="Seconds between stats")
+    args = parser.parse_args()
+
+    if args.control:
+        try:
+            print(send_control(args.control, args.ip, args.control_port))
+        except socket.timeout:
+            parser.exit(1, f"No reply from a relay on port {args.control_port}\n")
+        parser.exit()
+
+    relay = Relay(dict(args.port or FEEDS.items()), args.ip, args.control_port)
+    try:
+        for subscriber in args.subscribe:
+            relay.subscribe(subscriber)
+    except RelayError as e:
+        parser.error(str(e))
+    print(f"Relaying {', '.join(map(str, relay.feeds))}; control on port {args.control_port or 'off'}")
+    asyncio.run(run_relay(relay, args.stats_interval))
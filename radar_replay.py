@@ -0,0 +1,45 @@
+import time
+
+
+class ReplayClock:
+    """
+    Schedules recorded timestamps onto the monotonic clock.
+
+    The first timestamp seen anchors the replay; every later one is due at
+    `anchor + (t - t_first) / speed`. Deadlines are absolute, so sleep
+    overshoot and send time are corrected on the next row instead of
+    accumulating. `speed <= 0` replays as fast as possible.
+    """
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.max_lag = 0.0  # Worst lateness seen, in seconds
+        self.reset()
+
+    def reset(self):
+        """ Forget the anchor, e.g. when a looped replay starts over. """
+        self._origin = None
+
+    def deadline(self, data_time):
+        data_origin, clock_origin = self._origin
+        return clock_origin + (data_time - data_origin) / self.speed
+
+    def is_due(self, data_time):
+        if self.speed <= 0 or self._origin is None:
+            return True
+        return time.monotonic() >= self.deadline(data_time)
+
+    def wait(self, data_time):
+        """ Sleep until `data_time` is due. Returns how late it already was, in seconds. """
+        if self.speed <= 0:
+            return 0.0
+        now = time.monotonic()
+        if self._origin is None:
+            self._origin = (data_time, now)
+            return 0.0
+        delay = self.deadline(data_time) - now
+        if delay > 0:
+            time.sleep(delay)
+            return 0.0
+        self.max_lag = max(self.max_lag, -delay)
+        return -delay
@@ -0,0 +1,80 @@
+import numpy as np
+
+from radar_buffer import COLUMNS, newest_per_feed
+from radar_tracks import TrackTable
+
+# Retention policy for a long-running display: what the stores keep.
+#
+#   window         only reports whose `time` is within this many seconds of the
+#                  newest one of the same feed (None / 0 keeps everything the
+#                  stores can hold); feeds are windowed separately because
+#                  their clocks need not agree
+#   track_history  reports kept per track (TrackTable history length)
+#   memory_budget  bytes shared by the stores: half for the report buffer, a
+#                  quarter each for the track table and the time pyramid
+#
+# Every store evicts in amortized O(1) per report (see the discard_before
+# methods), so applying the policy on each ingest tick is cheap. The report
+# buffer only evicts from its oldest end, so a feed's expired reports stay
+# there until the reports older than them have gone too.
+
+DEFAULT_WINDOW = 300.0                  # Seconds
+DEFAULT_TRACK_HISTORY = 64              # Reports per track
+DEFAULT_MEMORY_BUDGET = 256 * 2 ** 20   # Bytes
+_BUFFER_SHARE, _TRACK_SHARE, _PYRAMID_SHARE = 0.5, 0.25, 0.25
+
+
+class Retention:
+    """
+    Applies a window / per-track / memory-budget policy to a RingBuffer, a
+    TrackTable and (optionally) a TimePyramid. Call `apply` with every
+    ingested block, from the thread that owns the stores.
+    """
+
+    def __init__(self, buffer, tracks, pyramid=None, window=DEFAULT_WINDOW, track_history=DEFAULT_TRACK_HISTORY,
+                 memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.buffer = buffer
+        self.tracks = tracks
+        self.pyramid = pyramid
+        self.newest = {}  # Feed (None for untagged reports) -> newest `time` seen, the end of its window
+        self.configure(window, track_history, memory_budget)
+
+    def configure(self, window=None, track_history=None, memory_budget=None, buffer_capacity=None):
+        """ Change any of the settings; the buffer gets `buffer_capacity` or what its share of the budget holds, whichever is less. """
+        if window is not None:
+            self.window = window or None
+        if track_history is not None:
+            self.tracks.set_history_length(track_history)
+        if memory_budget is not None:
+            self.memory_budget = memory_budget
+        row_bytes = len(COLUMNS) * 2 * 8  # The buffer is mirrored
+        capacity = self.buffer.capacity if buffer_capacity is None else buffer_capacity
+        self.buffer.resize(max(1, min(capacity, int(self.memory_budget * _BUFFER_SHARE) // row_bytes)))
+        self.max_tracks = max(1, int(self.memory_budget * _TRACK_SHARE) //
+                              TrackTable.track_nbytes(self.tracks.history_length))
+        if self.pyramid is not None:
+            entry_bytes = 8 + 2 * 8 * len(self.pyramid.quantities)
+            self.pyramid.max_entries = max(1, int(self.memory_budget * _PYRAMID_SHARE) //
+                                           (entry_bytes * self.pyramid.levels))
+        self.apply()
+
+    def apply(self, block=None):
+        """ Evict what falls outside the policy after `block` (derived) was stored. Returns the reports dropped from the buffer. """
+        if block is not None and block.shape[1]:
+            for feed, newest in newest_per_feed(block).items():
+                self.newest[feed] = max(self.newest.get(feed, -np.inf), newest)
+        dropped = 0
+        if self.window and self.newest:
+            cutoffs = {feed: newest - self.window for feed, newest in self.newest.items()}
+            dropped = self.buffer.discard_before("time", cutoffs, by="feed")
+            self.tracks.discard_before(cutoffs, by="feed")
+            if self.pyramid is not None and "feed" in self.pyramid.keys:
+                self.pyramid.discard_before(cutoffs, by="feed")
+            elif self.pyramid is not None:
+                self.pyramid.discard_before(min(cutoffs.values()))
+        self.tracks.limit(self.max_tracks)
+        return dropped
+
+    def usage(self):
+        """ Bytes held by the stores. """
+        return self.buffer.nbytes + self.tracks.nbytes + (self.pyramid.nbytes if self.pyramid is not None else 0)
@@ -0,0 +1,113 @@
+import time
+
+from PyQt5.QtCore import QTimer
+
+# Frame scheduling for the display, in place of FuncAnimation's fixed interval.
+#
+# A frame is drawn only when something asked for one (`invalidate`, e.g. when
+# new reports were ingested) or the view animates by itself (the PPI sweep),
+# never more often than `max_fps`, and never before the previous frame is
+# done: the next one is timed from the end of the last. A frame that takes
+# longer than `budget` doubles the decimation `step` handed to the update
+# function (1 = full detail); frames well within it halve it again.
+
+DEFAULT_MAX_FPS = 20
+MAX_STEP = 64  # Coarsest level of detail: every 64th point
+
+
+class FrameScheduler:
+    """
+    Redraws the artists returned by `update(step)` on `canvas`, blitting
+    them over a cached background. `continuous` views are redrawn at the
+    capped rate; others only after `invalidate`. `drawn`, if given, is
+    called after each frame has been painted.
+    """
+
+    def __init__(self, canvas, update, max_fps=DEFAULT_MAX_FPS, budget=None, continuous=False, drawn=None):
+        self.canvas = canvas
+        self.update = update
+        self.min_interval = 1.0 / max_fps
+        self.budget = self.min_interval / 2 if budget is None else budget
+        self.continuous = continuous
+        self.drawn = drawn
+        self.step = 1
+        self.frames = 0        # Frames drawn
+        self.over_budget = 0   # Of which took longer than `budget`
+        self.last_frame_time = 0.0
+        self._artists = ()
+        self._background = None
+        self._dirty = False
+        self._next_frame = 0.0
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._frame)
+        self._draw_cid = None
+
+    def start(self):
+        """ Draw the first frame on the next canvas.draw(), then as scheduled. """
+        self._artists = self.update(self.step)
+        for artist in self._artists:
+            artist.set_animated(True)  # Left out of full draws; blitted over the background instead
+        self._draw_cid = self.canvas.mpl_connect("draw_event", self._on_draw)
+        if self.continuous:
+            self._schedule()
+
+    def stop(self):
+        self._timer.stop()
+        if self._draw_cid is not None:
+            self.canvas.mpl_disconnect(self._draw_cid)
+            self._draw_cid = None
+        self._background = None
+
+    def invalidate(self):
+        """ Something the view shows has changed: draw it at the next allowed time. """
+        self._dirty = True
+        self._schedule()
+
+    def _schedule(self):
+        if self._draw_cid is None or self._timer.isActive():
+            return
+        delay = max(0.0, self._next_frame - time.perf_counter())
+        self._timer.start(int(delay * 1000))
+
+    def _on_draw(self, event):
+        # Full redraw (first show, resize, new axes): re-cache the background, then put the artists back
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._blit()
+
+    def _blit(self):
+        self.canvas.restore_region(self._background)
+        for artist in self._artists:
+            artist.axes.draw_artist(artist)
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def _frame(self):
+        self._dirty = False
+        start = time.perf_counter()
+        self._artists = self.update(self.step)
+        if self._background is None:
+            self.canvas.draw()  # Caches the background and blits via _on_draw
+        else:
+            self._blit()
+        end = time.perf_counter()
+        elapsed = end - start
+        self.frames += 1
+        self.last_frame_time = elapsed
+
+        # Level of detail: coarser when over budget, finer again once there is room for twice the work
+        if elapsed > self.budget:
+            self.over_budget += 1
+            self.step = min(2 * self.step, MAX_STEP)
+        elif self.step > 1 and elapsed < self.budget / 3:
+            self.step //= 2
+        # A slow frame also pushes back the next one, leaving the event loop at least as long again
+        self._next_frame = end + max(self.min_interval, elapsed)
+
+        if self.drawn:
+            QTimer.singleShot(0, self.drawn)  # Runs after this frame has been painted
+        if self.continuous or self._dirty:
+            self._schedule()
+
+    def stats(self):
+        return {"frames": self.frames, "over_budget": self.over_budget, "step": self.step,
+                "last_frame_ms": 1000 * self.last_frame_time}
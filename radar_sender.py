@@ -0,0 +1,108 @@
+import time
+
+from radar_codec import HEADER, MAX_DATAGRAM, RECORD_DTYPES, STAMP, encode_records, records_per_datagram
+from radar_udp import open_sender_socket
+
+# Sending side of the replays: reports leave as pre-encoded datagrams, a
+# chunk at a time, paced by a token bucket rather than a sleep per report,
+# with a summary line every few seconds instead of a print per datagram.
+# Fast enough that a loopback test measures the receiver, not the sender.
+
+SUMMARY_INTERVAL = 5.0  # Seconds between summary lines
+BURST_TIME = 0.01       # Default bucket depth, in seconds of the rate
+MAX_CHUNK = 4096        # Reports encoded at once when not rate-limited
+
+
+class TokenBucket:
+    """
+    Allows `rate` reports per second on the monotonic clock, in bursts of at
+    most `burst`. Taking more tokens than are left runs into debt and waits
+    it out, so a large take is paced rather than refused.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate * BURST_TIME)
+        self._tokens = self.burst
+        self._time = time.monotonic()
+
+    def take(self, n):
+        """ Take `n` tokens, sleeping only as long as the bucket needs to refill. Returns the seconds waited. """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._time) * self.rate) - n
+        self._time = now
+        if self._tokens >= 0:
+            return 0.0
+        delay = -self._tokens / self.rate
+        time.sleep(delay)
+        return delay
+
+    def grant(self, n):
+        """ Take up to `n` tokens without waiting, for callers that drop rather than delay. Returns how many. """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._time) * self.rate)
+        self._time = now
+        granted = int(min(n, max(self._tokens, 0)))
+        self._tokens -= granted
+        return granted
+
+
+class BatchSender:
+    """
+    Sends structured arrays of RECORD_DTYPES[schema] records to one UDP
+    destination. `rate` (reports per second, None for as fast as possible)
+    is enforced by a TokenBucket; `per_datagram` caps the reports per
+    datagram (default: as many as fit into `max_size`). With `stamped`,
+    records carry sequence numbers and a send time taken as their chunk is
+    encoded, at most one bucket burst before it leaves.
+    """
+
+    def __init__(self, schema, udp_ip, udp_port, rate=None, burst=None, per_datagram=None, stamped=False,
+                 max_size=MAX_DATAGRAM, summary_interval=SUMMARY_INTERVAL):
+        self.schema = schema
+        self.address = (udp_ip, udp_port)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        record_size = RECORD_DTYPES[schema].itemsize + (STAMP.size if stamped else 0)
+        if per_datagram:
+            max_size = min(max_size, HEADER.size + per_datagram * record_size)
+        self.max_size = max_size
+        self.per_datagram = records_per_datagram(schema, max_size, stamped)
+        # Rate-limited chunks are one bucket burst, so low rates are paced evenly rather than in datagram-sized bursts
+        self.chunk = max(1, int(self.bucket.burst)) if self.bucket else max(self.per_datagram, MAX_CHUNK)
+        self.seq = 0 if stamped else None
+        self.summary_interval = summary_interval
+        self.sock = open_sender_socket()
+        self.reports = self.datagrams = self.bytes = 0
+        self.started = time.monotonic()
+        self._last_summary = (self.started, 0)
+
+    def send(self, records):
+        for start in range(0, len(records), self.chunk):
+            part = records[start:start + self.chunk]
+            if self.bucket:
+                self.bucket.take(len(part))
+            datagrams = encode_records(self.schema, part, self.max_size, self.seq)
+            if self.seq is not None:
+                self.seq += len(part)
+            for datagram in datagrams:
+                self.sock.sendto(datagram, self.address)
+                self.bytes += len(datagram)
+            self.reports += len(part)
+            self.datagrams += len(datagrams)
+            self._maybe_summarize()
+
+    def _maybe_summarize(self):
+        now = time.monotonic()
+        last_time, last_reports = self._last_summary
+        if self.summary_interval and now - last_time >= self.summary_interval:
+            print(f"{self.reports} reports, {self.datagrams} datagrams sent; "
+                  f"{(self.reports - last_reports) / (now - last_time):.0f} reports/s")
+            self._last_summary = (now, self.reports)
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f"Sent {self.reports} reports in {self.datagrams} datagrams ({self.bytes} bytes) over {elapsed:.1f} s, "
+                f"{self.reports / elapsed:.0f} reports/s")
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from radar_buffer import COLUMNS, DEFAULT_CAPACITY, RingBuffer, derive_block
+from radar_ingest import UDP_IP, feed_decoder
+from radar_receiver import ReceiverEngine
+
+# Multiprocess ingest: receiving and decoding run in worker processes, one
+# per port, so they no longer compete with rendering for the GIL and a slow
+# frame cannot stall the sockets.
+#
+# Each worker writes derived blocks into its own SharedRing; the GUI process
+# attaches the rings and copies out what is new on every ingest tick
+# (ProcessIngest.drain, a drop-in for BlockQueue.drain).
+#
+# Workers are started as `python radar_shm.py --ring NAME --port PORT ...`
+# rather than through multiprocessing, whose spawned children re-import the
+# launching script (and with it Qt and matplotlib).
+
+_SEQ, _HEAD, _SIZE, _TOTAL, _CAPACITY = range(5)
+_HEADER_WORDS = 8  # int64 counters ahead of the columns
+STOP_POLL = 0.2    # Seconds between a worker's checks for shutdown
+START_TIMEOUT = 5.0  # Seconds start() waits for each worker to bind its port
+
+
+class SharedRing(RingBuffer):
+    """
+    RingBuffer whose columns and counters live in a shared_memory block.
+
+    One process creates and writes it; others attach by `name` and only
+    read, through `read_since`. Each append is bracketed by two increments
+    of a sequence counter (odd while writing), so a reader that sees the
+    same even value before and after copying has a consistent snapshot.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, name=None, create=False):
+        if create:
+            size = (_HEADER_WORDS + len(COLUMNS) * 2 * capacity) * 8
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            # Only the creator unlinks; otherwise a worker's own resource tracker would on exit
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._owner = create
+        self._header = np.ndarray(_HEADER_WORDS, dtype=np.int64, buffer=self._shm.buf)
+        if create:
+            self._header[:] = 0
+            self._header[_CAPACITY] = capacity
+        self.capacity = int(self._header[_CAPACITY])
+        self._data = np.ndarray((len(COLUMNS), 2 * self.capacity), dtype=np.float64,
+                                buffer=self._shm.buf, offset=_HEADER_WORDS * 8)
+        if create:
+            self._data.fill(np.nan)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    # RingBuffer's counters, kept in the shared header
+    @property
+    def _head(self):
+        return int(self._header[_HEAD])
+
+    @_head.setter
+    def _head(self, value):
+        self._header[_HEAD] = value
+
+    @property
+    def _size(self):
+        return int(self._header[_SIZE])
+
+    @_size.setter
+    def _size(self, value):
+        self._header[_SIZE] = value
+
+    @property
+    def total(self):
+        return int(self._header[_TOTAL])
+
+    @total.setter
+    def total(self, value):
+        self._header[_TOTAL] = value
+
+    def _allocate(self, capacity):
+        raise ValueError("a SharedRing cannot be resized or cleared")
+
+    def append_block(self, block):
+        """ Writer only: append under the sequence counter. """
+        self._header[_SEQ] += 1
+        try:
+            super().append_block(block)
+        finally:
+            self._header[_SEQ] += 1
+
+    def read_since(self, seen):
+        """
+        Copy the rows appended after the writer's total reached `seen`.
+        Returns (block or None, new total, rows lost because they were
+        already overwritten).
+        """
+        while True:
+            seq = self._header[_SEQ]
+            if seq & 1:
+                time.sleep(0)  # Writer is mid-append
+                continue
+            total = int(self._header[_TOTAL])
+            n = total - seen
+            if n <= 0:
+                return None, total, 0
+            lost = max(0, n - self.capacity)
+            block = self.last(n - lost).copy()
+            if self._header[_SEQ] == seq:
+                return block, total, lost
+
+    def close(self):
+        self._header = self._data = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _ingest_worker(ring_name, port, schema, udp_ip, ready_fd):
+    """
+    Worker process: receive `port` and append derived blocks to the ring
+    until SIGTERM or the parent exits. Writes to `ready_fd` once bound.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent decides when to stop
+    ring = SharedRing(name=ring_name)
+    decode = feed_decoder(port, schema)
+    engine = ReceiverEngine()
+    engine.add(port, lambda packets: derive_block(decode(packets)), ring.append_block, udp_ip=udp_ip)
+    parent = os.getppid()
+
+    async def serve():
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, engine.stop)
+        server = asyncio.create_task(engine.serve())
+        ready = False
+        while not server.done():
+            await asyncio.wait([server], timeout=0.01 if not ready else STOP_POLL)
+            if not ready and engine.running:
+                os.write(ready_fd, b"ready")
+                os.close(ready_fd)
+                ready = True
+            if os.getppid() != parent:
+                engine.stop()
+        await server  # Re-raises bind errors, so the worker exits non-zero
+
+    try:
+        asyncio.run(serve())
+    finally:
+        ring.close()
+
+
+class ProcessIngest:
+    """
+    One ingest worker process per port, each writing its own SharedRing.
+    `drain` returns everything new across the rings as one block (or None),
+    like BlockQueue.drain; `dropped` counts reports overwritten before the
+    GUI got to them, so size `capacity` for the longest expected stall.
+    """
+
+    def __init__(self, ports, capacity=DEFAULT_CAPACITY, udp_ip=UDP_IP):
+        self.ports = dict(ports)
+        self.capacity = capacity
+        self.udp_ip = udp_ip
+        self.dropped = 0
+        self._rings = []
+        self._seen = []
+        self._processes = []
+
+    def start(self):
+        """ Start a worker per port; returns once every port is bound, or stops them all and raises RuntimeError. """
+        for port, schema in self.ports.items():
+            ring = SharedRing(self.capacity, create=True)
+            self._rings.append(ring)
+            self._seen.append(0)
+            read_fd, write_fd = os.pipe()
+            try:
+                process = subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), "--ring", ring.name, "--port", str(port),
+                     "--schema", str(schema), "--ip", self.udp_ip, "--ready-fd", str(write_fd)],
+                    pass_fds=(write_fd,))
+            finally:
+                os.close(write_fd)
+            self._processes.append(process)
+            try:
+                ready = self._wait_ready(read_fd)
+            finally:
+                os.close(read_fd)
+            if not ready:
+                try:
+                    code = process.wait(1.0)
+                except subprocess.TimeoutExpired:
+                    code = None  # Still running, but not bound in time
+                self.stop()
+                raise RuntimeError(f"ingest worker for port {port} did not start"
+                                   + (f" (exit code {code})" if code is not None else ""))
+
+    @staticmethod
+    def _wait_ready(read_fd):
+        # EOF (the worker exited) or a timeout both mean failure
+        deadline = time.monotonic() + START_TIMEOUT
+        os.set_blocking(read_fd, False)
+        while time.monotonic() < deadline:
+            try:
+                return os.read(read_fd, 16) == b"ready"
+            except BlockingIOError:
+                time.sleep(0.01)
+        return False
+
+    def failed(self):
+        """ Ports whose worker has exited while it should be running. """
+        return [port for port, process in zip(self.ports, self._processes) if process.poll() is not None]
+
+    def drain(self):
+        blocks = []
+        for i, ring in enumerate(self._rings):
+            block, self._seen[i], lost = ring.read_since(self._seen[i])
+            self.dropped += lost
+            if block is not None:
+                blocks.append(block)
+        if not blocks:
+            return None
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks, axis=1)
+
+    def stop(self):
+        for process in self._processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(2 * STOP_POLL + 1.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        for ring in self._rings:
+            ring.close()
+        self._rings, self._seen, self._processes = [], [], []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest worker for ProcessIngest; not meant to be run by hand")
+    parser.add_argument("--ring", required=True, help="SharedRing to write to")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--schema", type=int, required=True)
+    parser.add_argument("--ip", default=UDP_IP)
+    parser.add_argument("--ready-fd", type=int, required=True, help="Pipe written to once the port is bound")
+    args = parser.parse_args()
+    _ingest_worker(args.ring, args.port, args.schema, args.ip, args.ready_fd)
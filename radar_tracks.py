@@ -0,0 +1,278 @@
+import numpy as np
+
+from radar_buffer import COLUMN_INDEX, COLUMNS, derive_block, row_cutoffs
+
+DEFAULT_HISTORY = 64      # Reports kept per track
+INITIAL_TRACKS = 256      # Slots allocated up front; doubled when exhausted
+
+_TIME = COLUMN_INDEX["time"]
+_POSITION = [COLUMN_INDEX[name] for name in ("x", "y", "z")]
+_VELOCITY = [COLUMN_INDEX[name] for name in ("xv", "yv", "zv")]
+
+
+class TrackTable:
+    """
+    Latest state and bounded history per track_id.
+
+    `_slots` maps each track_id to a row ("slot") of the preallocated
+    arrays, so finding and updating a track is O(1). Each slot holds the
+    newest report and a ring of the last `history_length` reports; rows
+    use the same COLUMNS as RingBuffer.
+
+    Receivers merging several feeds pass keys=("feed", "track_id"), so the
+    same track number from two sensors stays two tracks; track ids are then
+    (feed, track_id) tuples.
+
+    With smoothing=(alpha, beta) each track also runs an alpha-beta filter
+    on its position, fed by the newest report per track and block and
+    seeded with the reported velocity; `extrapolate` then starts from the
+    filtered state instead of the raw report.
+    """
+
+    def __init__(self, history_length=DEFAULT_HISTORY, initial_tracks=INITIAL_TRACKS, keys=("track_id",),
+                 smoothing=None):
+        self.history_length = history_length
+        self.keys = tuple(keys)
+        self.smoothing = smoothing
+        self._key_index = [COLUMN_INDEX[name] for name in self.keys]
+        self._slots = {}
+        self._track_ids = []
+        self._allocate(initial_tracks)
+        self.serial = 0  # Reports ever applied; also stamps each slot's last update
+
+    def _allocate(self, capacity):
+        self._state = np.full((capacity, len(COLUMNS)), np.nan)
+        self._history = np.full((capacity, self.history_length, len(COLUMNS)), np.nan)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._updated = np.zeros(capacity, dtype=np.int64)
+        self._filter = np.full((capacity, 7), np.nan)  # Smoothed x, y, z, xv, yv, zv and the time they refer to
+
+    def _grow(self):
+        state, history, count, updated, filtered = self._state, self._history, self._count, self._updated, self._filter
+        self._allocate(2 * len(count))
+        n = len(count)
+        self._state[:n] = state
+        self._history[:n] = history
+        self._count[:n] = count
+        self._updated[:n] = updated
+        self._filter[:n] = filtered
+
+    def _slot(self, track_id):
+        slot = self._slots.get(track_id)
+        if slot is None:
+            slot = len(self._track_ids)
+            if slot == len(self._count):
+                self._grow()
+            self._slots[track_id] = slot
+            self._track_ids.append(track_id)
+        return slot
+
+    def __len__(self):
+        return len(self._track_ids)
+
+    def __contains__(self, track_id):
+        return track_id in self._slots
+
+    def track_ids(self):
+        return list(self._track_ids)
+
+    def update_block(self, block):
+        """ Apply a (len(COLUMNS), n) block (raw blocks are derived first); reports missing a key are skipped. """
+        if block.shape[0] != len(COLUMNS):
+            block = derive_block(block)
+        keys = block[self._key_index]
+        rows = block.T[~np.isnan(keys).any(axis=0)]
+        n = len(rows)
+        if n == 0:
+            return
+        keys = rows[:, self._key_index].astype(np.int64).tolist()
+        if len(self.keys) == 1:
+            keys = (key for key, in keys)
+        else:
+            keys = map(tuple, keys)
+        slots = np.fromiter((self._slot(key) for key in keys), dtype=np.int64, count=n)
+
+        # Rank of each report among the reports of the same track in this block
+        order = np.argsort(slots, kind="stable")
+        sorted_slots = slots[order]
+        starts = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n) - np.repeat(starts, sizes)
+        size = np.empty(n, dtype=np.int64)
+        size[order] = np.repeat(sizes, sizes)
+
+        # Only the newest history_length reports per track can survive in the ring
+        keep = rank >= size - self.history_length
+        positions = (self._count[slots] + rank) % self.history_length
+        self._history[slots[keep], positions[keep]] = rows[keep]
+
+        newest = rank == size - 1
+        self._state[slots[newest]] = rows[newest]
+        self._count[slots[newest]] += size[newest]
+        self._updated[slots[newest]] = self.serial + 1 + np.flatnonzero(newest)
+        self.serial += n
+        if self.smoothing:
+            self._smooth(slots[newest], rows[newest])
+
+    def _smooth(self, slots, rows):
+        """ One alpha-beta step per track, all tracks at once. """
+        alpha, beta = self.smoothing
+        measured = rows[:, _POSITION]
+        times = rows[:, _TIME]
+        state = self._filter[slots]
+        new = np.isnan(state[:, 6]) | np.isnan(state[:, :3]).any(axis=1)
+        dt = np.where(new, 0.0, np.nan_to_num(times - state[:, 6]).clip(0))
+        predicted = state[:, :3] + state[:, 3:6] * dt[:, None]
+        residual = measured - predicted
+        state[:, :3] = predicted + alpha * residual
+        moved = dt > 0
+        state[moved, 3:6] += beta * residual[moved] / dt[moved, None]
+        state[:, 6] = np.fmax(state[:, 6], times)
+        # New tracks start at the report, moving at the reported velocity
+        state[new, :3] = measured[new]
+        state[new, 3:6] = np.nan_to_num(rows[new][:, _VELOCITY])
+        state[new, 6] = times[new]
+        self._filter[slots] = state
+
+    def _drop(self, drop):
+        """ Forget the tracks whose slots are set in the boolean `drop`, compacting the rest to the front. """
+        active = len(self._track_ids)
+        keep = np.flatnonzero(~drop[:active])
+        n = len(keep)
+        self._state[:n] = self._state[keep]
+        self._history[:n] = self._history[keep]
+        self._count[:n] = self._count[keep]
+        self._updated[:n] = self._updated[keep]
+        self._filter[:n] = self._filter[keep]
+        self._filter[n:active] = np.nan
+        self._state[n:active] = np.nan
+        self._history[n:active] = np.nan
+        self._count[n:active] = 0
+        self._updated[n:active] = 0
+        self._track_ids = [self._track_ids[slot] for slot in keep.tolist()]
+        self._slots = {track_id: slot for slot, track_id in enumerate(self._track_ids)}
+        return active - n
+
+    def discard_before(self, cutoff, by=None):
+        """
+        Forget tracks whose newest report is older than `cutoff` (by `time`);
+        with `by`, `cutoff` is a dict per value of that column (see
+        radar_buffer.row_cutoffs). Returns the number dropped.
+        """
+        active = len(self._track_ids)
+        if by is not None:
+            cutoff = row_cutoffs(self._state[:active, COLUMN_INDEX[by]], cutoff)
+        stale = self._state[:active, _TIME] < cutoff
+        return self._drop(stale) if stale.any() else 0
+
+    def limit(self, max_tracks):
+        """
+        Keep at most `max_tracks`, forgetting the least recently updated.
+        Trims to 3/4 of the limit, so the O(tracks) compaction is amortized.
+        """
+        active = len(self._track_ids)
+        if active <= max_tracks:
+            return 0
+        keep = max_tracks - max_tracks // 4
+        drop = np.ones(active, dtype=bool)
+        drop[np.argsort(self._updated[:active])[active - keep:]] = False
+        return self._drop(drop)
+
+    def set_history_length(self, history_length):
+        """ Change the reports kept per track, keeping the newest of each history. """
+        if history_length == self.history_length:
+            return
+        histories = [self.history(track_id) for track_id in self._track_ids]
+        self.history_length = history_length
+        self._history = np.full((len(self._count), history_length, len(COLUMNS)), np.nan)
+        for slot, history in enumerate(histories):
+            history = history[:, -history_length:]
+            self._history[slot, :history.shape[1]] = history.T
+            self._count[slot] = history.shape[1]
+
+    @property
+    def nbytes(self):
+        return (self._state.nbytes + self._history.nbytes + self._count.nbytes + self._updated.nbytes +
+                self._filter.nbytes)
+
+    @staticmethod
+    def track_nbytes(history_length):
+        """ Memory per track slot. """
+        return (history_length + 1) * len(COLUMNS) * 8 + 16 + 7 * 8
+
+    def latest(self, track_id):
+        """ Newest report of one track as a dict, or None for an unknown track. """
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return None
+        return dict(zip(COLUMNS, self._state[slot]))
+
+    def history(self, track_id):
+        """ Up to `history_length` reports of one track, oldest first, shape (len(COLUMNS), n). """
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return np.empty((len(COLUMNS), 0))
+        count = self._count[slot]
+        ring = self._history[slot]
+        if count <= self.history_length:
+            return ring[:count].T.copy()
+        start = count % self.history_length
+        return np.concatenate((ring[start:], ring[:start])).T
+
+    def trails(self, columns, n=None, out=None):
+        """
+        Histories of the `n` most recently updated tracks (all if None) as
+        polylines for radar_trails: shape (tracks, history_length,
+        len(columns)), oldest first, NaN-padded at the start of short
+        histories. Written into `out` when given.
+        """
+        active = len(self._track_ids)
+        order = np.argsort(self._updated[:active])[::-1]
+        if n is not None:
+            order = order[:n]
+        length = self.history_length
+        count = self._count[order]
+        k = np.arange(length)
+        positions = (count[:, None] - length + k) % length  # Ring slot of each point, oldest first
+        columns = np.array([COLUMN_INDEX[name] for name in columns])
+        if out is None:
+            out = np.empty((len(order), length, len(columns)))
+        out[...] = self._history[order[:, None, None], positions[:, :, None], columns]
+        out[k < length - count[:, None]] = np.nan
+        return out
+
+    def extrapolate(self, t, n=None, max_coast=None, by=None):
+        """
+        Positions of the `n` most recently updated tracks (all if None, same
+        order as `current`) advanced to time `t` along their velocity, shape
+        (3, n) for x, y, z. With `by`, `t` is a dict of times per value of
+        that column (see radar_buffer.row_cutoffs), e.g. per feed; tracks of
+        other groups are not advanced. Tracks whose last report is more than
+        `max_coast` seconds old are not advanced either, but left at that
+        report; missing velocities count as zero.
+        """
+        active = len(self._track_ids)
+        order = np.argsort(self._updated[:active])[::-1]
+        if n is not None:
+            order = order[:n]
+        if by is not None:
+            t = row_cutoffs(self._state[order, COLUMN_INDEX[by]], t, default=np.nan)
+        if self.smoothing:
+            state = self._filter[order]
+            position, velocity, since = state[:, :3], state[:, 3:6], state[:, 6]
+        else:
+            state = self._state[order]
+            position, velocity, since = state[:, _POSITION], np.nan_to_num(state[:, _VELOCITY]), state[:, _TIME]
+        dt = np.nan_to_num(t - since).clip(0)
+        if max_coast is not None:
+            dt[dt > max_coast] = 0.0
+        return (position + velocity * dt[:, None]).T
+
+    def current(self, n=None):
+        """ Latest state of the `n` most recently updated tracks (all if None), newest first, shape (len(COLUMNS), n). """
+        active = len(self._track_ids)
+        order = np.argsort(self._updated[:active])[::-1]
+        if n is not None:
+            order = order[:n]
+        return self._state[order].T
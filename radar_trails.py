@@ -0,0 +1,58 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+
+# Track trails: the recent positions of every track as one polyline each,
+# all drawn by a single LineCollection, so the draw cost stays flat as the
+# number of tracks grows.
+#
+# Trails are (tracks, length, 2) arrays, oldest point first. Tracks with
+# fewer reports than `length` are NaN-padded at the start; matplotlib skips
+# NaN vertices, so a short trail simply starts later.
+
+DEFAULT_TRAIL_LENGTH = 32  # Points per trail
+
+
+def group_trails(track_ids, points, length=DEFAULT_TRAIL_LENGTH):
+    """
+    Trails from reports in arrival order (e.g. RingBuffer columns): the last
+    `length` `points` (n, dims) of each distinct `track_ids` value, shape
+    (tracks, length, dims). Reports without a track_id are skipped.
+    """
+    valid = ~np.isnan(track_ids)
+    track_ids, points = track_ids[valid], points[valid]
+    n = len(track_ids)
+    if n == 0:
+        return np.empty((0, length, points.shape[1]))
+    order = np.argsort(track_ids, kind="stable")  # Stable: arrival order within each track
+    sorted_ids = track_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    track = np.repeat(np.arange(len(starts)), sizes)
+    from_end = np.repeat(starts + sizes, sizes) - 1 - np.arange(n)  # 0 for the newest report of its track
+    keep = from_end < length
+    trails = np.full((len(starts), length, points.shape[1]), np.nan)
+    trails[track[keep], length - 1 - from_end[keep]] = points[order[keep]]
+    return trails
+
+
+class Trails:
+    """
+    One LineCollection of trails on `ax`. `segments(tracks)` hands out the
+    array to fill for a frame, reused from frame to frame; `update` pushes
+    it (or any trails array) into the collection and returns the artist.
+    """
+
+    def __init__(self, ax, length=DEFAULT_TRAIL_LENGTH, **style):
+        self.length = length
+        self.collection = LineCollection([], **style)
+        ax.add_collection(self.collection, autolim=False)
+        self._segments = np.empty((0, length, 2))
+
+    def segments(self, tracks):
+        if tracks > len(self._segments) or self._segments.shape[1] != self.length:
+            self._segments = np.empty((max(tracks, 2 * len(self._segments)), self.length, 2))
+        return self._segments[:tracks]
+
+    def update(self, segments):
+        self.collection.set_segments(segments)
+        return self.collection
@@ -0,0 +1,29 @@
+import socket
+
+# Large enough for any datagram the senders build (see radar_codec.MAX_DATAGRAM)
+RECV_BUFSIZE = 65535
+# Kernel receive buffer, so bursts are queued rather than dropped while a batch is ingested
+SOCKET_RCVBUF = 4 * 1024 * 1024
+# Kernel send buffer, so a burst of datagrams is queued rather than refused
+SOCKET_SNDBUF = 4 * 1024 * 1024
+
+
+def set_buffer_size(sock, option, size):
+    """ Ask for a `size` byte SO_RCVBUF / SO_SNDBUF `option`. """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, option, size)
+    except OSError:
+        pass  # Keep the OS default if the limit is lower
+
+
+def open_receiver_socket(udp_ip, udp_port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    set_buffer_size(sock, socket.SO_RCVBUF, SOCKET_RCVBUF)
+    sock.bind((udp_ip, udp_port))
+    return sock
+
+
+def open_sender_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    set_buffer_size(sock, socket.SO_SNDBUF, SOCKET_SNDBUF)
+    return sock
@@ -1,58 +1,61 @@
 import sys
-import socket
-import struct
-import math
-import threading
 import numpy as np
 #import mplcursor
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QPushButton,
                              QWidget, QLabel, QHBoxLayout)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 import csv
+from matplotlib.collections import LineCollection
 
-# Update the format string to include all required fields
-FORMAT = "fffffffffffffff"  # Adjust this according to your actual data structure
+from radar_buffer import RingBuffer
+from radar_codec import SCHEMA_15, packets_to_block
+from radar_queue import BlockQueue
+from radar_receiver import ReceiverEngine
+from radar_trails import group_trails
 
-class UDPReceiver(threading.Thread):
-    def __init__(self, udp_ip, udp_port, callback):
-        super().__init__()
+# At most one redraw per display frame, however many packets arrived in it
+FRAME_INTERVAL_MS = 40
+
+class UDPReceiver:
+    """
+    Receives one port through a ReceiverEngine (one asyncio loop thread) and
+    queues decoded blocks for the GUI thread; never touch Qt from here.
+    stop() closes the socket and returns promptly, even when no data arrives.
+    """
+
+    def __init__(self, udp_ip, udp_port, queue):
         self.udp_ip = udp_ip
         self.udp_port = udp_port
-        self.callback = callback
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.bind((self.udp_ip, self.udp_port))
-        self.data = []
-        self.running = True
+        self.queue = queue
+        self.engine = ReceiverEngine()
+        self.engine.add(udp_port, self.decode, queue.put, udp_ip=udp_ip)
 
-    def run(self):
+    def start(self):
+        self.engine.start()
         print(f"Listening for UDP packets on {self.udp_ip}:{self.udp_port}...")
-        try:
-            while self.running:
-                packed_data, _ = self.sock.recvfrom(1024)  # Size of the buffer
-                unpacked_data = struct.unpack(FORMAT, packed_data)
-                x, y, z, xv, yv, zv, source, trk_no, types, time, latitude, longitude, altitude, speed, hdng = unpacked_data
-                print(f"Received data: {x}, {y}, {z}, {xv}, {yv}, {zv}, {source}, {trk_no}, {types}, {time}, "
-                      f"{latitude}, {longitude}, {altitude}, {speed}, {hdng}")
-                
-                self.data.append((x, y,z))
-                self.callback(self.data)
-        except Exception as e:
-            print(f"An error occurred: {e}")
-        finally:
-            self.sock.close()
+
+    def is_alive(self):
+        return self.engine.running
+
+    def decode(self, packets):
+        return packets_to_block(packets, SCHEMA_15, self.parse_text)
+
+    def parse_text(self, packet):
+        print(f"Ignoring non-binary packet ({len(packet)} bytes)")
+        return []
 
     def stop(self):
-        self.running = False
-        self.join()
+        self.engine.stop()
 
 class RadarGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Radar System GUI")
         self.setGeometry(100, 100, 800, 600)
-        self.data = []
+        self.data = RingBuffer()  # Only touched on the GUI thread
+        self.ingest_queue = BlockQueue()
         self.udp_receiver = None  # To hold the UDPReceiver instance
         self.plot_type = 'PPI'  # Default mode is PPI
         self.initUI()
@@ -100,14 +103,31 @@ class RadarGUI(QMainWindow):
 
         self.layout.addLayout(self.mode_layout)
 
+        # Frame timer: drains everything received since the last frame and redraws once
+        self.frame_timer = QTimer()
+        self.frame_timer.timeout.connect(self.process_pending)
+        self.frame_timer.start(FRAME_INTERVAL_MS)
+
         self.start_receiving()  # Start receiving UDP data immediately
 
     def start_receiving(self):
         if not self.udp_receiver or not self.udp_receiver.is_alive():
-            self.udp_receiver = UDPReceiver('127.0.0.1', 5005, self.update_plot)
+            self.udp_receiver = UDPReceiver('127.0.0.1', 5005, self.ingest_queue)
             self.udp_receiver.start()
             print("Started receiving data...")
 
+    def closeEvent(self, event):
+        if self.udp_receiver:
+            self.udp_receiver.stop()
+        super().closeEvent(event)
+
+    def process_pending(self):
+        block = self.ingest_queue.drain()
+        if block is None:
+            return  # Nothing new, nothing to redraw
+        self.data.append_block(block)
+        self.update_plot(self.data)
+
     def update_plot(self, data):
         print(f"Updating plot with {len(data)} data points.")
         if self.plot_type == 'PPI':
@@ -128,8 +148,8 @@ class RadarGUI(QMainWindow):
     def plot_ppi(self, data):
         """ Plan Position Indicator (PPI) mode """
         self.ax.clear()
-        x_values = [d[0] for d in data]  # X
-        y_values = [d[1] for d in data]  # Y
+        x_values = data.column("x")
+        y_values = data.column("y")
         self.ax.scatter(x_values, y_values, c='blue')
         self.ax.set_title("PPI Mode")
         self.ax.set_xlabel("X")
@@ -139,9 +159,10 @@ class RadarGUI(QMainWindow):
     def plot_rhi(self, data):
         """ Range Height Indicator (RHI) mode """
         self.ax.clear()
-        x_values = [d[0] for d in data]  # X
-        z_values = [d[2] for d in data]  # Z
-        self.ax.plot(x_values, z_values, 'r')
+        # One trail per track rather than one line through every report
+        trails = group_trails(data.column("track_id"), np.column_stack((data.column("x"), data.column("z"))))
+        self.ax.add_collection(LineCollection(trails, colors='r'))
+        self.ax.autoscale_view()
         self.ax.set_title("RHI Mode")
         self.ax.set_xlabel("Range (X)")
         self.ax.set_ylabel("Height (Z)")
@@ -150,9 +171,9 @@ class RadarGUI(QMainWindow):
     def plot_bscope(self, data):
         """ B-Scope mode """
         self.ax.clear()
-        x_values = [d[0] for d in data]  # X
-        y_values = [d[1] for d in data]  # Y
-        self.ax.plot(x_values, y_values, 'g')
+        trails = group_trails(data.column("track_id"), np.column_stack((data.column("x"), data.column("y"))))
+        self.ax.add_collection(LineCollection(trails, colors='g'))
+        self.ax.autoscale_view()
         self.ax.set_title("BSCOPE Mode")
         self.ax.set_xlabel("X")
         self.ax.set_ylabel("Y")
@@ -161,9 +182,9 @@ class RadarGUI(QMainWindow):
     def plot_cscope(self, data):
         """ C-Scope mode """
         self.ax.clear()
-        x_values = [d[0] for d in data]  # X
-        y_values = [d[1] for d in data]  # Y
-        z_values = [d[2] for d in data]  # Z
+        x_values = data.column("x")
+        y_values = data.column("y")
+        z_values = data.column("z")
         self.ax.scatter(x_values, y_values, c=z_values, cmap='viridis')
         self.ax.set_title("CSCOPE Mode")
         self.ax.set_xlabel("X")
@@ -173,8 +194,8 @@ class RadarGUI(QMainWindow):
     def plot_time_vs_range(self, data):
         """ Time vs Range mode """
         self.ax.clear()
-        time_values = [d[9] for d in data]  # Time
-        range_values = [math.sqrt(d[0]**2 + d[1]**2 + d[2]**2) for d in data]  # Range
+        time_values = data.column("time")
+        range_values = data.column("slant_range")
         self.ax.plot(time_values, range_values, 'm')
         self.ax.set_title("Time vs Range Mode")
         self.ax.set_xlabel("Time")
@@ -184,8 +205,8 @@ class RadarGUI(QMainWindow):
     def plot_time_vs_azimuth(self, data):
         """ Time vs Azimuth mode """
         self.ax.clear()
-        time_values = [d[9] for d in data]  # Time
-        azimuth_values = [math.degrees(math.atan2(d[1], d[0])) for d in data]  # Azimuth
+        time_values = data.column("time")
+        azimuth_values = data.column("azimuth")
         self.ax.plot(time_values, azimuth_values, 'orange')
         self.ax.set_title("Time vs Azimuth Mode")
         self.ax.set_xlabel("Time")
@@ -195,9 +216,8 @@ class RadarGUI(QMainWindow):
     def plot_time_vs_elevation(self, data):
         """ Time vs Elevation mode """
         self.ax.clear()
-        time_values = [d[9] for d in data]  # Time
-        elevation_values = [math.degrees(math.asin(d[2] / (math.sqrt(d[0]**2 + d[1]**2 + d[2]**2))))
-                            for d in data]  # Elevation
+        time_values = data.column("time")
+        elevation_values = data.column("elevation")
         self.ax.plot(time_values, elevation_values, 'purple')
         self.ax.set_title("Time vs Elevation Mode")
         self.ax.set_xlabel("Time")
@@ -1,6 +1,5 @@
+import argparse
 import sys
-import socket
-import threading
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -11,45 +10,45 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QTimer
 
+from radar_buffer import COLUMNS, RingBuffer, derive_block
+from radar_codec import SCHEMA_10, packets_to_block
+from radar_ingest import parse_datagram
+from radar_latency import LatencyProbe
+from radar_queue import BlockQueue
+from radar_receiver import ReceiverEngine
+from radar_tracks import TrackTable
+
 # UDP settings
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5008
-data_buffer = []
-
-# UDP Receiver Thread
-def udp_receiver():
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((UDP_IP, UDP_PORT))
-    while True:
-        data, _ = sock.recvfrom(1024)
-        parsed_data = parse_udp_data(data.decode("utf-8"))
-        if parsed_data:
-            data_buffer.append(parsed_data)
+BUFFER_CAPACITY = 10000  # Reports kept for display (oldest are overwritten)
+data_buffer = RingBuffer(BUFFER_CAPACITY)  # Only touched on the GUI thread
+ingest_queue = BlockQueue()  # Receiver thread -> GUI thread hand-off
+track_table = TrackTable()  # Latest state and history per track_id, GUI thread only
+DISPLAY_TRACKS = 50  # Most recently updated tracks listed in the data panel
+INGEST_INTERVAL_MS = 50  # How often the GUI moves queued reports into data_buffer
+latency_probe = None  # LatencyProbe for --latency; needs stamped reports (send.py --stamp)
+
+# Decoder for the receive engine, run on its loop thread: one batch of datagrams -> one raw block
+def decode_packets(packets):
+    block = packets_to_block(packets, SCHEMA_10, parse_udp_data)
+    if latency_probe:
+        latency_probe.parsed(packets)
+    return block
 
 def parse_udp_data(data):
-    try:
-        values = data.split(',')
-        x, y, z, trk_no, time, lat, lon, alt, spd, hdng = values
-        return {
-
-            "x": float(x),
-            "y": float(y),
-            "z": float(z),
-            "track_id":float(trk_no),
-            "time": float(time),
-            "latitude": float(lat),
-            "longitude": float(lon),
-            "altitude": float(alt),
-            "speed": float(spd),
-            "heading": float(hdng),
-        }
-    except ValueError:
-        print("Invalid data format:", data)
-        return None
+    """ Decode one datagram into a list of reports (shared with the headless daemon, see radar_ingest.py). """
+    return parse_datagram(data, SCHEMA_10)
 
-# Start UDP receiver thread
-receiver_thread = threading.Thread(target=udp_receiver, daemon=True)
-receiver_thread.start()
+def queue_block(block):
+    """ Sink of the receive engine: hand a decoded block to the GUI thread. """
+    ingest_queue.put(block)
+    if latency_probe:
+        latency_probe.queued()
+
+# UDP receive engine, started from __main__ so the module can be imported (e.g. by bench_radar.py)
+receiver = ReceiverEngine()
+receiver.add(UDP_PORT, decode_packets, queue_block, udp_ip=UDP_IP)
 
 class RadarPlotDialog(QDialog):
     def __init__(self, parent=None):
@@ -114,10 +113,16 @@ class RadarDisplayApp(QMainWindow):
         self.setup_plot()
 
         # Timer for updating data display
+        self.displayed_serial = 0
         self.data_update_timer = QTimer()
         self.data_update_timer.timeout.connect(self.update_data_display)
         self.data_update_timer.start(500)  # Update every 500 ms
 
+        # Timer moving received reports into data_buffer on the GUI thread
+        self.ingest_timer = QTimer()
+        self.ingest_timer.timeout.connect(self.ingest_pending)
+        self.ingest_timer.start(INGEST_INTERVAL_MS)
+
     def select_plot(self):
         dialog = RadarPlotDialog(self)
         selected_plot_type = dialog.get_plot_type()
@@ -133,8 +138,8 @@ class RadarDisplayApp(QMainWindow):
             self.ax.set_ylim(0, 100)  # Set your preferred range here
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
             self.sweep_line, = self.ax.plot([], [], color="lime", linewidth=2)
-            self.anim = FuncAnimation(self.fig, self.update_ppi, frames=np.linspace(0, 2*np.pi, 100),
-                                      interval=50, blit=True, repeat=True)
+            self.anim = self.animate(self.update_ppi, frames=np.linspace(0, 2*np.pi, 100),
+                                     interval=50, blit=True, repeat=True)
 
         elif self.plot_type == "RHI":
             self.ax = self.fig.add_subplot(111, facecolor="black")
@@ -143,7 +148,7 @@ class RadarDisplayApp(QMainWindow):
             self.ax.set_xlabel("Range (km)")
             self.ax.set_ylabel("Altitude (km)")
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_rhi, interval=500)
+            self.anim = self.animate(self.update_rhi, interval=500)
 
         elif self.plot_type == "B-Scope":
             self.ax = self.fig.add_subplot(111, facecolor="black")
@@ -152,12 +157,21 @@ class RadarDisplayApp(QMainWindow):
             self.ax.set_xlabel("Azimuth (degrees)")
             self.ax.set_ylabel("Range (km)")
             self.ax.grid(color="green", linestyle="--", linewidth=0.5)
-            self.anim = FuncAnimation(self.fig, self.update_bscope, interval=500)
+            self.anim = self.animate(self.update_bscope, interval=500)
 
         # Other plot setups can be implemented similarly...
         
         self.canvas.draw()
 
+    def animate(self, update, **kwargs):
+        """ FuncAnimation on the canvas; with --latency each frame is reported to the probe once drawn. """
+        if latency_probe:
+            def frame(i, update=update):
+                QTimer.singleShot(0, latency_probe.drawn)  # Runs after this frame has been painted
+                return update(i)
+            return FuncAnimation(self.fig, frame, **kwargs)
+        return FuncAnimation(self.fig, update, **kwargs)
+
     def update_ppi(self, angle):
         self.sweep_line.set_data([angle, angle], [0, 100])  # Replace with your range
         return self.sweep_line,
@@ -166,33 +180,59 @@ class RadarDisplayApp(QMainWindow):
         self.ax.clear()
         self.ax.grid(color="green", linestyle="--", linewidth=0.5)
         if data_buffer:
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
-            heights = [point["z"] for point in data_buffer]
+            ranges = data_buffer.column("ground_range")
+            heights = data_buffer.column("z")
             self.ax.plot(ranges, heights, 'o', color="lime", markersize=5, alpha=0.7)
 
     def update_bscope(self, frame):
         self.ax.clear()
         self.ax.grid(color="green", linestyle="--", linewidth=0.5)
         if data_buffer:
-            azimuths = [np.degrees(np.arctan2(point["y"], point["x"])) for point in data_buffer]
-            ranges = [np.sqrt(point["x"]**2 + point["y"]**2) for point in data_buffer]
+            azimuths = data_buffer.column("azimuth")
+            ranges = data_buffer.column("ground_range")
             self.ax.plot(azimuths, ranges, 'o', color="lime", markersize=5, alpha=0.7)
 
+    def ingest_pending(self):
+        # Everything received since the last tick goes into the buffer in one append
+        mark = latency_probe.mark() if latency_probe else None
+        block = ingest_queue.drain()
+        if block is not None:
+            block = derive_block(block)  # Derived once, shared by the buffer and the track table
+            data_buffer.append_block(block)
+            if latency_probe:
+                latency_probe.buffered(mark)
+            track_table.update_block(block)
+
     def update_data_display(self):
-        # Display the most recent data
-        if data_buffer:
-            latest_data = data_buffer[-1]
-            display_text = (
+        # Display the current picture: latest state of the most recently updated tracks
+        if track_table.serial == self.displayed_serial:
+            return  # Nothing new since the last refresh
+        self.displayed_serial = track_table.serial
+        lines = [f"Tracks: {len(track_table)}"]
+        for row in track_table.current(DISPLAY_TRACKS).T:
+            latest_data = dict(zip(COLUMNS, row))
+            lines.append(
                 f"X: {latest_data['x']:.2f}, Y: {latest_data['y']:.2f}, Z: {latest_data['z']:.2f}, "
-                f"Track ID: {latest_data['track_id']}, Time: {latest_data['time']}, "
+                f"Track ID: {latest_data['track_id']:.0f}, Time: {latest_data['time']}, "
                 f"Lat: {latest_data['latitude']}, Lon: {latest_data['longitude']}, "
                 f"Alt: {latest_data['altitude']}, Speed: {latest_data['speed']}, "
-                f"Heading: {latest_data['heading']}\n"
+                f"Heading: {latest_data['heading']}"
             )
-            self.data_display.append(display_text)
+        self.data_display.setPlainText("\n".join(lines))
 
 # Initialize the Qt Application and start the Radar Display App
-app = QApplication(sys.argv)
-radar_app = RadarDisplayApp()
-radar_app.show()
-sys.exit(app.exec_())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time radar display for the 10-field feed")
+    parser.add_argument("--latency", action="store_true", help="Report end-to-end latency of stamped reports on exit")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    if args.latency:
+        latency_probe = LatencyProbe()
+    receiver.start()
+    app.aboutToQuit.connect(receiver.stop)
+    radar_app = RadarDisplayApp()
+    radar_app.show()
+    if latency_probe:
+        app.aboutToQuit.connect(lambda: print(latency_probe.report()))
+    sys.exit(app.exec_())
@@ -1,53 +1,131 @@
-import csv
-import socket
-import time
+import argparse
+
+import numpy as np
+
+from radar_codec import SCHEMA_15, source_code, type_code
+from radar_csvcache import CHUNK_ROWS, CsvCacheError, csv_records, load_csv
+from radar_replay import ReplayClock
+from radar_sender import BatchSender
 
 # UDP settings
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5005
 
-def send_csv_data(csv_file_path):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    
-    with open(csv_file_path, 'r') as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        
-        for row in csv_reader:
-            # Prepare the data in the expected format
-            try:
-                x = row["F_X"]
-                y = row["F_Y"]
-                z = row["F_Z"]
-                xv = row["F_VX"]
-                yv = row["F_VY"]
-                zv = row["F_VZ"]
-                source = "Radar"  # Assumed constant for this example
-                trk_no = row["trk_id"]
-                types = "TypeA"   # Placeholder for radar type
-                time_stamp = row["P_TIME"]
-                latitude = row["latitude"]
-                longitude = row["longitude"]
-                altitude = row["altitude"]
-                speed = row["speed"]
-                heading = row["heading"]
-
-                # Create the formatted message
-                message = f"{x},{y},{z},{xv},{yv},{zv},{source},{trk_no},{types},{time_stamp},{latitude},{longitude},{altitude},{speed},{heading}"
-                
-                # Send the data
-                sock.sendto(message.encode('utf-8'), (UDP_IP, UDP_PORT))
-                print(f"Sent: {message}")
-                
-                # Delay to simulate real-time streaming
-                time.sleep(0.1)  # Adjust as needed for your data rate
-            
-            except KeyError as e:
-                print(f"Missing column in CSV row: {e}")
-
-    sock.close()
-
-# Path to your CSV file
-csv_file_path = "radar_data.csv"
-
-# Start sending data
-send_csv_data(csv_file_path)
+# Report fields taken from CSV columns, and the fixed ones
+CSV_COLUMNS = {
+    "x": "F_X", "y": "F_Y", "z": "F_Z", "xv": "F_VX", "yv": "F_VY", "zv": "F_VZ",
+    "track_id": "trk_id", "time": "P_TIME",
+    "latitude": "latitude", "longitude": "longitude", "altitude": "altitude", "speed": "speed", "heading": "heading",
+}
+FIXED_VALUES = {
+    "source": source_code("Radar"),  # Assumed constant for this example
+    "type": type_code("TypeA"),      # Placeholder for radar type
+}
+
+def send_csv_data(csv_file_path, batch=False, speed=1.0, start=None, stop=None, loop=False, row_delay=None,
+                  stamp=False, rate=None):
+    """
+    Replay each CSV row as a 15-field report, paced by its P_TIME column.
+
+    `speed` scales the recorded rate (2.0 is twice as fast, 0 sends as fast
+    as possible). `start` / `stop` are offsets in seconds from the first
+    row's P_TIME; `loop` restarts from `start` at the end of the file. A
+    `rate` (reports per second) or `row_delay` (seconds per report)
+    replaces P_TIME pacing with a token bucket. With `batch`, reports that
+    are due together share datagrams. With `stamp`, every report carries a
+    sequence number and its monotonic send time, for the receivers'
+    --latency measurement.
+    """
+    # Columns are checked, and the CSV converted to its cache if needed, before anything is sent
+    rows = load_csv(csv_file_path, CSV_COLUMNS.values())
+    if row_delay is not None:
+        rate = 1.0 / row_delay if row_delay > 0 else None
+    paced = rate is None and speed > 0 and row_delay is None
+    # Without batching every report is sent on its own
+    sender = BatchSender(SCHEMA_15, UDP_IP, UDP_PORT, rate=rate, per_datagram=None if batch else 1, stamped=stamp)
+    clock = ReplayClock(speed)
+    skipped = 0
+    passes = 0
+
+    try:
+        while True:
+            clock.reset()
+            first_time = None
+            sent_before = sender.reports
+
+            for chunk in range(0, len(rows), CHUNK_ROWS):
+                # Records in the binary wire format (see radar_codec.py), a chunk at a time straight from the cache
+                records, invalid = csv_records(rows[chunk:chunk + CHUNK_ROWS], SCHEMA_15, CSV_COLUMNS, FIXED_VALUES)
+                if not passes:
+                    skipped += invalid  # Counted once, not again on every loop
+                if not len(records):
+                    continue
+                times = records["time"]
+
+                # Start / stop window, relative to the first row of the file
+                if first_time is None:
+                    first_time = times[0]
+                offsets = times - first_time
+                end = len(records)
+                if stop is not None and (offsets > stop).any():
+                    end = int(np.argmax(offsets > stop))
+                stopped = end < len(records)
+                keep = np.arange(end)
+                if start is not None:
+                    keep = keep[offsets[:end] >= start]
+                records, times = records[keep], times[keep]
+
+                if not paced:
+                    sender.send(records)
+                elif len(records):
+                    # Reports due at the same P_TIME leave together, joined by any that are already due
+                    starts = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+                    bounds = np.r_[starts, len(records)]
+                    group = 0
+                    while group < len(starts):
+                        clock.wait(float(times[starts[group]]))
+                        last = group + 1
+                        while last < len(starts) and clock.is_due(float(times[starts[last]])):
+                            last += 1
+                        sender.send(records[starts[group]:bounds[last]])
+                        group = last
+                if stopped:
+                    break
+
+            passes += 1
+            if sender.reports == sent_before:
+                # Looping would only spin: no valid rows, or none between --start and --stop
+                window = start is not None or stop is not None
+                print("Error: no valid rows to send" + (" between --start and --stop" if window else ""))
+                break
+            if not loop:
+                break
+    finally:
+        sender.close()
+        if skipped:
+            print(f"Skipped {skipped} row(s) with missing or invalid values")
+        print(sender.summary())
+        print(f"Replay finished, worst lag {clock.max_lag * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay radar_data.csv as 15-field UDP reports, paced by P_TIME")
+    parser.add_argument("csv_file_path", nargs="?", default="radar_data.csv", help="Path to your CSV file")
+    parser.add_argument("--batch", action="store_true", help="Pack reports that are due together into shared datagrams")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed multiplier, e.g. 0.5 or 10; 0 sends as fast as possible")
+    parser.add_argument("--start", type=float, help="Skip rows earlier than this many seconds after the first P_TIME")
+    parser.add_argument("--stop", type=float, help="Stop at this many seconds after the first P_TIME")
+    parser.add_argument("--loop", action="store_true", help="Start over at the end of the file")
+    parser.add_argument("--row-delay", type=float, help="Ignore P_TIME and wait this many seconds after each row")
+    parser.add_argument("--rate", type=float, help="Ignore P_TIME and send this many reports per second")
+    parser.add_argument("--stamp", action="store_true",
+                        help="Add sequence numbers and send times for end-to-end latency measurement")
+    args = parser.parse_args()
+
+    # Start sending data
+    try:
+        send_csv_data(args.csv_file_path, batch=args.batch, speed=args.speed, start=args.start,
+                      stop=args.stop, loop=args.loop, row_delay=args.row_delay, stamp=args.stamp,
+                      rate=args.rate)
+    except CsvCacheError as e:
+        parser.error(str(e))
@@ -1,72 +1,58 @@
-import csv
-import socket
-import time
+import argparse
+
+from radar_codec import SCHEMA_10
+from radar_csvcache import CHUNK_ROWS, CsvCacheError, csv_records, load_csv
+from radar_sender import BatchSender
 
 # UDP settings
 UDP_IP = "127.0.0.1"  # Localhost
 UDP_PORT = 5008
+ROW_DELAY = 0.1  # Default seconds per row, to simulate real-time data transmission
 
-# Define the columns we need to extract from the CSV
-# Column names should match the header in your CSV
-columns = [
-    "F_X", "F_Y", "F_Z", "F_VX", "F_VY", "F_VZ", 
-    "trk_id", "types", "P_TIME", "latitude", 
-    "longitude", "altitude", "speed", "heading"
-]
+# The 10-field report (x,y,z,trk_no,time,latitude,longitude,altitude,speed,hdng)
+# field by field, from the CSV columns named here
+CSV_COLUMNS = {
+    "x": "F_X", "y": "F_Y", "z": "F_Z", "track_id": "trk_id", "time": "P_EL",
+    "latitude": "RNG_MAX", "longitude": "RNG_MIN", "altitude": "EL_MAX", "speed": "EL_MIN", "heading": "EL_MAX",
+}
 
-def format_data(row):
+def send_csv_data_via_udp(csv_file_path, batch=False, stamp=False, rate=1.0 / ROW_DELAY):
     """
-    Format the row into the required structure:
-    x,y,z,xv,yv,zv,source, trk_no,types,time,latitude,longitude,altitude,speed,hdng
+    Send every row as a 10-field report, `rate` reports per second (None or
+    0 for as fast as possible). With `batch` as many reports as fit share a
+    datagram, otherwise each is sent alone. With `stamp`, reports carry a
+    sequence number and send time for latency measurement.
     """
-    try:
-        # Extract and format each required field
-        x = row["F_X"]
-        y = row["F_Y"]
-        z = row["F_Z"]
-        
-        trk_no = row["trk_id"]
-        
-        time_stamp = row["P_EL"]
-        latitude = row["RNG_MAX"]
-        longitude = row["RNG_MIN"]
-        altitude = row["EL_MAX"]
-        speed = row["EL_MIN"]
-        heading = row["EL_MAX"]
-
-        # Format as a comma-separated string
-        formatted_data = f"{x},{y},{z},{trk_no},{time_stamp},{latitude},{longitude},{altitude},{speed},{heading}"
-        return formatted_data
-    except KeyError as e:
-        print(f"Missing column in CSV row: {e}")
-        return None
-
-def send_csv_data_via_udp(csv_file_path):
-    # Open a socket for UDP communication
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-    # Read the CSV file and send each row as a UDP packet
-    with open(csv_file_path, mode="r") as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-
-        for row in csv_reader:
-            # Format the row into the required UDP message structure
-            message = format_data(row)
-            if message:
-                # Send the message via UDP
-                sock.sendto(message.encode("utf-8"), (UDP_IP, UDP_PORT))
-                
-                # Print the sent data on the sending end
-                print(f"Sent: {message}")
+    # Columns are checked, and the CSV converted to its cache if needed, before anything is sent
+    rows = load_csv(csv_file_path, CSV_COLUMNS.values())
+    sender = BatchSender(SCHEMA_10, UDP_IP, UDP_PORT, rate=rate or None, per_datagram=None if batch else 1,
+                         stamped=stamp)
+    skipped = 0
 
-                # Add a delay to simulate real-time data transmission
-                time.sleep(0.1)  # Adjust the delay as needed
-
-    # Close the socket after sending all data
-    sock.close()
-
-# Path to your CSV file
-csv_file_path = "radar_data.csv"
-
-# Start sending data
-send_csv_data_via_udp(csv_file_path)
+    # Send the cached rows a chunk at a time, already in the binary wire format (see radar_codec.py)
+    try:
+        for chunk in range(0, len(rows), CHUNK_ROWS):
+            records, invalid = csv_records(rows[chunk:chunk + CHUNK_ROWS], SCHEMA_10, CSV_COLUMNS)
+            skipped += invalid
+            sender.send(records)
+    finally:
+        sender.close()
+        if skipped:
+            print(f"Skipped {skipped} row(s) with missing or invalid values")
+        print(sender.summary())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream radar_data.csv as 10-field UDP reports")
+    parser.add_argument("csv_file_path", nargs="?", default="radar_data.csv", help="Path to your CSV file")
+    parser.add_argument("--batch", action="store_true", help="Pack as many reports as fit into each datagram")
+    parser.add_argument("--stamp", action="store_true",
+                        help="Add sequence numbers and send times for end-to-end latency measurement")
+    parser.add_argument("--rate", type=float, default=1.0 / ROW_DELAY,
+                        help="Reports per second; 0 sends as fast as possible")
+    args = parser.parse_args()
+
+    # Start sending data
+    try:
+        send_csv_data_via_udp(args.csv_file_path, batch=args.batch, stamp=args.stamp, rate=args.rate)
+    except CsvCacheError as e:
+        parser.error(str(e))
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from radar_buffer import COLUMN_INDEX, COLUMNS, RAW_COLUMNS, RingBuffer, derive_block, row_cutoffs
+
+
+def make_block(times, feed=np.nan):
+    block = np.full((len(RAW_COLUMNS), len(times)), np.nan)
+    block[COLUMN_INDEX["time"]] = times
+    block[COLUMN_INDEX["track_id"]] = np.arange(len(times))
+    block[COLUMN_INDEX["feed"]] = feed
+    block[COLUMN_INDEX["x"]] = block[COLUMN_INDEX["y"]] = block[COLUMN_INDEX["z"]] = 1.0
+    return block
+
+
+def test_wraparound_keeps_newest_rows_in_order():
+    buffer = RingBuffer(5)
+    for start in range(0, 12, 3):  # Blocks of 3 wrap the head around the mirror
+        buffer.append_block(make_block(np.arange(start, start + 3, dtype=float)))
+    assert len(buffer) == 5
+    assert buffer.total == 12
+    assert buffer.column("time").tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert buffer.column("time", 2).tolist() == [10.0, 11.0]
+    assert buffer.last().shape == (len(COLUMNS), 5)
+    assert buffer.latest()["time"] == 11.0
+
+
+def test_oversized_block_keeps_its_tail():
+    buffer = RingBuffer(4)
+    buffer.append_block(make_block(np.arange(10.0)))
+    assert buffer.column("time").tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert buffer.total == 10
+
+
+def test_derive_block_adds_polar_quantities():
+    block = make_block([1.0, 2.0])
+    block[COLUMN_INDEX["x"]], block[COLUMN_INDEX["y"]], block[COLUMN_INDEX["z"]] = [3.0, 0.0], [4.0, 0.0], [0.0, 0.0]
+    derived = derive_block(block)
+    assert derived.shape == (len(COLUMNS), 2)
+    assert derived[COLUMN_INDEX["ground_range"]].tolist() == [5.0, 0.0]
+    assert derived[COLUMN_INDEX["azimuth"], 0] == pytest.approx(53.130102)
+    assert derived[COLUMN_INDEX["elevation"]].tolist() == [0.0, 0.0]  # Defined at the origin too
+    assert derive_block(derived) is derived
+
+
+def test_raw_blocks_are_derived():
+    buffer = RingBuffer(4)
+    block = make_block([1.0, 2.0])
+    buffer.append_block(block)
+    np.testing.assert_array_equal(buffer.last(), derive_block(block))
+
+
+def test_last_is_a_view():
+    buffer = RingBuffer(4)
+    buffer.append_block(make_block([1.0, 2.0, 3.0]))
+    assert np.shares_memory(buffer.last(), buffer._data)
+
+
+def test_discard_before():
+    buffer = RingBuffer(8)
+    buffer.append_block(make_block([1.0, 2.0, 5.0, 3.0, 6.0]))
+    assert buffer.discard_before("time", 4.0) == 2
+    # The late 3.0 waits behind 5.0
+    assert buffer.column("time").tolist() == [5.0, 3.0, 6.0]
+    assert buffer.discard_before("time", 0.0) == 0
+    assert buffer.discard_before("time", np.inf) == 3
+    assert not buffer
+
+
+def test_discard_before_by_feed():
+    buffer = RingBuffer(8)
+    buffer.append_block(make_block([10.0, 11.0], feed=5008))
+    buffer.append_block(make_block([1000.0, 1001.0], feed=5005))
+    buffer.append_block(make_block([12.0], feed=5008))
+    assert buffer.discard_before("time", {5008.0: 11.0, 5005.0: 1001.0}, by="feed") == 1
+    assert buffer.column("time").tolist() == [11.0, 1000.0, 1001.0, 12.0]
+    # Feeds without a cutoff keep their rows, and stop the scan
+    assert buffer.discard_before("time", {5005.0: 2000.0}, by="feed") == 0
+
+
+def test_discard_before_wraps():
+    buffer = RingBuffer(4)
+    for t in range(7):
+        buffer.append_block(make_block([float(t)]))
+    assert buffer.discard_before("time", 5.0) == 2
+    buffer.append_block(make_block([7.0, 8.0]))
+    assert buffer.column("time").tolist() == [5.0, 6.0, 7.0, 8.0]
+
+
+def test_row_cutoffs_match_nan_to_none():
+    groups = np.array([5005.0, np.nan, 5008.0])
+    limits = row_cutoffs(groups, {5005.0: 1.0, None: 2.0})
+    assert limits.tolist() == [1.0, 2.0, -np.inf]
+
+
+@pytest.mark.parametrize("capacity, expected", [(3, [7.0, 8.0, 9.0]), (20, [5.0, 6.0, 7.0, 8.0, 9.0])])
+def test_resize_keeps_newest_rows(capacity, expected):
+    buffer = RingBuffer(5)
+    buffer.append_block(make_block(np.arange(10.0)))
+    buffer.resize(capacity)
+    assert buffer.capacity == capacity
+    assert buffer.column("time").tolist() == expected
+    assert buffer.total == 10
+    buffer.append_block(make_block([10.0]))
+    assert buffer.column("time", 1).tolist() == [10.0]
+
+
+def test_clear_and_capacity():
+    buffer = RingBuffer(4)
+    buffer.append_block(make_block([1.0]))
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.total == 0 and buffer.latest() is None
+    with pytest.raises(ValueError):
+        RingBuffer(0)
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from radar_buffer import COLUMN_INDEX
+from radar_codec import (HEADER, MAX_DATAGRAM, RECORD_DTYPES, RECORDS, SCHEMA_10, SCHEMA_15, STAMP, WireFormatError,
+                         block_to_records, decode_block, decode_packet, decode_stamps, decode_text, encode_15,
+                         encode_packet, encode_records, is_binary, is_stamped, records_per_datagram)
+from radar_loadgen import TrackSimulator
+
+FIELDS_15 = ("1.0", "2.0", "3.0", "0.1", "0.2", "0.3", "Radar", "42", "TypeA", "12.5",
+             "34.0", "-118.0", "1000", "250", "90")
+
+
+def packet_10(n=3):
+    records = [RECORDS[SCHEMA_10].pack(1.0, 2.0, 3.0, track_id, 10.0 + track_id, 34.0, -118.0, 1000.0, 250.0, 90.0)
+               for track_id in range(n)]
+    return encode_packet(SCHEMA_10, records)
+
+
+def make_records(schema, n=100):
+    records = TrackSimulator(n, seed=1).records(schema)
+    records["time"] = np.linspace(0.0, 10.0, n)
+    return records
+
+
+def test_encode_15_round_trip():
+    datagram = encode_15(*FIELDS_15)
+    assert is_binary(datagram)
+    schema, (report,) = decode_packet(datagram)
+    assert schema == SCHEMA_15
+    assert (report["x"], report["track_id"], report["time"]) == (1.0, 42, 12.5)
+    assert report["xv"] == pytest.approx(0.1)
+    assert (report["source"], report["type"]) == ("Radar", "TypeA")
+
+
+def test_unknown_names_are_sent_as_code_0():
+    fields = FIELDS_15[:6] + ("Sonar", "42", "Balloon") + FIELDS_15[9:]
+    _, (report,) = decode_packet(encode_15(*fields))
+    assert (report["source"], report["type"]) == ("Unknown", "Unknown")
+
+
+def test_schema_10_round_trip():
+    schema, reports = decode_packet(packet_10())
+    assert schema == SCHEMA_10
+    assert [report["track_id"] for report in reports] == [0, 1, 2]
+    assert reports[2]["time"] == 12.0
+    assert "source" not in reports[0]
+
+
+@pytest.mark.parametrize("datagram", [encode_15(*FIELDS_15), packet_10()])
+def test_truncated_datagrams_are_rejected(datagram):
+    for size in (0, HEADER.size - 1, HEADER.size, len(datagram) - 1):
+        with pytest.raises(WireFormatError):
+            decode_packet(datagram[:size])
+    with pytest.raises(WireFormatError):
+        decode_packet(datagram + b"\0")
+
+
+def test_bad_header_is_rejected():
+    datagram = encode_15(*FIELDS_15)
+    assert not is_binary(b"XX" + datagram[2:])
+    with pytest.raises(WireFormatError, match="magic"):
+        decode_packet(b"XX" + datagram[2:])
+    with pytest.raises(WireFormatError, match="version"):
+        decode_packet(datagram[:2] + b"\x09" + datagram[3:])
+    with pytest.raises(WireFormatError, match="schema"):
+        decode_packet(datagram[:3] + b"\x07" + datagram[4:])
+
+
+def test_legacy_text_reports():
+    report = decode_text(",".join(FIELDS_15).encode(), SCHEMA_15)
+    assert (report["source"], report["track_id"], report["time"]) == ("Radar", 42, 12.5)
+    with pytest.raises(WireFormatError, match="expected 15 text fields"):
+        decode_text(b"1,2,3", SCHEMA_15)
+    with pytest.raises(WireFormatError, match="invalid text report"):
+        decode_text(",".join(("x",) + FIELDS_15[1:]).encode(), SCHEMA_15)
+
+
+def test_record_dtypes_match_struct_layout():
+    for schema, record in RECORDS.items():
+        assert RECORD_DTYPES[schema].itemsize == record.size
+
+
+@pytest.mark.parametrize("schema", [SCHEMA_15, SCHEMA_10])
+def test_encode_records_round_trip(schema):
+    records = make_records(schema)
+    datagrams = encode_records(schema, records)
+    per_datagram = records_per_datagram(schema)
+    assert len(datagrams) == -(-len(records) // per_datagram)
+    assert all(len(datagram) <= MAX_DATAGRAM for datagram in datagrams)
+    assert all(decode_block(datagram)[0] == schema for datagram in datagrams)
+    decoded = np.concatenate([decode_block(datagram)[1] for datagram in datagrams], axis=1)
+    np.testing.assert_array_equal(block_to_records(schema, decoded), records)
+    # Fields the schema does not carry are left NaN
+    assert np.isnan(decoded[COLUMN_INDEX["xv"]]).all() == (schema == SCHEMA_10)
+
+
+@pytest.mark.parametrize("schema", [SCHEMA_15, SCHEMA_10])
+def test_encode_records_matches_packing_per_report(schema):
+    records = make_records(schema, 5)
+    datagram, = encode_records(schema, records)
+    assert datagram == encode_packet(schema, [RECORDS[schema].pack(*record) for record in records.tolist()])
+    _, reports = decode_packet(datagram)
+    assert [report["track_id"] for report in reports] == records["track_id"].tolist()
+    assert not is_stamped(datagram)
+    assert decode_stamps(datagram) == []
+
+
+@pytest.mark.parametrize("schema", [SCHEMA_15, SCHEMA_10])
+def test_stamped_round_trip(schema):
+    records = make_records(schema)
+    datagrams = encode_records(schema, records, seq=0xFFFFFFF0)
+    assert len(datagrams[0]) <= MAX_DATAGRAM
+    assert all(is_binary(datagram) and is_stamped(datagram) for datagram in datagrams)
+    seqs = [seq for datagram in datagrams for seq, _ in decode_stamps(datagram)]
+    assert seqs == [(0xFFFFFFF0 + i) & 0xFFFFFFFF for i in range(len(records))]  # Wraps at 2**32
+    decoded = np.concatenate([decode_block(datagram)[1] for datagram in datagrams], axis=1)
+    np.testing.assert_array_equal(block_to_records(schema, decoded), records)
+    # Stamping one packed record at a time gives the same layout
+    packed = [RECORDS[schema].pack(*record) for record in records[:3].tolist()]
+    assert decode_stamps(encode_packet(schema, packed, seq=7))[2][0] == 9
+
+
+def test_truncated_stamps_are_rejected():
+    datagram, = encode_records(SCHEMA_15, make_records(SCHEMA_15, 3), seq=0)
+    with pytest.raises(WireFormatError):
+        decode_packet(datagram[:-STAMP.size])
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+
+import radar_csvcache
+from radar_codec import SCHEMA_10
+from radar_csvcache import CACHE_SUFFIX, CsvCacheError, csv_records, load_csv
+
+HEADER = "F_X,F_Y,F_Z,trk_id,P_TIME,latitude,longitude,altitude,speed,heading,note\n"
+COLUMNS = {"x": "F_X", "y": "F_Y", "z": "F_Z", "track_id": "trk_id", "time": "P_TIME", "latitude": "latitude",
+           "longitude": "longitude", "altitude": "altitude", "speed": "speed", "heading": "heading"}
+
+
+def write_csv(path, rows, header=HEADER):
+    path.write_text(header + "".join(row + "\n" for row in rows))
+    return str(path)
+
+
+def row(i, note="ok"):
+    return f"{i},{i + 1},{i + 2},{i},{i * 0.5},34.0,-118.0,1000,250,90,{note}"
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """ Count the cache builds. """
+    calls = []
+    build_cache = radar_csvcache.build_cache
+
+    def counting(csv_path):
+        calls.append(csv_path)
+        return build_cache(csv_path)
+
+    monkeypatch.setattr(radar_csvcache, "build_cache", counting)
+    return calls
+
+
+def test_cache_is_built_once_and_reused(tmp_path, builds):
+    path = write_csv(tmp_path / "radar.csv", [row(i) for i in range(5)] + ["", "1,2,x,4,5,6,7,8,9,10,bad"])
+    rows = load_csv(path, COLUMNS.values())
+    assert len(rows) == 6  # Blank lines are not rows
+    assert rows["F_X"].tolist()[:2] == [0.0, 1.0]
+    assert np.isnan(rows["F_Z"][5])
+    assert rows.dtype["note"].kind == "U"
+    assert isinstance(rows, np.memmap)
+    load_csv(path, COLUMNS.values())
+    assert len(builds) == 1
+    assert radar_csvcache._read_meta(path)["bad_values"] == 1
+
+
+def test_cache_is_rebuilt_when_the_csv_changes(tmp_path, builds):
+    path = write_csv(tmp_path / "radar.csv", [row(i) for i in range(5)])
+    load_csv(path)
+    write_csv(tmp_path / "radar.csv", [row(i) for i in range(6)])
+    assert len(load_csv(path)) == 6
+    assert len(builds) == 2
+    # A fresh copy of the same content is only hashed, not parsed again
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert len(load_csv(path)) == 6
+    assert len(builds) == 2
+    assert radar_csvcache._read_meta(path)["mtime_ns"] == stat.st_mtime_ns + 10 ** 9
+    load_csv(path, rebuild=True)
+    assert len(builds) == 3
+
+
+def test_csv_records_leave_out_rows_missing_values(tmp_path):
+    path = write_csv(tmp_path / "radar.csv", [row(1), "1,2,,4,5,6,7,8,9,10,", row(3)])
+    records, invalid = csv_records(load_csv(path, COLUMNS.values()), SCHEMA_10, COLUMNS)
+    assert invalid == 1
+    assert records["track_id"].tolist() == [1, 3]
+    assert records.dtype == radar_csvcache.RECORD_DTYPES[SCHEMA_10]
+
+
+@pytest.mark.parametrize("header, message", [
+    ("", "no header row"),
+    ("F_X,F_Y,F_X\n", "'F_X' appears more than once"),
+    ("F_X,,F_Z\n", "column 2 has no name"),
+])
+def test_bad_headers_are_rejected(tmp_path, header, message):
+    path = write_csv(tmp_path / "radar.csv", ["1,2,3"] if header else [], header=header)
+    with pytest.raises(CsvCacheError, match=message):
+        load_csv(path)
+
+
+def test_required_columns_are_checked(tmp_path):
+    path = write_csv(tmp_path / "radar.csv", [row(1)])
+    with pytest.raises(CsvCacheError, match="missing column"):
+        load_csv(path, ["F_X", "F_W"])
+    with pytest.raises(CsvCacheError, match="note should be numeric"):
+        load_csv(path, ["F_X", "note"])
+
+
+def test_late_rows_that_do_not_fit_the_column_type(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(radar_csvcache, "CHUNK_ROWS", 4)
+    path = write_csv(tmp_path / "radar.csv", [row(i) for i in range(6)] + [row(6, "x" * 50)])
+    rows = load_csv(path)
+    assert rows["note"][6] == "x" * radar_csvcache.TEXT_WIDTH
+    assert "cut to 32 characters (longest 50)" in capsys.readouterr().out
+
+    path = write_csv(tmp_path / "late.csv", [row(i, "y" * 40) for i in range(6)] + ["1,2,3,4,five,6,7,8,9,10,z"])
+    with pytest.raises(CsvCacheError, match=r"data row 7, column 'P_TIME': 'five' is not a number"):
+        load_csv(path)
+    assert not os.path.exists(path + CACHE_SUFFIX + ".partial")
+    # Text columns are as wide as the longest value of the first rows
+    path = write_csv(tmp_path / "wide.csv", [row(i, "y" * 40) for i in range(6)])
+    assert load_csv(path)["note"][5] == "y" * 40
@@ -0,0 +1,43 @@
+import numpy as np
+
+from radar_codec import SCHEMA_15, encode_records
+from radar_latency import LatencyProbe
+from radar_loadgen import TrackSimulator
+
+
+def stamped(seq, n):
+    return encode_records(SCHEMA_15, TrackSimulator(n, seed=1).records(SCHEMA_15), seq=seq)
+
+
+def test_lost_counts_across_the_sequence_wrap():
+    probe = LatencyProbe()
+    probe.parsed(stamped(2 ** 32 - 10, 10))
+    probe.parsed(stamped(5, 5))  # 0..4 lost just past the wrap
+    assert (probe.received, probe.lost) == (15, 5)
+    probe.parsed(stamped(0, 5))  # Late, reordered reports fill the gap
+    assert (probe.received, probe.lost) == (20, 0)
+
+
+def test_lost_counts_reordered_first_reports():
+    probe = LatencyProbe()
+    probe.parsed(stamped(100, 10))
+    probe.parsed(stamped(90, 5))
+    assert (probe.received, probe.lost) == (15, 5)
+
+
+def test_buffered_only_counts_reports_queued_before_the_mark():
+    probe = LatencyProbe()
+    probe.parsed(stamped(0, 3))
+    probe.buffered(probe.mark())
+    assert probe.summary()["buffered"]["count"] == 0  # Parsed, but its block was not queued yet
+    probe.queued()
+    mark = probe.mark()
+    probe.parsed(stamped(3, 4))  # Queued after the GUI's drain: left for the next one
+    probe.queued()
+    probe.buffered(mark)
+    assert probe.summary()["buffered"]["count"] == 3
+    probe.drawn()
+    probe.buffered(probe.mark())
+    summary = probe.summary()
+    assert (summary["parsed"]["count"], summary["buffered"]["count"], summary["drawn"]["count"]) == (7, 7, 3)
+    assert np.isfinite(summary["drawn"]["p99"])
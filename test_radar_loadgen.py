@@ -0,0 +1,37 @@
+import numpy as np
+
+from radar_codec import SCHEMA_10, SCHEMA_15
+from radar_loadgen import TrackSimulator
+
+
+def test_same_seed_same_tracks():
+    a, b = TrackSimulator(50, seed=7), TrackSimulator(50, seed=7)
+    for _ in range(10):
+        a.step(1.0)
+        b.step(1.0)
+    np.testing.assert_array_equal(a.records(SCHEMA_15), b.records(SCHEMA_15))
+    assert not np.array_equal(a.records(SCHEMA_15)["x"], TrackSimulator(50, seed=8).records(SCHEMA_15)["x"])
+
+
+def test_tracks_stay_near_the_coverage_area():
+    sim = TrackSimulator(200, seed=1, area=10.0)
+    for _ in range(500):
+        sim.step(1.0)
+    assert sim.time == 500.0
+    # A track may overshoot by at most one step before it turns back
+    assert (np.hypot(sim.x, sim.y) <= 10.0 + sim.speed).all()
+    assert ((sim.z >= 0.1) & (sim.z <= 15.0)).all()
+
+
+def test_records_follow_the_schema():
+    sim = TrackSimulator(3, seed=1)
+    records = sim.records(SCHEMA_10)
+    assert records["track_id"].tolist() == [1, 2, 3]
+    assert "xv" not in records.dtype.names
+    records = sim.records(SCHEMA_15)
+    xv, yv, _ = sim.velocity()
+    np.testing.assert_allclose(records["xv"], xv, rtol=1e-6)
+    # Compass heading: 0 is north (+y), 90 is east (+x)
+    heading = np.radians(records["heading"])
+    np.testing.assert_allclose(np.sin(heading) * sim.speed, xv, rtol=1e-4, atol=1e-6)
+    assert (records["source"] > 0).all() and (records["type"] > 0).all()
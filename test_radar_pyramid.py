@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from radar_buffer import COLUMN_INDEX, RAW_COLUMNS
+from radar_pyramid import TimePyramid
+
+
+def make_block(track_ids, times, values, feed=np.nan):
+    block = np.full((len(RAW_COLUMNS), len(track_ids)), np.nan)
+    block[COLUMN_INDEX["feed"]] = feed
+    block[COLUMN_INDEX["track_id"]] = track_ids
+    block[COLUMN_INDEX["time"]] = times
+    block[COLUMN_INDEX["altitude"]] = values
+    return block
+
+
+def entries(times, values):
+    """ envelope output as sorted (bin centre, min, max) tuples. """
+    return sorted(zip(times[::2].tolist(), values[::2].tolist(), values[1::2].tolist()))
+
+
+def brute_force(track_ids, times, values, bin_width, t0, t1):
+    bins = {}
+    for track_id, t, value in zip(track_ids, times, values):
+        b = int(np.floor(t / bin_width))
+        if np.floor(t0 / bin_width) <= b <= np.floor(t1 / bin_width):
+            lo, hi = bins.get((b, track_id), (value, value))
+            bins[b, track_id] = (min(lo, value), max(hi, value))
+    return sorted(((b + 0.5) * bin_width, lo, hi) for (b, _), (lo, hi) in bins.items())
+
+
+@pytest.mark.parametrize("width", [1000, 40, 5])
+def test_envelope_matches_brute_force(width):
+    rng = np.random.default_rng(3)
+    n = 2000
+    track_ids = rng.integers(0, 20, n)
+    times = np.sort(rng.uniform(-5.0, 95.0, n))  # Negative times floor to negative bins
+    values = rng.normal(1000.0, 300.0, n)
+    pyramid = TimePyramid(("altitude",), base_bin=0.1, levels=8)
+    # In order, then a late block that has to be merged into place
+    late = rng.random(n) < 0.1
+    for chunk in np.array_split(np.flatnonzero(~late), 7):
+        pyramid.update_block(make_block(track_ids[chunk], times[chunk], values[chunk]))
+    pyramid.update_block(make_block(track_ids[late], times[late], values[late]))
+    assert pyramid.levels == 8
+    assert pyramid.track_count == 20
+
+    t0, t1 = 10.0, 60.0
+    level = pyramid.level_for(t1 - t0, width)
+    bin_width = 0.1 * 2 ** level
+    assert (t1 - t0) / bin_width <= width or level == pyramid.levels - 1
+    got = entries(*pyramid.envelope("altitude", t0, t1, width))
+    expected = brute_force(track_ids.tolist(), times.tolist(), values.tolist(), bin_width, t0, t1)
+    assert np.allclose(got, expected)
+
+
+def test_level_for_picks_the_finest_level_that_fits():
+    pyramid = TimePyramid(("altitude",), base_bin=0.05, levels=16)
+    assert pyramid.level_for(5.0, 100) == 0     # 100 bins
+    assert pyramid.level_for(5.0, 99) == 1      # 50 bins
+    assert pyramid.level_for(60.0, 100) == 4    # 1200 bins, halved four times
+    assert pyramid.level_for(10 ** 9, 100) == 15  # Capped at the coarsest
+
+
+def test_reports_missing_a_key_or_time_are_skipped():
+    pyramid = TimePyramid(("altitude",))
+    pyramid.update_block(make_block([1, np.nan, 2], [1.0, 2.0, np.nan], [10.0, 20.0, 30.0]))
+    assert len(pyramid) == 1
+    assert pyramid.track_keys() == [(1,)]
+
+
+def test_discard_before_per_feed():
+    pyramid = TimePyramid(("altitude",), keys=("feed", "track_id"), base_bin=1.0, levels=4)
+    for t in range(100):
+        pyramid.update_block(make_block([1, 2], [t, t], [t, -t], feed=5005))
+        pyramid.update_block(make_block([1], [1000 + t], [t], feed=5008))
+    pyramid.discard_before({5005: 90.0, 5008: 1050.0}, by="feed")
+    assert sorted(pyramid.track_keys()) == [(5005, 1), (5005, 2), (5008, 1)]
+    times, values = pyramid.envelope("altitude", 0, 99, 1000)
+    assert times.min() >= 90.0
+    assert set(values.tolist()) == {float(t) for t in range(90, 100)} | {-float(t) for t in range(90, 100)}
+    times, values = pyramid.envelope("altitude", 1000, 1099, 1000)
+    assert times.min() >= 1050.0
+    # A feed that goes quiet has its tracks forgotten once they all age out
+    pyramid.discard_before({5005: 1000.0, 5008: 1050.0}, by="feed")
+    assert sorted(pyramid.track_keys()) == [(5008, 1)]
+    assert len(pyramid.envelope("altitude", 0, 99, 1000)[0]) == 0
+
+
+def test_max_entries_trims_the_oldest_bins():
+    pyramid = TimePyramid(("altitude",), base_bin=1.0, levels=3, max_entries=100)
+    for t in range(1000):
+        pyramid.update_block(make_block([1, 2], [t, t], [t, t]))
+    assert len(pyramid) <= 100
+    times, values = pyramid.envelope("altitude", 0, 999, 2000)
+    assert times.max() == 999.5
+    assert times.min() > 800.0
+    assert pyramid.track_count == 2
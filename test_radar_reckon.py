@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import pytest
+
+from radar_buffer import COLUMN_INDEX, RAW_COLUMNS, derive_block
+from radar_reckon import SensorClock
+from radar_tracks import TrackTable
+
+
+def make_block(feed, times, track_ids, x=0.0, xv=1.0):
+    block = np.full((len(RAW_COLUMNS), len(track_ids)), np.nan)
+    block[COLUMN_INDEX["feed"]] = feed
+    block[COLUMN_INDEX["time"]] = times
+    block[COLUMN_INDEX["track_id"]] = track_ids
+    block[COLUMN_INDEX["x"]] = x
+    block[COLUMN_INDEX["y"]] = block[COLUMN_INDEX["z"]] = 0.0
+    block[COLUMN_INDEX["xv"]] = xv
+    block[COLUMN_INDEX["yv"]] = block[COLUMN_INDEX["zv"]] = 0.0
+    return derive_block(block)
+
+
+@pytest.mark.parametrize("smoothing", [None, (0.5, 0.1)])
+def test_extrapolate_live_coasting_and_stale_tracks(smoothing):
+    table = TrackTable(smoothing=smoothing)
+    table.update_block(make_block(np.nan, [100.0, 96.0, 50.0], [1, 2, 3], x=10.0))
+    heads = table.extrapolate(101.0, max_coast=10.0)
+    # Most recently updated first: track 3 stopped reporting long ago, 2 is coasting and 1 is live
+    assert heads[0].tolist() == [10.0, 15.0, 11.0]
+    assert table.extrapolate(101.0)[0].tolist() == [61.0, 15.0, 11.0]  # No max_coast: no limit
+    assert table.extrapolate(90.0, max_coast=10.0)[0].tolist() == [10.0, 10.0, 10.0]  # Never moved backwards
+
+
+def test_extrapolate_uses_each_tracks_feed_time():
+    table = TrackTable(keys=("feed", "track_id"))
+    table.update_block(make_block(5005, [1000.0], [1], x=10.0))
+    table.update_block(make_block(5008, [20.0], [1], x=10.0))
+    heads = table.extrapolate({5005.0: 1002.0, 5008.0: 23.0}, max_coast=10.0, by="feed")
+    assert heads[0].tolist() == [13.0, 12.0]
+    # A feed without a time leaves its tracks at their last report
+    assert table.extrapolate({5005.0: 1002.0}, by="feed")[0].tolist() == [10.0, 12.0]
+
+
+def test_sensor_clock_keeps_one_anchor_per_feed():
+    clock = SensorClock()
+    assert clock.now() == {}
+    assert clock.age() == np.inf
+    clock.observe(make_block(5005, [1000.0, 1001.0], [1, 2]))
+    clock.observe(make_block(5008, [20.0], [1]))
+    clock.observe(make_block(5005, [900.0], [3]))  # Late reports do not move a feed's clock back
+    clock.observe(make_block(np.nan, [np.nan], [4]))  # Nor do reports without a time
+    before = time.monotonic()
+    now = clock.now()
+    assert sorted(now) == [5005.0, 5008.0]
+    assert 1001.0 <= now[5005.0] < 1001.0 + 1.0
+    assert 20.0 <= now[5008.0] < 20.0 + 1.0
+    assert clock.age() <= time.monotonic() - before + 1.0
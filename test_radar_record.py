@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from radar_buffer import COLUMN_INDEX, RAW_COLUMNS
+from radar_player import play
+from radar_record import FILE_HEADER, RECORD_DTYPE, Recorder, Recording, RecordingError
+
+
+def make_block(track_ids, feed=5005):
+    block = np.full((len(RAW_COLUMNS), len(track_ids)), np.nan)
+    block[COLUMN_INDEX["track_id"]] = track_ids
+    block[COLUMN_INDEX["feed"]] = feed
+    return block
+
+
+def record(path, batches):
+    """ Write `batches` of (recv_time, track_ids); returns the Recorder, closed. """
+    recorder = Recorder(path)
+    for recv_time, track_ids in batches:
+        recorder.write(make_block(track_ids), recv_time=recv_time)
+    recorder.close()
+    return recorder
+
+
+def test_seek_and_batch_end(tmp_path):
+    path = tmp_path / "session.rdr"
+    record(path, [(10.0, [1, 2, 3]), (11.0, [4]), (11.0, [5, 6]), (13.0, [7])])
+    recording = Recording(path)
+    assert len(recording) == 7
+    assert (recording.start_time, recording.end_time) == (10.0, 13.0)
+    assert recording.seek(9.0) == 0
+    assert recording.seek(11.0) == 3
+    assert recording.seek(12.0) == 6
+    assert recording.seek(14.0) == 7
+    # Batches are the records sharing a recv_time, optionally capped
+    assert recording.batch_end(0) == 3
+    assert recording.batch_end(3) == 6
+    assert recording.batch_end(3, max_records=2) == 5
+    assert recording.batch_end(6) == 7
+    assert recording.block(3, 6)[COLUMN_INDEX["track_id"]].tolist() == [4.0, 5.0, 6.0]
+
+
+def test_recv_time_never_decreases(tmp_path):
+    path = tmp_path / "session.rdr"
+    record(path, [(10.0, [1]), (9.0, [2])])
+    assert Recording(path).records["recv_time"].tolist() == [10.0, 10.0]
+
+
+def test_appending_continues_from_the_last_record(tmp_path):
+    path = tmp_path / "session.rdr"
+    record(path, [(100.0, [1, 2])])
+    record(path, [(50.0, [3]), (150.0, [4])])  # A clock behind the first session's
+    recording = Recording(path)
+    assert recording.records["recv_time"].tolist() == [100.0, 100.0, 100.0, 150.0]
+    assert recording.seek(120.0) == 3
+
+
+def test_partial_record_is_ignored_and_cut_before_appending(tmp_path):
+    path = tmp_path / "session.rdr"
+    record(path, [(1.0, [1])])
+    with open(path, "ab") as f:
+        f.write(b"\0" * (RECORD_DTYPE.itemsize // 2))  # A crash mid-write
+    assert len(Recording(path)) == 1
+    record(path, [(2.0, [2])])
+    assert os.path.getsize(path) == FILE_HEADER.size + 2 * RECORD_DTYPE.itemsize
+    assert Recording(path).block(0, 2)[COLUMN_INDEX["track_id"]].tolist() == [1.0, 2.0]
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a recording at all")
+    with pytest.raises(RecordingError):
+        Recording(path)
+    with pytest.raises(RecordingError):
+        Recorder(path)
+    assert path.read_bytes() == b"not a recording at all"
+
+
+def test_play_hands_over_one_batch_at_a_time(tmp_path):
+    path = tmp_path / "session.rdr"
+    record(path, [(10.0, [1, 2]), (11.0, [3]), (12.0, [4, 5])])
+    recording = Recording(path)
+    blocks = []
+    assert play(recording, blocks.append, speed=0) == 5
+    assert [block[COLUMN_INDEX["track_id"]].tolist() for block in blocks] == [[1.0, 2.0], [3.0], [4.0, 5.0]]
+    blocks.clear()
+    assert play(recording, blocks.append, speed=0, start=1.0, stop=2.0) == 1
+    assert blocks[0][COLUMN_INDEX["track_id"]].tolist() == [3.0]
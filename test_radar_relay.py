@@ -0,0 +1,100 @@
+import socket
+
+import numpy as np
+import pytest
+
+from radar_buffer import COLUMN_INDEX, RAW_COLUMNS
+from radar_codec import SCHEMA_10, SCHEMA_15, decode_block, type_code
+from radar_relay import CONTROL_PORT, Relay, RelayError, Subscriber, parse_subscriber
+
+
+def make_block(feed=5005, track_ids=(1, 2, 3, 4), types=("Aircraft", "Drone", "Aircraft", "TypeA"),
+               ranges=(10.0, 20.0, 30.0, np.nan)):
+    block = np.full((len(RAW_COLUMNS), len(track_ids)), np.nan)
+    block[COLUMN_INDEX["feed"]] = feed
+    block[COLUMN_INDEX["track_id"]] = track_ids
+    block[COLUMN_INDEX["type"]] = [type_code(name) for name in types]
+    block[COLUMN_INDEX["x"]] = ranges
+    block[COLUMN_INDEX["y"]] = 0.0
+    block[COLUMN_INDEX["time"]] = np.arange(len(track_ids))
+    return block
+
+
+def test_parse_subscriber_round_trips_through_spec():
+    subscriber = parse_subscriber("6105:feeds=5008,5005:tracks=3,1:types=Drone,1:range=0-50:rate=2000")
+    assert subscriber.port == 6105
+    assert subscriber.feeds.tolist() == [5005, 5008]
+    assert subscriber.tracks.tolist() == [1, 3]
+    assert (subscriber.min_range, subscriber.max_range, subscriber.rate) == (0.0, 50.0, 2000.0)
+    assert subscriber.schema == SCHEMA_15
+    assert parse_subscriber(subscriber.spec()).spec() == subscriber.spec()
+
+
+def test_single_feed_defaults_to_its_schema():
+    assert parse_subscriber("6008:feeds=5008").schema == SCHEMA_10
+    assert parse_subscriber("6008:feeds=5008:schema=15").schema == SCHEMA_15
+    assert parse_subscriber("6000").schema == SCHEMA_15
+
+
+@pytest.mark.parametrize("spec", [
+    "x6005", "6005:feeds=", "6005:feeds=,", "6005:tracks=", "6005:tracks=a", "6005:types=", "6005:types=Blimp",
+    "6005:range=50", "6005:range=a-", "6005:rate=", "6005:rate=0", "6005:rate=-5", "6005:schema=12",
+    "6005:colour=red",
+])
+def test_parse_subscriber_rejects(spec):
+    with pytest.raises(RelayError):
+        parse_subscriber(spec)
+
+
+def test_mask_combines_filters():
+    block = make_block()
+    assert Subscriber(6000).mask(block).tolist() == [True] * 4
+    assert Subscriber(6000, feeds=[5008]).mask(block).tolist() == [False] * 4
+    assert Subscriber(6000, tracks=[2, 4]).mask(block).tolist() == [False, True, False, True]
+    aircraft = type_code("Aircraft")
+    assert Subscriber(6000, types=[aircraft]).mask(block).tolist() == [True, False, True, False]
+    # Reports without a range fail range filters
+    assert Subscriber(6000, min_range=15).mask(block).tolist() == [False, True, True, False]
+    assert Subscriber(6000, max_range=20, types=[aircraft]).mask(block).tolist() == [True, False, False, False]
+
+
+def test_select_thins_evenly_over_the_rate():
+    subscriber = Subscriber(6000, rate=2)  # A burst of RATE_WINDOW * rate = 2 reports
+    block = make_block(track_ids=range(8), types=["Aircraft"] * 8, ranges=[1.0] * 8)
+    rows = subscriber.select(block)
+    assert rows.tolist() == [0, 4]
+    assert (subscriber.matched, subscriber.dropped) == (8, 6)
+
+
+def test_control_messages():
+    relay = Relay(feeds={5005: SCHEMA_15})
+    try:
+        assert relay.control("subscribe 6005:tracks=1") == "ok 6005:tracks=1:schema=15"
+        assert relay.control("list") == "6005:tracks=1:schema=15"
+        assert relay.control("subscribe 5005").startswith("error: port 5005 is relayed")
+        assert relay.control(f"subscribe {CONTROL_PORT}").startswith("error:")
+        assert relay.control("subscribe 6006:rate=-5").startswith("error:")
+        assert relay.control("unsubscribe 6006") == "error: 6006 is not subscribed"
+        assert relay.control("unsubscribe 6005") == "ok"
+        assert relay.control("list") == "no subscribers"
+        assert relay.control("shutdown").startswith("error: unknown command")
+    finally:
+        relay.close()
+
+
+def test_dispatch_sends_each_subscriber_its_share():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.settimeout(2.0)
+        port = sock.getsockname()[1]
+        relay = Relay(feeds={5005: SCHEMA_15}, udp_ip="127.0.0.1")
+        try:
+            relay.subscribe(Subscriber(port, tracks=[2, 3]))
+            relay.dispatch(make_block())
+            schema, block = decode_block(sock.recv(65536))
+        finally:
+            relay.close()
+    assert schema == SCHEMA_15
+    assert block[COLUMN_INDEX["track_id"]].tolist() == [2.0, 3.0]
+    assert relay.received == {5005: 4}
+    assert relay.subscribers[port].sent == 2
@@ -0,0 +1,75 @@
+import numpy as np
+
+from radar_buffer import COLUMN_INDEX, RAW_COLUMNS, RingBuffer, derive_block
+from radar_pyramid import TimePyramid
+from radar_retention import Retention
+from radar_tracks import TrackTable
+
+
+def make_block(feed, time, track_ids):
+    block = np.full((len(RAW_COLUMNS), len(track_ids)), np.nan)
+    block[COLUMN_INDEX["feed"]] = feed
+    block[COLUMN_INDEX["time"]] = time
+    block[COLUMN_INDEX["track_id"]] = track_ids
+    block[COLUMN_INDEX["x"]] = block[COLUMN_INDEX["y"]] = block[COLUMN_INDEX["z"]] = 1.0
+    return derive_block(block)
+
+
+def make_stores(keys=("feed", "track_id"), window=300):
+    buffer = RingBuffer(1000)
+    tracks = TrackTable(keys=keys)
+    pyramid = TimePyramid(("ground_range",), keys=keys)
+    return buffer, tracks, pyramid, Retention(buffer, tracks, pyramid, window=window)
+
+
+def ingest(stores, block):
+    buffer, tracks, pyramid, retention = stores
+    buffer.append_block(block)
+    tracks.update_block(block)
+    pyramid.update_block(block)
+    retention.apply(block)
+
+
+def test_feeds_are_windowed_separately():
+    # send2.py sends P_EL as its time, far behind the 15-field feed's clock
+    stores = make_stores()
+    buffer, tracks, pyramid, retention = stores
+    ingest(stores, make_block(5008, 10.0, [1, 2]))
+    ingest(stores, make_block(5005, 1000.0, [1, 2, 3]))
+    assert len(buffer) == 5
+    assert len(tracks) == 5
+    assert retention.newest == {5008.0: 10.0, 5005.0: 1000.0}
+
+
+def test_expired_tracks_leave_every_store():
+    stores = make_stores()
+    buffer, tracks, pyramid, retention = stores
+    ingest(stores, make_block(5008, 10.0, [1, 2]))
+    ingest(stores, make_block(5005, 1000.0, [1, 2, 3]))
+    ingest(stores, make_block(5005, 1400.0, [4]))
+    assert sorted(tracks.track_ids()) == [(5005, 4), (5008, 1), (5008, 2)]
+    assert pyramid.track_count == 3
+    assert sorted(pyramid.track_keys()) == [(5005, 4), (5008, 1), (5008, 2)]
+
+
+def test_untagged_reports_share_one_window():
+    stores = make_stores(keys=("track_id",))
+    buffer, tracks, pyramid, retention = stores
+    ingest(stores, make_block(np.nan, 0.0, [1]))
+    ingest(stores, make_block(np.nan, 1000.0, [2]))
+    assert len(buffer) == 1
+    assert tracks.track_ids() == [2]
+
+
+def test_pyramid_reuses_indices_of_forgotten_tracks():
+    pyramid = TimePyramid(("ground_range",))
+    for i in range(2000):
+        pyramid.update_block(make_block(np.nan, float(i), [i]))
+        pyramid.discard_before(i - 50.0)
+        if i == 199:
+            nbytes = pyramid.nbytes
+    assert pyramid.track_count < 100
+    # Fresh indices for all 2000 tracks would have grown the per-track arrays eightfold
+    assert pyramid.nbytes < nbytes + 4096
+    times, values = pyramid.envelope("ground_range", 1950, 2000, 100)
+    assert len(times) > 0
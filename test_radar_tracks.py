@@ -0,0 +1,104 @@
+import numpy as np
+
+from radar_buffer import COLUMN_INDEX, RAW_COLUMNS
+from radar_tracks import TrackTable
+
+
+def make_block(track_ids, times, feed=np.nan):
+    block = np.full((len(RAW_COLUMNS), len(track_ids)), np.nan)
+    block[COLUMN_INDEX["feed"]] = feed
+    block[COLUMN_INDEX["track_id"]] = track_ids
+    block[COLUMN_INDEX["time"]] = times
+    block[COLUMN_INDEX["x"]] = np.asarray(times) * 10  # Tells the reports apart in trails
+    block[COLUMN_INDEX["y"]] = block[COLUMN_INDEX["z"]] = 0.0
+    return block
+
+
+def history_times(table, track_id):
+    return table.history(track_id)[COLUMN_INDEX["time"]].tolist()
+
+
+def test_several_reports_per_track_in_one_block():
+    table = TrackTable(history_length=4)
+    table.update_block(make_block([1, 2, 1, 1, 2, 1, 1, 1, np.nan], [0, 1, 2, 3, 4, 5, 6, 7, 8]))
+    assert len(table) == 2  # The report without a track_id is skipped
+    assert table.serial == 8
+    # Only the newest history_length reports of each track are kept, oldest first
+    assert history_times(table, 1) == [3.0, 5.0, 6.0, 7.0]
+    assert history_times(table, 2) == [1.0, 4.0]
+    assert table.latest(1)["time"] == 7.0
+    assert table.latest(3) is None
+    assert table.current()[COLUMN_INDEX["time"]].tolist() == [7.0, 4.0]
+
+
+def test_history_wraps_around_across_blocks():
+    table = TrackTable(history_length=4)
+    table.update_block(make_block([1, 1, 1], [0, 1, 2]))
+    table.update_block(make_block([1, 1], [3, 4]))
+    assert history_times(table, 1) == [1.0, 2.0, 3.0, 4.0]
+    table.update_block(make_block([1, 2, 1, 1, 1, 1], [5, 6, 7, 8, 9, 10]))  # More than a whole ring at once
+    assert history_times(table, 1) == [7.0, 8.0, 9.0, 10.0]
+    assert history_times(table, 2) == [6.0]
+    assert table.current()[COLUMN_INDEX["track_id"]].tolist() == [1.0, 2.0]
+
+
+def test_trails_follow_the_ring_and_pad_short_histories():
+    table = TrackTable(history_length=4)
+    table.update_block(make_block([2, 1, 2, 1, 1, 1, 1], [0, 1, 2, 3, 4, 5, 6]))
+    table.update_block(make_block([1, 3], [7, 8]))
+    trails = table.trails(("time", "x"))
+    assert trails.shape == (3, 4, 2)
+    # Most recently updated first: track 3, then 1, then 2
+    assert trails[0, 3, 0] == 8.0
+    assert np.isnan(trails[0, :3]).all()
+    assert trails[1, :, 0].tolist() == [4.0, 5.0, 6.0, 7.0]
+    assert trails[1, :, 1].tolist() == [40.0, 50.0, 60.0, 70.0]
+    assert np.isnan(trails[2, :2]).all()
+    assert trails[2, 2:, 0].tolist() == [0.0, 2.0]
+    out = np.empty((2, 4, 1))
+    assert table.trails(("time",), n=2, out=out) is out
+    assert out[1, :, 0].tolist() == [4.0, 5.0, 6.0, 7.0]
+
+
+def test_limit_forgets_the_least_recently_updated():
+    table = TrackTable(history_length=4)
+    table.update_block(make_block(list(range(10)), list(range(10))))
+    table.update_block(make_block([0, 0], [10, 11]))
+    assert table.limit(20) == 0
+    # Over the limit: trimmed to 3/4 of it, so the next few tracks cost no compaction
+    assert table.limit(8) == 4
+    assert sorted(table.track_ids()) == [0, 5, 6, 7, 8, 9]
+    assert history_times(table, 0) == [0.0, 10.0, 11.0]
+    assert table.current()[COLUMN_INDEX["track_id"]].tolist() == [0.0, 9.0, 8.0, 7.0, 6.0, 5.0]
+
+
+def test_discard_before_compacts_the_remaining_tracks():
+    table = TrackTable(history_length=4, initial_tracks=2, keys=("feed", "track_id"))
+    table.update_block(make_block([1, 2, 3], [10, 20, 30], feed=5005))
+    table.update_block(make_block([1, 1], [100, 101], feed=5008))
+    table.update_block(make_block([3], [31], feed=5005))
+    assert table.discard_before(25.0) == 2
+    assert sorted(table.track_ids()) == [(5005, 3), (5008, 1)]
+    assert (5005, 1) not in table
+    assert history_times(table, (5005, 3)) == [30.0, 31.0]
+    assert history_times(table, (5008, 1)) == [100.0, 101.0]
+    # Freed slots start empty when reused
+    table.update_block(make_block([1, 3], [40, 32], feed=5005))
+    assert history_times(table, (5005, 1)) == [40.0]
+    assert history_times(table, (5005, 3)) == [30.0, 31.0, 32.0]
+    assert table.trails(("time",)).shape == (3, 4, 1)
+    # Per feed cutoffs; feeds without one keep their tracks
+    assert table.discard_before({5008.0: 200.0}, by="feed") == 1
+    assert sorted(table.track_ids()) == [(5005, 1), (5005, 3)]
+
+
+def test_set_history_length_keeps_the_newest_reports():
+    table = TrackTable(history_length=4)
+    table.update_block(make_block([1] * 6 + [2], [0, 1, 2, 3, 4, 5, 6]))
+    table.set_history_length(2)
+    assert history_times(table, 1) == [4.0, 5.0]
+    assert history_times(table, 2) == [6.0]
+    table.set_history_length(3)
+    table.update_block(make_block([1, 1], [7, 8]))
+    assert history_times(table, 1) == [5.0, 7.0, 8.0]
+    assert table.trails(("time",))[0, :, 0].tolist() == [5.0, 7.0, 8.0]